@@ -0,0 +1,16 @@
+from fastapi import Header, HTTPException
+from typing import Optional
+import os
+import secrets
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Require X-Admin-Token to match ADMIN_TOKEN.
+
+    Fails closed: without ADMIN_TOKEN configured the endpoints behind
+    this dependency are disabled, not open.
+    """
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled: ADMIN_TOKEN is not set")
+    if not secrets.compare_digest(x_admin_token or "", expected):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
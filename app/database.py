@@ -1,6 +1,9 @@
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy import DateTime, event, inspect, text
+from sqlalchemy.engine import make_url
 from app.models import Base
+from app.services.metrics import Gauge
 import os
 from dotenv import load_dotenv
 
@@ -8,14 +11,103 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./chat_sessions.db")
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+def _engine_options(url: str) -> dict:
+    """Pool settings for server databases (Postgres via asyncpg)"""
+    if make_url(url).get_backend_name() == "sqlite":
+        return {}
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 20)),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30)),
+        # Drop connections the server (or a proxy) closed while idle
+        "pool_pre_ping": True,
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800)),
+    }
+
+def _configure_sqlite(engine):
+    """Per-connection pragmas so readers and writers don't block each other"""
+    url = engine.url
+    if url.get_backend_name() != "sqlite" or url.database in (None, "", ":memory:"):
+        return
+    if os.getenv("DB_SQLITE_WAL", "true").lower() != "true":
+        return
+
+    busy_timeout = int(os.getenv("DB_BUSY_TIMEOUT_MS", 5000))
+    mmap_size = int(os.getenv("DB_SQLITE_MMAP_BYTES", 256 * 1024 * 1024))
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        # Lets maintenance return freed pages in small steps instead of a
+        # full VACUUM; only takes effect on a database not created yet
+        cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        cursor.execute("PRAGMA journal_mode=WAL")
+        # Safe with WAL: only the last commits can be lost on power failure
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={busy_timeout}")
+        cursor.execute(f"PRAGMA mmap_size={mmap_size}")
+        cursor.close()
+
+engine = create_async_engine(
+    DATABASE_URL,
+    echo=os.getenv("DB_ECHO", "false").lower() == "true",
+    **_engine_options(DATABASE_URL)
+)
+_configure_sqlite(engine)
+def _pool_usage():
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return None
+    return {
+        ("checked_out",): pool.checkedout(),
+        ("idle",): pool.checkedin(),
+        ("overflow",): max(pool.overflow(), 0),
+    }
+
+Gauge("db_pool_connections", "Database pool connections by state", ["state"], function=_pool_usage)
+
 AsyncSessionLocal = async_sessionmaker(
     engine, class_=AsyncSession, expire_on_commit=False
 )
 
+def _add_missing_columns(conn):
+    # create_all never alters existing tables; add new nullable columns
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column["name"]: column["type"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                if column.nullable:
+                    column_type = column.type.compile(dialect=conn.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+            elif _needs_timezone(conn, column, existing[column.name]):
+                # Timestamps were stored as naive UTC before the columns became
+                # timezone-aware (SQLite keeps the same text either way)
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ALTER COLUMN {column.name} "
+                    f"TYPE TIMESTAMP WITH TIME ZONE USING {column.name} AT TIME ZONE 'UTC'"
+                ))
+
+def _needs_timezone(conn, column, existing_type) -> bool:
+    return (
+        conn.dialect.name == "postgresql"
+        and isinstance(column.type, DateTime) and column.type.timezone
+        and not getattr(existing_type, "timezone", False)
+    )
+
+def _create_indexes(conn):
+    # create_all skips new indexes on tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
 async def init_db():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+        await conn.run_sync(_create_indexes)
 
 async def get_db():
     async with AsyncSessionLocal() as session:
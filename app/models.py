@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime, timezone
 
@@ -8,11 +8,28 @@ class ChatSession(Base):
     __tablename__ = "chat_session"
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, unique=True, index=True)
-    created_at = Column(DateTime, default=datetime.now(timezone.utc))
-    updated_at = Column(DateTime,default=datetime.now(timezone.utc))
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # Last activity: set by every UPDATE and touched by chat turns
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
     is_active = Column(Boolean, default=True)
     escalated = Column(Boolean,default=False)
     escalation_reason = Column(Text, nullable=True)
+    # Rolling summary of every message up to and including summary_message_id
+    summary = Column(Text, nullable=True)
+    summary_message_id = Column(Integer, nullable=True)
+    # Bumped on every state change so other workers can revalidate cached state
+    state_version = Column(Integer, nullable=True, default=0)
+    # Set when background maintenance moves the transcript to an archive file
+    archived_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Idle expiry scans active sessions by last activity
+    __table_args__ = (
+        Index("ix_chat_session_activity", "is_active", "updated_at"),
+    )
 
 class Message(Base):
     __tablename__ = "messages"
@@ -20,8 +37,50 @@ class Message(Base):
     session_id = Column(String, index=True)
     role = Column(String) # 'user' or 'assistant'
     content = Column(Text)
-    timestamp = Column(DateTime, default=datetime.now(timezone.utc))
+    timestamp = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     faq_matched = Column(Boolean, default=False)
     confidence_score = Column(Integer, nullable=True)
 
-    
+    # Recent-history queries are a range scan over one session's messages
+    __table_args__ = (
+        Index("ix_messages_session_timestamp", "session_id", "timestamp"),
+    )
+
+class EscalationTicket(Base):
+    __tablename__ = "escalation_tickets"
+    id = Column(Integer, primary_key=True, index=True)
+    ticket_id = Column(String, unique=True, index=True)
+    session_id = Column(String, index=True)
+    reason = Column(Text)
+    summary = Column(Text)
+    status = Column(String, default="pending") # 'pending', 'assigned' or 'resolved'
+    priority = Column(String, default="normal") # 'high', 'medium' or 'normal'
+    priority_rank = Column(Integer, default=1)
+    escalated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    assigned_to = Column(String, nullable=True)
+    assigned_at = Column(DateTime(timezone=True), nullable=True)
+    resolved_at = Column(DateTime(timezone=True), nullable=True)
+
+    # Agents dequeue the highest-priority, oldest pending ticket
+    __table_args__ = (
+        Index("ix_escalation_tickets_queue", "status", "priority_rank", "escalated_at"),
+    )
+
+class BatchJob(Base):
+    __tablename__ = "batch_jobs"
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(String, unique=True, index=True)
+    source = Column(String, nullable=True)
+    status = Column(String, default="running") # 'running' or 'completed'
+    # Input lines whose results are committed; a resumed job skips them
+    position = Column(Integer, default=0)
+    faq_answered = Column(Integer, default=0)
+    llm_answered = Column(Integer, default=0)
+    escalated = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
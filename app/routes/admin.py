@@ -0,0 +1,45 @@
+from fastapi import APIRouter, Depends, HTTPException
+from pydantic import BaseModel
+from typing import List
+
+from app.auth import require_admin_token
+from app.routes.chat import faq_service, session_maintenance
+
+router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(require_admin_token)])
+
+class FAQItem(BaseModel):
+    question: str
+    answer: str
+    keywords: List[str] = []
+
+@router.get("/faqs")
+async def list_faqs():
+    """Current FAQ catalog and its version"""
+    return {"version": faq_service.version, "faqs": faq_service.faqs}
+
+@router.post("/faqs")
+async def upsert_faqs(faqs: List[FAQItem]):
+    """Insert or replace FAQs, matched on question.
+
+    Only the given FAQs are re-indexed; the catalog is persisted to
+    FAQ_PATH and swapped in atomically.
+    """
+    if not faqs:
+        raise HTTPException(status_code=400, detail="No FAQs given")
+    return await faq_service.upsert([faq.model_dump() for faq in faqs])
+
+@router.post("/faqs/reload")
+async def reload_faqs():
+    """Re-read FAQ_PATH now instead of waiting for the watcher"""
+    changed = await faq_service.refresh()
+    return {"reloaded": changed, "version": faq_service.version, "total": len(faq_service.faqs)}
+
+@router.get("/maintenance")
+async def maintenance_status():
+    """Result of the last background maintenance pass"""
+    return {"interval_seconds": session_maintenance.interval, "last_run": session_maintenance.last_run}
+
+@router.post("/maintenance/run")
+async def run_maintenance():
+    """Run a maintenance pass (expiry, archiving, compaction) now"""
+    return await session_maintenance.run_once()
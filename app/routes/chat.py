@@ -1,22 +1,105 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, func, update
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import AsyncIterator, Optional, List, Dict, Tuple
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import asyncio
+import json
+import os
 import uuid
 import traceback
 
-from app.database import get_db
+from app.auth import require_admin_token
+from app.database import get_db, AsyncSessionLocal
 from app.models import ChatSession, Message
+from app.services.admission import AdmissionController
 from app.services.llm_service import LLMService
 from app.services.faq_service import FAQService
-from app.services.escalation import EscalationService
+from app.services.escalation import ESCALATED_MESSAGE, ESCALATION_NOTICE, EscalationService
+from app.services.escalation_classifier import EscalationClassifier
+from app.services.batch_chat import BatchChatProcessor
+from app.services.maintenance import SessionMaintenance
+from app.services.memory import ConversationMemory
+from app.services.message_writer import MessageWriter
+from app.services.response_cache import ResponseCache
+from app.services.session_cache import SessionState, SessionStateCache
+from app.services.metrics import CHAT_STAGE_SECONDS, ESCALATION_DECISIONS, FAQ_LOOKUPS, Gauge
+from app.services.timing import StageTimer
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-llm_service = LLMService()
 faq_service = FAQService()
+response_cache = ResponseCache.from_env(version=faq_service.version)
+if response_cache is not None:
+    # Answers built from an older FAQ catalog are dropped when it reloads
+    faq_service.listeners.append(response_cache.set_version)
+llm_service = LLMService(response_cache=response_cache)
+session_cache = SessionStateCache.from_env()
+conversation_memory = ConversationMemory(llm_service, AsyncSessionLocal, session_cache)
 escalation_service = EscalationService()
+escalation_classifier = EscalationClassifier.from_env()
+message_writer = MessageWriter.from_env(AsyncSessionLocal)
+admission = AdmissionController.from_env(capacity=llm_service.max_concurrency)
+session_maintenance = SessionMaintenance.from_env(AsyncSessionLocal, session_cache)
+
+Gauge(
+    "llm_requests_in_flight",
+    "Gemini calls holding a concurrency slot",
+    function=lambda: llm_service.max_concurrency - llm_service._semaphore._value
+)
+Gauge(
+    "admission_queue_depth",
+    "Chat turns waiting for an LLM slot",
+    function=lambda: admission.queued
+)
+Gauge(
+    "admission_degraded",
+    "1 while chat turns are answered from the FAQs only",
+    function=lambda: int(admission.mode == "degraded")
+)
+Gauge(
+    "response_cache_entries",
+    "Cached LLM answers",
+    function=lambda: len(response_cache.backend) if response_cache else None
+)
+
+def message_writer_stat(key: str):
+    return message_writer.stats()[key] if message_writer.enabled else None
+
+Gauge(
+    "message_writer_queued",
+    "Chat messages waiting for the write-behind batch insert",
+    function=lambda: message_writer_stat("queued")
+)
+Gauge(
+    "message_writer_unflushed_sessions",
+    "Sessions with chat messages not yet committed",
+    function=lambda: message_writer_stat("unflushed_sessions")
+)
+Gauge(
+    "message_writer_flushed_rows",
+    "Chat messages inserted by the write-behind writer since startup",
+    function=lambda: message_writer_stat("flushed_rows")
+)
+Gauge(
+    "message_writer_flushed_batches",
+    "Write-behind INSERT batches committed since startup",
+    function=lambda: message_writer_stat("flushed_batches")
+)
+
+ESCALATION_PREFILTER = os.getenv("ESCALATION_PREFILTER", "true").lower() == "true"
+MAX_CONTEXT_MESSAGES = int(os.getenv("MAX_CONTEXT_MESSAGES", 14))
+HISTORY_PAGE_SIZE = int(os.getenv("HISTORY_PAGE_SIZE", 200))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 500))
+# POST /chat/batch runs next to interactive chat, so its jobs share a small
+# LLM budget of their own instead of BATCH_WORKERS each
+batch_http_slots = asyncio.Semaphore(int(os.getenv("BATCH_HTTP_MAX_IN_FLIGHT", 4)))
+# updated_at is rewritten at most this often per session; idle expiry
+# works in much larger units, so one UPDATE a minute is plenty
+SESSION_TOUCH_INTERVAL_SECONDS = float(os.getenv("SESSION_TOUCH_INTERVAL_SECONDS", 60))
 
 class ChatRequest(BaseModel):
     session_id: str
@@ -29,38 +112,69 @@ class ChatResponse(BaseModel):
     confidence: Optional[int] = None
     escalated: bool = False
     escalation_info: Optional[dict] = None
+    degraded: bool = False
+    suggestions: Optional[List[Dict]] = None
+    timings: Optional[Dict[str, float]] = None
 
-@router.post("/", response_model=ChatResponse)
-async def chat(
-    request: ChatRequest,
-    db: AsyncSession = Depends(get_db)
-):
-    """Main chat endpoint"""
+@dataclass
+class ChatTurn:
+    """Everything gathered for a message before its answer is generated"""
+    session: SessionState
+    recent_messages: List[Message]
+    conversation_history: List[Dict]
+    conversation_summary: Optional[str]
+    history_window_full: bool
+    message_count: int
+    user_message_count: int
+    faq_match: Optional[Dict]
+    faq_matched: bool
+    confidence: Optional[int]
+    # Answered without the LLM because of overload (see AdmissionController)
+    degraded: bool = False
+    suggestions: Optional[List[Dict]] = None
+
+def request_timer(http_request: Request) -> StageTimer:
+    """Per-request stage timer, feeding the stage histogram and Server-Timing"""
+    timer = StageTimer(CHAT_STAGE_SECONDS)
+    http_request.scope["stage_timer"] = timer
+    return timer
+
+def client_key(http_request: Request) -> str:
+    """Who a request is queued for by admission control"""
+    return http_request.client.host if http_request.client else "unknown"
+
+async def get_active_session(db: AsyncSession, session_id: str, timer: StageTimer) -> SessionState:
+    """Load a session's state (usually cached), rejecting unknown or closed ones"""
+    with timer.stage("session_lookup"):
+        session = await session_cache.get(db, session_id)
     
-    try:
-        # Verify session exists
-        result = await db.execute(
-            select(ChatSession).where(ChatSession.session_id == request.session_id)
-        )
-        session = result.scalar_one_or_none()
-        
-        if not session:
-            raise HTTPException(status_code=404, detail="Session not found")
-        
-        if not session.is_active:
-            raise HTTPException(status_code=400, detail="Session is closed")
-        
-        # Check if already escalated
-        if session.escalated:
-            return ChatResponse(
+    if not session:
+        raise HTTPException(status_code=404, detail="Session not found")
+    
+    if not session.is_active:
+        raise HTTPException(status_code=400, detail="Session is closed")
+
+    return session
+
+async def escalated_response(db: AsyncSession, session_id: str, timer: StageTimer) -> ChatResponse:
+    escalation_info = await escalation_service.get_escalation_status(db, session_id)
+    return ChatResponse(
+        session_id=session_id,
+        response=ESCALATED_MESSAGE,
+        faq_matched=False,
+        escalated=True,
+        escalation_info=escalation_info,
+        timings=timer.as_dict()
+    )
+
+async def save_user_message(db: AsyncSession, request: ChatRequest, timer: StageTimer) -> Message:
+    with timer.stage("save_user_message"):
+        if message_writer.enabled:
+            return message_writer.add(
                 session_id=request.session_id,
-                response="This conversation has been escalated to human support. A representative will contact you shortly.",
-                faq_matched=False,
-                escalated=True,
-                escalation_info=escalation_service.get_escalation_status(request.session_id)
+                role="user",
+                content=request.message
             )
-        
-        # Save user message
         user_msg = Message(
             session_id=request.session_id,
             role="user",
@@ -68,85 +182,313 @@ async def chat(
         )
         db.add(user_msg)
         await db.commit()
-        
-        # Get conversation history
+        return user_msg
+
+async def load_recent_messages(
+    db: AsyncSession,
+    session: SessionState,
+    timer: StageTimer
+) -> Tuple[List[Message], Dict[str, int]]:
+    """The conversation window after the rolling summary, and message counts by role"""
+    # Index range scan, newest first
+    with timer.stage("load_history"):
+        # Queued messages are merged with what the database already holds
+        queued = message_writer.snapshot(session.session_id)
+
+        count_result = await db.execute(
+            select(Message.role, func.count(), func.max(Message.timestamp))
+            .where(Message.session_id == session.session_id)
+            .group_by(Message.role)
+        )
+        role_rows = count_result.all()
+        role_counts = {role: count for role, count, _ in role_rows}
+        latest_flushed = max((latest for _, _, latest in role_rows), default=None)
+
+        history_query = select(Message).where(Message.session_id == session.session_id)
+        if session.summary_message_id is not None:
+            history_query = history_query.where(Message.id > session.summary_message_id)
+        if queued and latest_flushed is not None:
+            # Rows flushed after the counts were taken are still in the overlay
+            history_query = history_query.where(Message.timestamp <= latest_flushed)
         history_result = await db.execute(
-            select(Message)
-            .where(Message.session_id == request.session_id)
-            .order_by(Message.timestamp)
+            history_query
+            .order_by(Message.timestamp.desc(), Message.id.desc())
+            .limit(MAX_CONTEXT_MESSAGES + 1)
         )
-        all_messages = history_result.scalars().all()
-        
-        # Convert to format for LLM (exclude the just-added user message)
-        conversation_history = [
-            {"role": msg.role, "content": msg.content}
-            for msg in all_messages[:-1]  # Exclude last message (just added)
-        ]
-        
-        # Try FAQ matching first
-        faq_match = faq_service.find_matching_faq(request.message)
-        
-        if faq_match and faq_match.get('confidence', 0) > 70:
-            response_text = faq_match['answer']
-            faq_matched = True
-            confidence = faq_match['confidence']
+        recent_messages = list(reversed(history_result.scalars().all()))
+
+        for msg in message_writer.unflushed(queued, latest_flushed):
+            recent_messages.append(msg)
+            role_counts[msg.role] = role_counts.get(msg.role, 0) + 1
+        return recent_messages[-(MAX_CONTEXT_MESSAGES + 1):], role_counts
+
+def build_turn(
+    session: SessionState,
+    message: str,
+    recent_messages: List[Message],
+    role_counts: Dict[str, int],
+    timer: StageTimer
+) -> ChatTurn:
+    """Try the FAQ match for a message whose history is already loaded.
+
+    recent_messages ends with the message itself.
+    """
+    # Convert to format for LLM (exclude the just-added user message)
+    conversation_history = [
+        {"role": msg.role, "content": msg.content}
+        for msg in recent_messages[:-1]  # Exclude last message (just added)
+    ]
+    
+    # Try FAQ matching first
+    with timer.stage("faq_match"):
+        faq_match = faq_service.find_matching_faq(message)
+    
+    faq_matched = bool(faq_match and faq_match.get('confidence', 0) > 70)
+    FAQ_LOOKUPS.inc(result="hit" if faq_matched else "miss")
+
+    return ChatTurn(
+        session=session,
+        recent_messages=recent_messages,
+        conversation_history=conversation_history,
+        conversation_summary=session.summary,
+        history_window_full=len(recent_messages) > MAX_CONTEXT_MESSAGES,
+        message_count=sum(role_counts.values()),
+        user_message_count=role_counts.get("user", 0),
+        faq_match=faq_match,
+        faq_matched=faq_matched,
+        confidence=faq_match['confidence'] if faq_matched else None
+    )
+
+async def start_turn(
+    db: AsyncSession,
+    session: SessionState,
+    request: ChatRequest,
+    timer: StageTimer
+) -> ChatTurn:
+    """Persist the user message, load history and try the FAQ match"""
+    await save_user_message(db, request, timer)
+    recent_messages, role_counts = await load_recent_messages(db, session, timer)
+
+    # End the read transaction so no pooled connection is held while the
+    # turn waits for admission and the LLM; finish_turn checks one out again
+    await db.commit()
+
+    return build_turn(session, request.message, recent_messages, role_counts, timer)
+
+async def escalation_check(message: str, faq_matched: bool, attempt_count: int, use_llm: bool = True) -> Dict:
+    """Escalation check, asking the LLM only when the local classifier is unsure.
+
+    With use_llm=False (degraded mode) the classifier decides every
+    message, unsure ones by its probability alone.
+    """
+    if use_llm and not ESCALATION_PREFILTER:
+        return await llm_service.detect_escalation_need(message, attempt_count)
+
+    decision = escalation_classifier.classify(message, faq_matched)
+    if decision.needs_escalation is None:
+        if use_llm:
+            result = await llm_service.detect_escalation_need(message, attempt_count)
+            ESCALATION_DECISIONS.inc(source="llm", result=str(bool(result.get('needs_escalation'))).lower())
+            return result
+        decision.needs_escalation = decision.probability >= 0.5
+        decision.reason = f"Local classifier, LLM skipped under load (p={decision.probability:.2f})"
+
+    # The attempt threshold still applies to messages decided locally
+    result = await llm_service.detect_escalation_need(message, attempt_count, use_llm=False)
+    if not result['needs_escalation']:
+        result = {'needs_escalation': decision.needs_escalation, 'reason': decision.reason}
+    ESCALATION_DECISIONS.inc(source="local", result=str(result['needs_escalation']).lower())
+    return result
+
+def check_escalation(request: ChatRequest, turn: ChatTurn):
+    return escalation_check(
+        request.message, turn.faq_matched, turn.user_message_count, use_llm=not turn.degraded
+    )
+
+DEGRADED_MESSAGE = (
+    "We're experiencing very high demand, so I can only answer from our help "
+    "articles right now. These might help:"
+)
+DEGRADED_NO_MATCH_MESSAGE = (
+    "We're experiencing very high demand right now. Please try again in a few "
+    "minutes, or ask to speak to a human."
+)
+
+def degrade_turn(request: ChatRequest, turn: ChatTurn) -> str:
+    """Mark the turn as answered without the LLM and build its FAQ-only answer"""
+    turn.degraded = True
+    turn.suggestions = faq_service.suggest(request.message)
+    if not turn.suggestions:
+        return DEGRADED_NO_MATCH_MESSAGE
+    return DEGRADED_MESSAGE + "".join(
+        f"\n\n{idx}. {faq['question']}\n{faq['answer']}"
+        for idx, faq in enumerate(turn.suggestions, 1)
+    )
+
+batch_processor = BatchChatProcessor.from_env(
+    faq_service,
+    llm_service,
+    escalation_service,
+    escalation_check,
+    AsyncSessionLocal,
+    session_cache
+)
+
+async def finish_turn(
+    db: AsyncSession,
+    request: ChatRequest,
+    turn: ChatTurn,
+    response_text: str,
+    escalation_result: Dict,
+    timer: StageTimer
+) -> ChatResponse:
+    """Persist the answer, escalate if needed and build the response"""
+    
+    # Save assistant response
+    assistant_values = dict(
+        session_id=request.session_id,
+        role="assistant",
+        content=response_text,
+        faq_matched=turn.faq_matched,
+        confidence_score=turn.confidence
+    )
+    if message_writer.enabled:
+        message_writer.add(**assistant_values)
+    else:
+        db.add(Message(**assistant_values))
+    
+    escalation_info = None
+    if escalation_result.get('needs_escalation'):
+        # Summarize conversation, starting from the rolling summary if any
+        earlier = (
+            [{"role": "summary", "content": turn.conversation_summary}]
+            if turn.conversation_summary else []
+        )
+        if turn.degraded:
+            # No LLM under overload; the agent reads the transcript
+            summary = request.message
         else:
-            # Generate response using LLM with FAQ context
-            faq_context = faq_service.get_faq_context()
-            response_text = await llm_service.generate_response(
-                request.message,
-                conversation_history,
-                faq_context
+            summary = await timer.run(
+                "summarize",
+                llm_service.summarize_conversation(earlier + turn.conversation_history)
             )
-            faq_matched = False
-            confidence = None
         
-        # Save assistant response
-        assistant_msg = Message(
-            session_id=request.session_id,
-            role="assistant",
-            content=response_text,
-            faq_matched=faq_matched,
-            confidence_score=confidence
+        # Escalate
+        escalation_info = await escalation_service.escalate_session(
+            db,
+            request.session_id,
+            escalation_result.get('reason', 'User request'),
+            summary,
+            [{"content": msg.content, "role": msg.role} for msg in turn.recent_messages],
+            message_count=turn.message_count
         )
-        db.add(assistant_msg)
         
-        # Check for escalation need
-        user_message_count = sum(1 for msg in all_messages if msg.role == "user")
-        escalation_check = await llm_service.detect_escalation_need(
-            request.message,
-            user_message_count
+        # Update session
+        result = await db.execute(
+            update(ChatSession)
+            .where(ChatSession.session_id == request.session_id)
+            .values(
+                escalated=True,
+                escalation_reason=escalation_result.get('reason'),
+                state_version=func.coalesce(ChatSession.state_version, 0) + 1
+            )
+            .returning(ChatSession.state_version)
         )
+        escalated_version = result.scalar_one()
         
-        escalation_info = None
-        if escalation_check.get('needs_escalation'):
-            # Summarize conversation
-            summary = await llm_service.summarize_conversation(conversation_history)
-            
-            # Escalate
-            escalation_info = escalation_service.escalate_session(
-                request.session_id,
-                escalation_check.get('reason', 'User request'),
-                summary,
-                [{"content": msg.content, "role": msg.role} for msg in all_messages]
-            )
-            
-            # Update session
-            session.escalated = True
-            session.escalation_reason = escalation_check.get('reason')
-            
-            response_text += "\n\nI've escalated your query to our human support team who can better assist you. Your ticket ID is: " + escalation_info['ticket_id']
+        response_text += ESCALATION_NOTICE + escalation_info['ticket_id']
+    
+    # Record activity for idle expiry (the escalation UPDATE already did)
+    touched = escalation_info is not None or turn.session.idle_seconds() >= SESSION_TOUCH_INTERVAL_SECONDS
+    if touched and not escalation_info:
+        await db.execute(
+            update(ChatSession)
+            .where(ChatSession.session_id == request.session_id)
+            .values(updated_at=datetime.now(timezone.utc))
+        )
+
+    if touched or not message_writer.enabled:
+        with timer.stage("save_response"):
+            await db.commit()
+
+    # Write-through so the next turn needs no session lookup
+    session_cache.update(request.session_id, message_count=turn.message_count + 1)
+    if touched:
+        session_cache.update(request.session_id, updated_at=datetime.now(timezone.utc))
+    if escalation_info:
+        session_cache.update(request.session_id, escalated=True, version=escalated_version)
+
+    # Fold older turns into the rolling summary off the request path
+    unsummarized = turn.conversation_history + [
+        {"role": "user", "content": request.message},
+        {"role": "assistant", "content": response_text}
+    ]
+    if not turn.degraded and conversation_memory.needs_fold(unsummarized, turn.history_window_full):
+        conversation_memory.schedule_fold(request.session_id)
+    
+    return ChatResponse(
+        session_id=request.session_id,
+        response=response_text,
+        faq_matched=turn.faq_matched,
+        confidence=turn.confidence,
+        escalated=escalation_result.get('needs_escalation', False),
+        escalation_info=escalation_info,
+        degraded=turn.degraded,
+        suggestions=turn.suggestions,
+        timings=timer.as_dict()
+    )
+
+@router.post("/", response_model=ChatResponse)
+async def chat(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    timer: StageTimer = Depends(request_timer),
+    client: str = Depends(client_key)
+):
+    """Main chat endpoint"""
+
+    try:
+        session = await get_active_session(db, request.session_id, timer)
         
-        await db.commit()
+        # Check if already escalated
+        if session.escalated:
+            return await escalated_response(db, request.session_id, timer)
         
-        return ChatResponse(
-            session_id=request.session_id,
-            response=response_text,
-            faq_matched=faq_matched,
-            confidence=confidence,
-            escalated=escalation_check.get('needs_escalation', False),
-            escalation_info=escalation_info
-        )
+        turn = await start_turn(db, session, request, timer)
+
+        # Answer generation and the escalation check only depend on the
+        # message, history and FAQ result, so they run concurrently
+        if turn.faq_matched:
+            turn.degraded = admission.mode == "degraded"
+            response_text = turn.faq_match['answer']
+            escalation_result = await timer.run("escalation_check", check_escalation(request, turn))
+        else:
+            with timer.stage("admission"):
+                admitted = await admission.acquire(client)
+            try:
+                if admitted:
+                    # Generate response using LLM with the most relevant FAQs as context
+                    faq_context = faq_service.build_context(request.message)
+                    answer = llm_service.generate_response(
+                        request.message,
+                        turn.conversation_history,
+                        faq_context,
+                        turn.conversation_summary
+                    )
+                    response_text, escalation_result = await asyncio.gather(
+                        timer.run("generate_response", answer),
+                        timer.run("escalation_check", check_escalation(request, turn))
+                    )
+                else:
+                    response_text = degrade_turn(request, turn)
+                    escalation_result = await timer.run(
+                        "escalation_check", check_escalation(request, turn)
+                    )
+            finally:
+                if admitted:
+                    admission.release()
+        
+        return await finish_turn(db, request, turn, response_text, escalation_result, timer)
     
     except HTTPException:
         raise
@@ -159,29 +501,241 @@ async def chat(
             detail=f"An error occurred while processing your message: {str(e)}"
         )
 
+async def turn_events(
+    db: AsyncSession,
+    request: ChatRequest,
+    turn: ChatTurn,
+    timer: StageTimer,
+    client: str
+) -> AsyncIterator[Tuple[str, Dict]]:
+    """Answer a started turn as (event, data) pairs, for streaming transports.
+
+    Events: 'faq' (whole FAQ answer at once, also the FAQ-only answer
+    under overload, flagged 'degraded'), 'token' (LLM text chunks),
+    'done' (final ChatResponse, including escalation) and 'error'.
+    """
+    admitted = False
+    if turn.faq_matched:
+        turn.degraded = admission.mode == "degraded"
+    else:
+        with timer.stage("admission"):
+            admitted = await admission.acquire(client)
+    if not (turn.faq_matched or admitted):
+        response_text = degrade_turn(request, turn)
+
+    escalation = asyncio.create_task(
+        timer.run("escalation_check", check_escalation(request, turn))
+    )
+
+    try:
+        if turn.faq_matched:
+            response_text = turn.faq_match['answer']
+            yield "faq", {
+                "response": response_text,
+                "confidence": turn.confidence
+            }
+        elif not admitted:
+            yield "faq", {
+                "response": response_text,
+                "confidence": None,
+                "degraded": True,
+                "suggestions": turn.suggestions
+            }
+        else:
+            faq_context = faq_service.build_context(request.message)
+            chunks = []
+            with timer.stage("generate_response"):
+                async for chunk in llm_service.stream_response(
+                    request.message,
+                    turn.conversation_history,
+                    faq_context,
+                    turn.conversation_summary
+                ):
+                    if not chunks:
+                        timer.mark("first_token")
+                    chunks.append(chunk)
+                    yield "token", {"text": chunk}
+            response_text = "".join(chunks)
+
+        escalation_result = await escalation
+        response = await finish_turn(db, request, turn, response_text, escalation_result, timer)
+        yield "done", response.model_dump()
+
+    except Exception as e:
+        print(f"Error in chat stream: {str(e)}")
+        print(traceback.format_exc())
+        yield "error", {
+            "detail": f"An error occurred while processing your message: {str(e)}"
+        }
+    finally:
+        if admitted:
+            admission.release()
+        # The client may disconnect mid-stream
+        if not escalation.done():
+            escalation.cancel()
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@router.post("/stream")
+async def chat_stream(
+    request: ChatRequest,
+    db: AsyncSession = Depends(get_db),
+    timer: StageTimer = Depends(request_timer),
+    client: str = Depends(client_key)
+):
+    """Chat endpoint streaming the answer as Server-Sent Events.
+
+    One event per turn_events() pair. The assistant message is persisted
+    once, when the stream ends; a Server-Timing header only covers the
+    stages before the first byte.
+    """
+    session = await get_active_session(db, request.session_id, timer)
+
+    if session.escalated:
+        response = await escalated_response(db, request.session_id, timer)
+
+        async def escalated_events():
+            yield sse_event("done", response.model_dump())
+
+        return StreamingResponse(escalated_events(), media_type="text/event-stream")
+
+    turn = await start_turn(db, session, request, timer)
+
+    async def events():
+        async for event, data in turn_events(db, request, turn, timer, client):
+            yield sse_event(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """Response cache hit/miss counters"""
+    if response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **response_cache.stats()}
+
+def message_record(msg) -> Dict:
+    """JSON form of a message row; unflushed write-behind messages have no id yet"""
+    return {
+        "id": msg.id,
+        "role": msg.role,
+        "content": msg.content,
+        "timestamp": msg.timestamp.isoformat(),
+        "faq_matched": msg.faq_matched
+    }
+
 @router.get("/history/{session_id}")
 async def get_chat_history(
     session_id: str,
+    after_id: Optional[int] = None,
+    limit: int = Query(HISTORY_PAGE_SIZE, ge=1, le=1000),
     db: AsyncSession = Depends(get_db)
 ):
-    """Retrieve chat history for a session"""
+    """Retrieve chat history for a session, one page at a time.
+
+    Pages are keyed on message id: pass the returned next_after_id as
+    after_id until it is null. The last page also includes messages not
+    yet flushed by write-behind.
+    """
     
-    result = await db.execute(
-        select(Message)
-        .where(Message.session_id == session_id)
-        .order_by(Message.timestamp)
-    )
-    messages = result.scalars().all()
+    queued = message_writer.snapshot(session_id)
+    query = select(Message).where(Message.session_id == session_id)
+    if after_id is not None:
+        query = query.where(Message.id > after_id)
+    result = await db.execute(query.order_by(Message.id).limit(limit + 1))
+    messages = list(result.scalars().all())
+
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    next_after_id = messages[-1].id if has_more else None
+
+    if queued and not has_more:
+        if messages:
+            latest = messages[-1].timestamp
+        else:
+            latest_result = await db.execute(
+                select(func.max(Message.timestamp)).where(Message.session_id == session_id)
+            )
+            latest = latest_result.scalar_one()
+        messages += message_writer.unflushed(queued, latest)
     
     return {
         "session_id": session_id,
-        "messages": [
-            {
-                "role": msg.role,
-                "content": msg.content,
-                "timestamp": msg.timestamp.isoformat(),
-                "faq_matched": msg.faq_matched
-            }
-            for msg in messages
-        ]
+        "messages": [message_record(msg) for msg in messages],
+        "next_after_id": next_after_id
     }
+
+@router.get("/export", dependencies=[Depends(require_admin_token)])
+async def export_messages(
+    session_id: Optional[List[str]] = Query(None),
+    after_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_db)
+):
+    """Stream persisted messages of many (default: all) sessions as NDJSON.
+
+    Rows are read through a streaming cursor in batches of
+    EXPORT_BATCH_SIZE, so memory stays flat however large the export.
+    Each line carries its id; pass the last one as after_id to resume.
+    Requires X-Admin-Token.
+    """
+    query = select(Message.__table__)
+    if session_id:
+        query = query.where(Message.session_id.in_(session_id))
+    if after_id is not None:
+        query = query.where(Message.id > after_id)
+    query = query.order_by(Message.id).execution_options(yield_per=EXPORT_BATCH_SIZE)
+
+    async def lines():
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            yield "".join(
+                json.dumps({
+                    **message_record(row),
+                    "session_id": row.session_id,
+                    "confidence_score": row.confidence_score
+                }) + "\n"
+                for row in rows
+            )
+
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": 'attachment; filename="messages.ndjson"'}
+    )
+
+@router.post("/batch", dependencies=[Depends(require_admin_token)])
+async def chat_batch(http_request: Request, job_id: Optional[str] = None):
+    """Answer an NDJSON body of {"session_id", "message", "ref"} lines.
+
+    Results stream back as NDJSON, one line per non-blank input line,
+    ending with a {"job": ...} summary. Sending the same body again with the same
+    job_id resumes after the last committed chunk.
+    """
+    # Read before responding: once the response streams, Starlette's
+    # disconnect listener competes for the request body. Very large
+    # backlogs belong in batch_chat.py.
+    body = (await http_request.body()).decode("utf-8", errors="replace")
+
+    async def lines():
+        for line in body.splitlines():
+            yield line
+
+    async def results():
+        async for result in batch_processor.run(lines(), job_id, source="http", llm_slots=batch_http_slots):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+@router.get("/batch/{job_id}", dependencies=[Depends(require_admin_token)])
+async def get_batch_job(job_id: str):
+    """Progress and totals of a batch job"""
+    job = await batch_processor.job_status(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return job
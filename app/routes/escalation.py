@@ -0,0 +1,72 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic import BaseModel
+from typing import Optional
+
+from app.auth import require_admin_token
+from app.database import get_db
+from app.services.escalation import EscalationService, PRIORITY_RANKS, TICKET_STATUSES
+
+# Tickets lead to whole transcripts; only support agents may see or change them
+router = APIRouter(prefix="/escalations", tags=["escalations"], dependencies=[Depends(require_admin_token)])
+
+escalation_service = EscalationService()
+
+class DequeueRequest(BaseModel):
+    agent: str
+
+class StatusUpdate(BaseModel):
+    status: str
+
+@router.get("/")
+async def list_escalations(
+    status: Optional[str] = None,
+    priority: Optional[str] = None,
+    after_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: AsyncSession = Depends(get_db)
+):
+    """List escalation tickets, one page at a time.
+
+    Pass the returned next_after_id as after_id to fetch the next page.
+    """
+    if status and status not in TICKET_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {status}")
+    if priority and priority not in PRIORITY_RANKS:
+        raise HTTPException(status_code=400, detail=f"Unknown priority: {priority}")
+
+    return await escalation_service.list_tickets(
+        db, status=status, priority=priority, after_id=after_id, limit=limit
+    )
+
+@router.post("/next")
+async def dequeue_escalation(request: DequeueRequest, db: AsyncSession = Depends(get_db)):
+    """Assign the highest-priority, oldest pending ticket to an agent"""
+    ticket = await escalation_service.dequeue(db, request.agent)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="No pending escalations")
+    return ticket
+
+@router.get("/session/{session_id}")
+async def get_session_escalation(session_id: str, db: AsyncSession = Depends(get_db)):
+    """Get the latest escalation ticket of a session"""
+    return await escalation_service.get_escalation_status(db, session_id)
+
+@router.get("/{ticket_id}")
+async def get_escalation(ticket_id: str, db: AsyncSession = Depends(get_db)):
+    """Get an escalation ticket"""
+    ticket = await escalation_service.get_ticket(db, ticket_id)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket
+
+@router.patch("/{ticket_id}")
+async def update_escalation(ticket_id: str, update: StatusUpdate, db: AsyncSession = Depends(get_db)):
+    """Update the status of an escalation ticket"""
+    if update.status not in TICKET_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Unknown status: {update.status}")
+
+    ticket = await escalation_service.update_status(db, ticket_id, update.status)
+    if ticket is None:
+        raise HTTPException(status_code=404, detail="Ticket not found")
+    return ticket
@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import func, update
 from pydantic import BaseModel
 from typing import Optional
 import uuid
 from datetime import datetime
 
 from app.database import get_db
-from app.models import ChatSession, Message
+from app.models import ChatSession
+from app.routes.chat import message_writer, session_cache
+from app.services.session_cache import SessionState
 
 router = APIRouter(prefix="/session", tags=["session"])
 
@@ -27,12 +29,17 @@ async def create_session(db: AsyncSession = Depends(get_db)):
     new_session = ChatSession(
         session_id=session_id,
         is_active=True,
-        escalated=False
+        escalated=False,
+        state_version=0
     )
     
     db.add(new_session)
     await db.commit()
     await db.refresh(new_session)
+
+    state = SessionState.from_row(new_session)
+    state.message_count = 0
+    session_cache.put(state)
     
     return SessionResponse(
         session_id=session_id,
@@ -42,6 +49,11 @@ async def create_session(db: AsyncSession = Depends(get_db)):
         message_count=0
     )
 
+@router.get("/cache/stats")
+async def get_session_cache_stats():
+    """Session state cache hit/miss counters"""
+    return session_cache.stats()
+
 @router.get("/{session_id}", response_model=SessionResponse)
 async def get_session(
     session_id: str,
@@ -49,19 +61,14 @@ async def get_session(
 ):
     """Get session details"""
     
-    result = await db.execute(
-        select(ChatSession).where(ChatSession.session_id == session_id)
-    )
-    session = result.scalar_one_or_none()
+    queued = message_writer.snapshot(session_id)
+    session = await session_cache.get(db, session_id)
     
     if not session:
         raise HTTPException(status_code=404, detail="Session not found")
     
     # Count messages
-    msg_result = await db.execute(
-        select(Message).where(Message.session_id == session_id)
-    )
-    message_count = len(msg_result.scalars().all())
+    message_count = await session_cache.message_count(db, session, queued)
     
     return SessionResponse(
         session_id=session.session_id,
@@ -79,14 +86,20 @@ async def close_session(
     """Close a chat session"""
     
     result = await db.execute(
-        select(ChatSession).where(ChatSession.session_id == session_id)
+        update(ChatSession)
+        .where(ChatSession.session_id == session_id)
+        .values(
+            is_active=False,
+            state_version=func.coalesce(ChatSession.state_version, 0) + 1
+        )
+        .returning(ChatSession.state_version)
     )
-    session = result.scalar_one_or_none()
+    version = result.scalar_one_or_none()
     
-    if not session:
+    if version is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    session.is_active = False
     await db.commit()
+    session_cache.update(session_id, is_active=False, version=version)
     
     return {"message": "Session closed successfully", "session_id": session_id}
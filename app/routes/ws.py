@@ -0,0 +1,295 @@
+from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
+from collections import deque
+from typing import Dict, List
+import asyncio
+import json
+import os
+import traceback
+
+from app.database import AsyncSessionLocal
+from app.models import Message
+from app.routes.chat import (
+    MAX_CONTEXT_MESSAGES,
+    ChatRequest,
+    build_turn,
+    escalated_response,
+    get_active_session,
+    load_recent_messages,
+    save_user_message,
+    session_cache,
+    turn_events
+)
+from app.services.metrics import CHAT_STAGE_SECONDS, Counter, Gauge
+from app.services.session_cache import SessionState
+from app.services.timing import StageTimer
+
+router = APIRouter(prefix="/ws", tags=["websocket"])
+
+# The server pings every WS_HEARTBEAT_SECONDS; a client silent for three
+# intervals is disconnected
+WS_HEARTBEAT_SECONDS = float(os.getenv("WS_HEARTBEAT_SECONDS", 20))
+# Messages a client may send ahead of the turn being answered
+WS_MAX_PENDING_MESSAGES = int(os.getenv("WS_MAX_PENDING_MESSAGES", 4))
+# Frames buffered for a slow reader before token generation waits on it
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 64))
+# A client that takes longer than this to accept one frame is disconnected
+WS_SEND_TIMEOUT_SECONDS = float(os.getenv("WS_SEND_TIMEOUT_SECONDS", 10))
+
+# Close codes in the 4000-4999 range reserved for applications
+CLOSE_SESSION_NOT_FOUND = 4404
+CLOSE_SESSION_CLOSED = 4400
+CLOSE_HEARTBEAT_TIMEOUT = 4408
+
+WS_CONNECTIONS = Gauge("ws_connections", "Open /ws/chat connections")
+WS_FRAMES = Counter("ws_frames_total", "WebSocket chat frames by direction and type", ["direction", "type"])
+
+class ChatConnection:
+    """One /ws/chat socket and the session state it keeps between turns.
+
+    The history window is loaded once, at connect; afterwards each turn
+    re-checks the session (usually from the session cache) and only
+    writes its messages. Four tasks
+    share the socket: the receiver reads client frames into a bounded
+    inbox, the turn loop answers them one at a time, the writer sends
+    frames from a bounded outbox (merging queued tokens while the client
+    lags) and the heartbeat pings the client and drops it when silent.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        db,
+        session: SessionState,
+        recent_messages: List[Message],
+        role_counts: Dict[str, int]
+    ):
+        self.websocket = websocket
+        self.db = db
+        self.session = session
+        self.history = deque(recent_messages, maxlen=MAX_CONTEXT_MESSAGES + 1)
+        self.role_counts = role_counts
+        self.client = websocket.client.host if websocket.client else "unknown"
+
+        self.inbox: asyncio.Queue = asyncio.Queue(WS_MAX_PENDING_MESSAGES)
+        self.outbox: asyncio.Queue = asyncio.Queue(WS_SEND_QUEUE_SIZE)
+        self.last_received = asyncio.get_running_loop().time()
+        self.answering = False
+        self.closed = False
+        self.close_code = 1000
+
+    async def send(self, frame: Dict):
+        """Queue a frame; waits while the outbox is full (backpressure)"""
+        if not self.closed:
+            await self.outbox.put(frame)
+
+    async def write(self):
+        while True:
+            frames = [await self.outbox.get()]
+            while not self.outbox.empty():
+                frames.append(self.outbox.get_nowait())
+
+            # Tokens that queued up behind a slow reader go out as one frame;
+            # None (see close_after_sending) ends the connection
+            merged: List[Dict] = []
+            closing = False
+            for frame in frames:
+                if frame is None:
+                    closing = True
+                    break
+                if frame["type"] == "token" and merged and merged[-1]["type"] == "token":
+                    merged[-1] = {"type": "token", "text": merged[-1]["text"] + frame["text"]}
+                else:
+                    merged.append(frame)
+
+            for frame in merged:
+                await asyncio.wait_for(self.websocket.send_text(json.dumps(frame)), WS_SEND_TIMEOUT_SECONDS)
+                WS_FRAMES.inc(direction="out", type=frame["type"])
+            if closing:
+                return
+
+    async def close_after_sending(self, code: int):
+        """Close the socket once the frames queued so far are sent"""
+        self.close_code = code
+        await self.outbox.put(None)
+
+    async def receive(self):
+        while True:
+            text = await self.websocket.receive_text()
+            self.last_received = asyncio.get_running_loop().time()
+            try:
+                frame = json.loads(text)
+                frame_type = frame.get("type")
+            except (ValueError, AttributeError):
+                await self.send({"type": "error", "detail": "Frames must be JSON objects"})
+                continue
+            WS_FRAMES.inc(direction="in", type=str(frame_type))
+
+            if frame_type == "ping":
+                await self.send({"type": "pong"})
+            elif frame_type == "message":
+                message = frame.get("message")
+                if not isinstance(message, str) or not message.strip():
+                    await self.send({"type": "error", "detail": "Expected a non-empty 'message'"})
+                elif self.inbox.full():
+                    await self.send({
+                        "type": "error",
+                        "code": "busy",
+                        "detail": "Too many messages waiting for an answer"
+                    })
+                else:
+                    self.inbox.put_nowait(message)
+            elif frame_type != "pong":
+                await self.send({"type": "error", "detail": f"Unknown frame type: {frame_type}"})
+
+    async def heartbeat(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_SECONDS)
+            if loop.time() - self.last_received > 3 * WS_HEARTBEAT_SECONDS:
+                self.close_code = CLOSE_HEARTBEAT_TIMEOUT
+                return
+            await self.send({"type": "ping"})
+
+    async def answer_messages(self):
+        while not self.closed:
+            message = await self.inbox.get()
+            self.answering = True
+            try:
+                await self.answer(message)
+            except HTTPException as e:
+                # Closed or expired since the socket connected
+                await self.send({"type": "error", "detail": e.detail})
+                await self.close_after_sending(session_close_code(e))
+                return
+            except Exception as e:
+                print(f"Error in chat socket: {str(e)}")
+                print(traceback.format_exc())
+                # The session is reused by the next turn
+                await self.db.rollback()
+                await self.send({
+                    "type": "error",
+                    "detail": f"An error occurred while processing your message: {str(e)}"
+                })
+            finally:
+                self.answering = False
+
+    async def refresh_window(self, timer: StageTimer):
+        """Reload the session, so escalation or closing elsewhere (another
+        tab, HTTP) applies to the next turn, and reload the window once a
+        summary fold has moved the summary point.
+
+        Raises HTTPException when the session was closed or expired since
+        the last turn (a cache lookup, usually without a query).
+        """
+        previous = self.session
+        self.session = await get_active_session(self.db, previous.session_id, timer)
+        if self.session.summary_message_id != previous.summary_message_id:
+            recent_messages, self.role_counts = await load_recent_messages(self.db, self.session, timer)
+            self.history = deque(recent_messages, maxlen=MAX_CONTEXT_MESSAGES + 1)
+        await self.db.commit()
+
+    async def answer(self, message: str):
+        timer = StageTimer(CHAT_STAGE_SECONDS)
+        request = ChatRequest(session_id=self.session.session_id, message=message)
+        await self.refresh_window(timer)
+
+        if self.session.escalated:
+            response = await escalated_response(self.db, request.session_id, timer)
+            await self.db.commit()
+            await self.send({"type": "done", **response.model_dump()})
+            return
+
+        self.history.append(await save_user_message(self.db, request, timer))
+        self.role_counts["user"] = self.role_counts.get("user", 0) + 1
+        turn = build_turn(self.session, message, list(self.history), dict(self.role_counts), timer)
+
+        async for event, data in turn_events(self.db, request, turn, timer, self.client):
+            if event == "error":
+                # A failed flush or commit would otherwise fail every later turn
+                await self.db.rollback()
+            elif event == "done":
+                self.history.append(Message(
+                    session_id=request.session_id,
+                    role="assistant",
+                    content=data["response"]
+                ))
+                self.role_counts["assistant"] = self.role_counts.get("assistant", 0) + 1
+                if data["escalated"]:
+                    await self.send({"type": "escalation", **data["escalation_info"]})
+            await self.send({"type": event, **data})
+
+    async def run(self):
+        WS_CONNECTIONS.inc()
+        tasks = [
+            asyncio.create_task(self.receive()),
+            asyncio.create_task(self.write()),
+            asyncio.create_task(self.heartbeat())
+        ]
+        turns = asyncio.create_task(self.answer_messages())
+        try:
+            await self.send({
+                "type": "ready",
+                "session_id": self.session.session_id,
+                "escalated": self.session.escalated,
+                "message_count": sum(self.role_counts.values()),
+                "heartbeat_seconds": WS_HEARTBEAT_SECONDS
+            })
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                error = task.exception()
+                if isinstance(error, asyncio.TimeoutError):
+                    print(f"Closing chat socket for {self.session.session_id}: client too slow to read")
+                    self.close_code = 1008
+                elif error is not None and not isinstance(error, WebSocketDisconnect):
+                    print(f"Error in chat socket: {str(error)}")
+        finally:
+            self.closed = True
+            for task in tasks:
+                task.cancel()
+            # Unblock a turn waiting on the outbox; its remaining frames are dropped
+            while not self.outbox.empty():
+                self.outbox.get_nowait()
+            # A turn in progress still finishes, so its answer is stored
+            if not self.answering:
+                turns.cancel()
+            await asyncio.gather(*tasks, turns, return_exceptions=True)
+            WS_CONNECTIONS.dec()
+
+        try:
+            await self.websocket.close(code=self.close_code)
+        except (RuntimeError, WebSocketDisconnect):
+            # Already closed by the client
+            pass
+
+def session_close_code(error: HTTPException) -> int:
+    return CLOSE_SESSION_NOT_FOUND if error.status_code == 404 else CLOSE_SESSION_CLOSED
+
+async def reject(websocket: WebSocket, error: HTTPException):
+    """Tell the client why before closing, so it does not retry over HTTP"""
+    await websocket.send_text(json.dumps({"type": "error", "detail": error.detail}))
+    await websocket.close(code=session_close_code(error))
+
+@router.websocket("/chat/{session_id}")
+async def chat_socket(websocket: WebSocket, session_id: str):
+    """Chat over one WebSocket per session.
+
+    Client frames: {"type": "message", "message": ...}, {"type": "ping"}
+    and {"type": "pong"} (answer to the server's heartbeat ping).
+    Server frames: 'ready', then per message the /chat/stream events as
+    {"type": "faq" | "token" | "done" | "error", ...}, plus 'escalation'
+    (the ticket) just before the 'done' of an escalating turn, 'ping'
+    and 'pong'. A session that is unknown or closed (at connect or by a
+    later message) gets an 'error' frame and close code 4404 or 4400.
+    """
+    await websocket.accept()
+    async with AsyncSessionLocal() as db:
+        timer = StageTimer(CHAT_STAGE_SECONDS)
+        try:
+            session = await get_active_session(db, session_id, timer)
+        except HTTPException as e:
+            await reject(websocket, e)
+            return
+
+        recent_messages, role_counts = await load_recent_messages(db, session, timer)
+        await db.commit()
+        await ChatConnection(websocket, db, session, recent_messages, role_counts).run()
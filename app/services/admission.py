@@ -0,0 +1,198 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+from app.services.metrics import ADMISSION_DECISIONS
+
+class AdmissionController:
+    """Bounds the chat turns waiting on the LLM and degrades under overload.
+
+    At most `capacity` turns generate an LLM answer at once. Further turns
+    wait in per-client queues that are served round-robin, so one client
+    sending a burst cannot starve the others; a client with
+    max_queue_per_client turns waiting (or a full queue) is shed, and a
+    turn that waits longer than max_wait gives up. Shed turns are answered
+    from the FAQs.
+
+    When the queue reaches degrade_queue_depth or turns wait
+    degrade_delay on average, the controller switches to degraded mode:
+    every turn is answered from the FAQs without any LLM call until the
+    backlog has drained and degraded_hold seconds have passed.
+    """
+
+    # Weight of the latest wait in the queueing delay average
+    delay_smoothing = 0.2
+
+    def __init__(
+        self,
+        capacity: int = 32,
+        max_queue: int = 256,
+        max_queue_per_client: int = 4,
+        max_wait: float = 5.0,
+        degrade_queue_depth: int = 128,
+        degrade_delay: float = 2.0,
+        degraded_hold: float = 10.0
+    ):
+        self.capacity = capacity
+        self.max_queue = max_queue
+        self.max_queue_per_client = max_queue_per_client
+        self.max_wait = max_wait
+        self.degrade_queue_depth = degrade_queue_depth
+        self.degrade_delay = degrade_delay
+        self.degraded_hold = degraded_hold
+
+        self.in_flight = 0
+        self.queued = 0
+        # client -> its waiters (future, enqueue time); order is the round-robin turn
+        self._queues: "OrderedDict[str, Deque[Tuple[asyncio.Future, float]]]" = OrderedDict()
+        self.queue_delay = 0.0
+        self.degraded = False
+        self._degraded_since = 0.0
+        self.degraded_count = 0
+
+    @classmethod
+    def from_env(cls, capacity: Optional[int] = None) -> "AdmissionController":
+        return cls(
+            capacity=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", capacity or 32)),
+            max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", 256)),
+            max_queue_per_client=int(os.getenv("ADMISSION_MAX_QUEUE_PER_CLIENT", 4)),
+            max_wait=int(os.getenv("ADMISSION_MAX_WAIT_MS", 5000)) / 1000,
+            degrade_queue_depth=int(os.getenv("ADMISSION_DEGRADE_QUEUE_DEPTH", 128)),
+            degrade_delay=int(os.getenv("ADMISSION_DEGRADE_DELAY_MS", 2000)) / 1000,
+            degraded_hold=float(os.getenv("ADMISSION_DEGRADED_HOLD_SECONDS", 10))
+        )
+
+    @property
+    def mode(self) -> str:
+        self._update_mode()
+        return "degraded" if self.degraded else "normal"
+
+    def oldest_wait(self) -> float:
+        now = time.monotonic()
+        return max((now - waiters[0][1] for waiters in self._queues.values() if waiters), default=0.0)
+
+    def stats(self) -> Dict:
+        return {
+            "mode": self.mode,
+            "in_flight": self.in_flight,
+            "capacity": self.capacity,
+            "queue_depth": self.queued,
+            "queued_clients": len(self._queues),
+            "queue_delay_ms": round(max(self.queue_delay, self.oldest_wait()) * 1000, 1)
+        }
+
+    def _record_wait(self, seconds: float):
+        self.queue_delay += self.delay_smoothing * (seconds - self.queue_delay)
+
+    def _update_mode(self):
+        if not self.degraded:
+            # A stuck queue raises no wait samples, so its head's age counts too
+            delay = max(self.queue_delay, self.oldest_wait())
+            if self.queued >= self.degrade_queue_depth or delay >= self.degrade_delay:
+                self.degraded = True
+                self._degraded_since = time.monotonic()
+                self.degraded_count += 1
+                print(f"⚠️ Overloaded ({self.queued} queued, {delay * 1000:.0f} ms delay): answering from FAQs only")
+                # Waiting turns are answered from the FAQs right away
+                self._drain(False)
+        elif (
+            self.queued == 0
+            and self.in_flight < self.capacity
+            and time.monotonic() - self._degraded_since >= self.degraded_hold
+        ):
+            self.degraded = False
+            self.queue_delay = 0.0
+            print("✓ Load back to normal: LLM answers resumed")
+
+    def _drain(self, admitted: bool):
+        for waiters in self._queues.values():
+            for future, _ in waiters:
+                if not future.done():
+                    future.set_result(admitted)
+        self._queues.clear()
+        self.queued = 0
+
+    def _dispatch(self):
+        """Hand free slots to waiting turns, one client at a time"""
+        now = time.monotonic()
+        while self.in_flight < self.capacity and self._queues:
+            client, waiters = self._queues.popitem(last=False)
+            future, enqueued = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._queues[client] = waiters
+            if future.done():
+                continue
+            self.in_flight += 1
+            self._record_wait(now - enqueued)
+            future.set_result(True)
+
+    def _dequeue(self, client: str, future: asyncio.Future):
+        waiters = self._queues.get(client)
+        if not waiters:
+            return
+        for entry in waiters:
+            if entry[0] is future:
+                waiters.remove(entry)
+                self.queued -= 1
+                break
+        if not waiters:
+            del self._queues[client]
+
+    async def acquire(self, client: str) -> bool:
+        """Wait for an LLM slot; False means answer from the FAQs instead.
+
+        A True result must be paired with release().
+        """
+        self._update_mode()
+        if self.degraded:
+            ADMISSION_DECISIONS.inc(result="degraded")
+            return False
+
+        if self.in_flight < self.capacity and not self._queues:
+            self.in_flight += 1
+            self._record_wait(0.0)
+            ADMISSION_DECISIONS.inc(result="admitted")
+            return True
+
+        waiters = self._queues.get(client)
+        if self.queued >= self.max_queue or (waiters and len(waiters) >= self.max_queue_per_client):
+            ADMISSION_DECISIONS.inc(result="shed")
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        if waiters is None:
+            waiters = self._queues[client] = deque()
+        waiters.append((future, time.monotonic()))
+        self.queued += 1
+        self._update_mode()
+
+        try:
+            admitted = await asyncio.wait_for(asyncio.shield(future), self.max_wait)
+        except asyncio.TimeoutError:
+            if future.done() and future.result():
+                # Granted just as the wait ran out
+                ADMISSION_DECISIONS.inc(result="queued")
+                return True
+            self._dequeue(client, future)
+            self._record_wait(self.max_wait)
+            self._update_mode()
+            ADMISSION_DECISIONS.inc(result="timeout")
+            return False
+        except asyncio.CancelledError:
+            # Client went away; hand back a slot granted in the meantime
+            if future.done() and not future.cancelled() and future.result():
+                self.release()
+            else:
+                self._dequeue(client, future)
+            raise
+
+        ADMISSION_DECISIONS.inc(result="queued" if admitted else "degraded")
+        return admitted
+
+    def release(self):
+        self.in_flight -= 1
+        self._dispatch()
+        self._update_mode()
@@ -0,0 +1,389 @@
+"""Build and serve the chat UI's static assets.
+
+build() minifies frontend/, writes content-hashed copies plus gzip and
+brotli variants to frontend/dist and records them in manifest.json.
+StaticAssets serves that build from memory: the smallest variant the
+client accepts, a strong ETag per variant, 304 for matching
+If-None-Match, and a year of immutable caching for hashed names.
+
+    python -m app.services.assets    # build (also done at startup when stale)
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from starlette.requests import Request
+from starlette.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+MANIFEST_NAME = "manifest.json"
+IMMUTABLE = "public, max-age=31536000, immutable"
+# Entry points and unhashed names are revalidated on every use
+REVALIDATE = "no-cache"
+# Preferred first when the client accepts several equally
+ENCODINGS = ("br", "gzip")
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+# Strings, template literals and comments, which the minifiers keep or drop whole
+_CSS_TOKENS = re.compile(r'"(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\'|/\*.*?\*/', re.S)
+_JS_TOKENS = re.compile(
+    r'"(?:\\.|[^"\\\n])*"|\'(?:\\.|[^\'\\\n])*\'|`(?:\\.|[^`\\])*`|/\*.*?\*/|//[^\n]*', re.S
+)
+# A slash after one of these (or at the start) opens a regex literal, not a division
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^\n")
+_REGEX_LITERAL = re.compile(r'/(?:\\.|\[(?:\\.|[^\]\\])*\]|[^/\\\n\[])+/[a-z]*')
+_HTML_RAW = re.compile(r'(<(pre|textarea|script|style)\b.*?</\2>)', re.S | re.I)
+
+def _squeeze(code: str) -> str:
+    """Runs of whitespace become one newline (if they had one) or one space"""
+    return re.sub(r'\s+', lambda m: "\n" if "\n" in m.group(0) else " ", code)
+
+def minify_css(source: str) -> str:
+    parts = []
+    code = ""
+    position = 0
+    for match in _CSS_TOKENS.finditer(source):
+        # Code on both sides of a comment is minified as one run
+        code += source[position:match.start()] + " "
+        if not match.group(0).startswith("/*"):
+            parts += [_minify_css_code(code[:-1]), match.group(0)]
+            code = ""
+        position = match.end()
+    parts.append(_minify_css_code(code + source[position:]))
+    return "".join(parts).strip()
+
+def _minify_css_code(code: str) -> str:
+    code = re.sub(r'\s+', " ", code)
+    # Not around ':', where a space can be a descendant combinator (a :hover)
+    code = re.sub(r'\s*([{};,>])\s*', r'\1', code)
+    code = re.sub(r':\s+', ":", code)
+    return code.replace(";}", "}")
+
+def minify_js(source: str) -> str:
+    """Drop comments and indentation, keeping line breaks for ASI.
+
+    Strings, template literals and regex literals are copied verbatim.
+    """
+    parts: List[str] = []
+    position = 0
+    code_start = 0
+
+    def previous_significant() -> str:
+        text = "".join(parts[-2:]) + source[code_start:position]
+        stripped = text.rstrip(" \t")
+        return stripped[-1] if stripped else "\n"
+
+    while position < len(source):
+        char = source[position]
+        match = None
+        if char in "\"'`" or source.startswith(("//", "/*"), position):
+            match = _JS_TOKENS.match(source, position)
+        elif char == "/" and previous_significant() in _REGEX_PRECEDERS:
+            match = _REGEX_LITERAL.match(source, position)
+        if match is None:
+            position += 1
+            continue
+
+        parts.append(_squeeze(source[code_start:position]))
+        token = match.group(0)
+        if token.startswith("//"):
+            pass
+        elif token.startswith("/*"):
+            parts.append(" ")
+        else:
+            parts.append(token)
+        position = code_start = match.end()
+
+    parts.append(_squeeze(source[code_start:]))
+    lines = (line.strip() for line in "".join(parts).split("\n"))
+    return "\n".join(line for line in lines if line)
+
+def minify_html(source: str) -> str:
+    """Drop comments and collapse whitespace outside pre/textarea/script/style"""
+    parts = []
+    for index, chunk in enumerate(_HTML_RAW.split(source)):
+        if index % 3 == 1:
+            parts.append(chunk)
+        elif index % 3 == 0:
+            chunk = re.sub(r'<!--(?!\[if).*?-->', "", chunk, flags=re.S)
+            parts.append(_squeeze(chunk))
+    return "".join(parts).strip()
+
+MINIFIERS = {".css": minify_css, ".js": minify_js, ".html": minify_html}
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+def _compress(data: bytes) -> Dict[str, bytes]:
+    """Encoded variants worth serving (smaller than the original)"""
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in variants.items() if len(body) < len(data)}
+
+def _sources(source_dir: Path, output_dir: Path) -> List[Path]:
+    return sorted(
+        path for path in source_dir.rglob("*")
+        if path.is_file() and output_dir not in path.parents and not path.name.startswith(".")
+    )
+
+def sources_digest(source_dir: str, output_dir: str) -> str:
+    """Hash over the source files, to tell whether a build is stale"""
+    source, output = Path(source_dir), Path(output_dir)
+    digest = hashlib.sha256()
+    for path in _sources(source, output):
+        digest.update(path.relative_to(source).as_posix().encode("utf-8"))
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+def build(source_dir: str = "frontend", output_dir: Optional[str] = None, entry_points=("index.html",)) -> Dict:
+    """Minify, fingerprint and precompress every file in source_dir.
+
+    Entry points keep their name, since they are what users request;
+    their references to other assets are rewritten to the hashed names.
+    Returns the manifest, which is also written to output_dir.
+    """
+    source = Path(source_dir)
+    output = Path(output_dir or source / "dist")
+    output.mkdir(parents=True, exist_ok=True)
+
+    minified: Dict[str, bytes] = {}
+    for path in _sources(source, output):
+        name = path.relative_to(source).as_posix()
+        minify = MINIFIERS.get(path.suffix)
+        minified[name] = minify(path.read_text(encoding="utf-8")).encode("utf-8") if minify else path.read_bytes()
+
+    # Hash the leaves first, then rewrite references in the entry points
+    files: Dict[str, Dict] = {}
+    for name in sorted(minified, key=lambda name: name in entry_points):
+        data = minified[name]
+        if name in entry_points:
+            text = data.decode("utf-8")
+            for logical, entry in files.items():
+                text = text.replace(f"/static/{logical}", f"/static/{entry['file']}")
+            data = text.encode("utf-8")
+            file_name = name
+        else:
+            stem, dot, suffix = name.rpartition(".")
+            file_name = f"{stem}.{content_hash(data)}.{suffix}" if dot else f"{name}.{content_hash(data)}"
+
+        target = output / file_name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        encodings = {}
+        for encoding, body in _compress(data).items():
+            Path(str(target) + SUFFIXES[encoding]).write_bytes(body)
+            encodings[encoding] = len(body)
+
+        files[name] = {
+            "file": file_name,
+            "hash": content_hash(data),
+            "size": len(data),
+            "source_size": (source / name).stat().st_size,
+            "encodings": encodings,
+            "immutable": name not in entry_points
+        }
+
+    manifest = {"sources_digest": sources_digest(source_dir, str(output)), "files": files}
+    (output / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    _remove_stale(output, manifest)
+    return manifest
+
+def _remove_stale(output: Path, manifest: Dict):
+    keep = {MANIFEST_NAME}
+    for entry in manifest["files"].values():
+        keep.add(entry["file"])
+        keep.update(entry["file"] + SUFFIXES[encoding] for encoding in entry["encodings"])
+    for path in output.rglob("*"):
+        if path.is_file() and path.relative_to(output).as_posix() not in keep:
+            path.unlink()
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Accept-Encoding as {coding: q}; '*' covers codings not listed"""
+    accepted: Dict[str, float] = {}
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[coding.strip().lower()] = q
+    return accepted
+
+class Asset:
+    """One built file and its encoded variants, held in memory"""
+
+    def __init__(self, file: str, media_type: str, cache_control: str, variants: Dict[str, bytes], hash: str):
+        self.file = file
+        self.media_type = media_type
+        self.cache_control = cache_control
+        # encoding ("identity", "gzip", "br") -> body
+        self.variants = variants
+        self.hash = hash
+
+    def etag(self, encoding: str) -> str:
+        # Strong validators must differ between encodings of a resource
+        return f'"{self.hash}"' if encoding == "identity" else f'"{self.hash}-{encoding}"'
+
+    def choose(self, accept_encoding: Optional[str]) -> str:
+        accepted = accepted_encodings(accept_encoding)
+        default = accepted.get("*", 0.0)
+        best, best_q = "identity", 0.0
+        for encoding in ENCODINGS:
+            q = accepted.get(encoding, default)
+            if encoding in self.variants and q > best_q:
+                best, best_q = encoding, q
+        return best
+
+class StaticAssets:
+    """ASGI app serving a build() from memory.
+
+    Hashed names are cached for a year; logical names (e.g. app.js, for
+    pages rendered before a deploy) and entry points are served with
+    no-cache, so browsers revalidate them with their ETag.
+    """
+
+    def __init__(
+        self,
+        source_dir: str = "frontend",
+        output_dir: Optional[str] = None,
+        auto_build: bool = True,
+        fallback=None
+    ):
+        self.source_dir = source_dir
+        self.output_dir = output_dir or os.path.join(source_dir, "dist")
+        self.auto_build = auto_build
+        # ASGI app serving the unbuilt sources while there is no build
+        self.fallback = fallback
+        self.assets: Dict[str, Asset] = {}
+
+    @classmethod
+    def from_env(cls, source_dir: str = "frontend", fallback=None) -> "StaticAssets":
+        return cls(
+            source_dir,
+            os.getenv("ASSETS_DIR"),
+            os.getenv("ASSETS_AUTO_BUILD", "true").lower() == "true",
+            fallback
+        )
+
+    @property
+    def loaded(self) -> bool:
+        return bool(self.assets)
+
+    def prepare(self):
+        """Build if the sources changed since the last build, then load it"""
+        manifest_path = os.path.join(self.output_dir, MANIFEST_NAME)
+        manifest = None
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+        if self.auto_build and (
+            manifest is None or manifest.get("sources_digest") != sources_digest(self.source_dir, self.output_dir)
+        ):
+            manifest = build(self.source_dir, self.output_dir)
+            if brotli is None:
+                print("brotli is not installed; static assets are precompressed with gzip only")
+            print(f"✓ Static assets built into {self.output_dir}")
+        if manifest is None:
+            print(f"No static asset build in {self.output_dir}; run python -m app.services.assets")
+            return
+        self.load(manifest)
+
+    def load(self, manifest: Dict):
+        assets: Dict[str, Asset] = {}
+        for name, entry in manifest["files"].items():
+            path = os.path.join(self.output_dir, entry["file"])
+            variants = {"identity": Path(path).read_bytes()}
+            for encoding in entry["encodings"]:
+                variants[encoding] = Path(path + SUFFIXES[encoding]).read_bytes()
+            media_type = mimetypes.guess_type(name)[0] or "application/octet-stream"
+            if media_type.startswith("text/") or media_type in ("application/javascript", "application/json"):
+                media_type += "; charset=utf-8"
+
+            revalidated = Asset(entry["file"], media_type, REVALIDATE, variants, entry["hash"])
+            assets[name] = revalidated
+            if entry["immutable"]:
+                assets[entry["file"]] = Asset(entry["file"], media_type, IMMUTABLE, variants, entry["hash"])
+        self.assets = assets
+
+    def response(self, request: Request, name: str) -> Response:
+        asset = self.assets.get(name)
+        if asset is None:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+
+        encoding = asset.choose(request.headers.get("accept-encoding"))
+        headers = {
+            "ETag": asset.etag(encoding),
+            "Cache-Control": asset.cache_control,
+            "Vary": "Accept-Encoding"
+        }
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and self._matches(if_none_match, asset, encoding):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        body = asset.variants[encoding]
+        if request.method == "HEAD":
+            headers["Content-Length"] = str(len(body))
+            return Response(status_code=200, headers=headers, media_type=asset.media_type)
+        return Response(body, headers=headers, media_type=asset.media_type)
+
+    @staticmethod
+    def _matches(if_none_match: str, asset: Asset, encoding: str) -> bool:
+        if if_none_match.strip() == "*":
+            return True
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return asset.etag(encoding) in tags
+
+    async def __call__(self, scope, receive, send):
+        if not self.assets and self.fallback is not None:
+            await self.fallback(scope, receive, send)
+            return
+        request = Request(scope, receive)
+        if request.method not in ("GET", "HEAD"):
+            response = Response(status_code=405, headers={"Allow": "GET, HEAD"})
+        else:
+            response = self.response(request, scope["path"].removeprefix(scope.get("root_path", "")).lstrip("/"))
+        await response(scope, receive, send)
+
+def _format_table(manifest: Dict) -> Tuple[List[str], int, int]:
+    rows = []
+    total_source = total_best = 0
+    for name, entry in manifest["files"].items():
+        best = min([entry["size"], *entry["encodings"].values()])
+        total_source += entry["source_size"]
+        total_best += best
+        encodings = " ".join(f"{encoding}={size}" for encoding, size in entry["encodings"].items())
+        rows.append(f"  {entry['file']:<32} {entry['source_size']:>8} -> {entry['size']:>8}  {encodings}")
+    return rows, total_source, total_best
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the chat UI's static assets")
+    parser.add_argument("--source", default="frontend")
+    parser.add_argument("--output", default=os.getenv("ASSETS_DIR"), help="default: <source>/dist")
+    args = parser.parse_args()
+
+    manifest = build(args.source, args.output)
+    rows, total_source, total_best = _format_table(manifest)
+    print("\n".join(rows))
+    if brotli is None:
+        print("brotli is not installed (uv sync --extra assets); gzip variants only")
+    print(f"✓ {total_source} source bytes -> {total_best} bytes over the wire")
@@ -0,0 +1,387 @@
+import asyncio
+import json
+import os
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from sqlalchemy import bindparam, func, insert, select, update
+
+from app.models import BatchJob, ChatSession, Message
+from app.services.escalation import ESCALATED_MESSAGE, ESCALATION_NOTICE
+
+ChunkCallback = Callable[[List[Dict]], Awaitable[None]]
+
+@dataclass
+class BatchItem:
+    line: int
+    session_id: Optional[str] = None
+    message: Optional[str] = None
+    # Caller's own identifier (e.g. an email id), echoed in the result
+    ref: Optional[object] = None
+    error: Optional[str] = None
+    response: Optional[str] = None
+    faq_matched: bool = False
+    confidence: Optional[int] = None
+    escalation: Dict = field(default_factory=dict)
+    ticket: Optional[Dict] = None
+    source: str = "faq"
+
+    @classmethod
+    def parse(cls, line_number: int, line: str) -> "BatchItem":
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            return cls(line_number, error=f"Invalid JSON: {e}")
+        if not isinstance(record, dict) or not isinstance(record.get("message"), str) or not record["message"].strip():
+            return cls(line_number, error="Expected an object with a non-empty 'message'")
+        session_id = record.get("session_id")
+        return cls(
+            line_number,
+            session_id=str(session_id) if session_id else None,
+            message=record["message"],
+            ref=record.get("ref")
+        )
+
+    def mark_escalated(self):
+        """As in /chat: answered with the session's ticket, nothing stored"""
+        self.response, self.source = ESCALATED_MESSAGE, "escalated"
+        self.faq_matched, self.confidence = False, None
+        self.escalation = {'needs_escalation': True}
+
+    def result(self) -> Dict:
+        if self.error:
+            return {"line": self.line, "ref": self.ref, "session_id": self.session_id, "error": self.error}
+        return {
+            "line": self.line,
+            "ref": self.ref,
+            "session_id": self.session_id,
+            "response": self.response,
+            "faq_matched": self.faq_matched,
+            "confidence": self.confidence,
+            "escalated": bool(self.escalation.get('needs_escalation')),
+            "ticket_id": self.ticket.get('ticket_id') if self.ticket else None
+        }
+
+class BatchChatProcessor:
+    """Answer NDJSON backlogs of {"session_id", "message", "ref"} lines.
+
+    Lines are processed in chunks. Each chunk is FAQ-matched in one call,
+    only the misses go to the LLM through a pool of `workers` tasks, and
+    all of its sessions, messages, tickets and the job checkpoint are
+    written in one transaction with multi-row INSERTs. A job re-run with
+    the same job_id skips the lines already committed.
+
+    Items are answered independently, without conversation history, like
+    the first message of a chat.
+    """
+
+    # Same bar as /chat for answering straight from an FAQ
+    faq_min_confidence = 70
+
+    def __init__(
+        self,
+        faq_service,
+        llm_service,
+        escalation_service,
+        check_escalation: Callable[[str, bool, int], Awaitable[Dict]],
+        session_factory,
+        session_cache=None,
+        workers: int = 16,
+        chunk_size: int = 500
+    ):
+        self.faq_service = faq_service
+        self.llm_service = llm_service
+        self.escalation_service = escalation_service
+        self.check_escalation = check_escalation
+        self.session_factory = session_factory
+        self.session_cache = session_cache
+        self.workers = workers
+        self.chunk_size = chunk_size
+
+    @classmethod
+    def from_env(cls, *args, **kwargs) -> "BatchChatProcessor":
+        return cls(
+            *args,
+            workers=int(os.getenv("BATCH_WORKERS", 16)),
+            chunk_size=int(os.getenv("BATCH_CHUNK_SIZE", 500)),
+            **kwargs
+        )
+
+    async def _load_job(self, job_id: str, source: Optional[str]) -> BatchJob:
+        async with self.session_factory() as db:
+            job = await db.scalar(select(BatchJob).where(BatchJob.job_id == job_id))
+            if job is None:
+                job = BatchJob(
+                    job_id=job_id, source=source, status="running", position=0,
+                    faq_answered=0, llm_answered=0, escalated=0, failed=0
+                )
+                db.add(job)
+                await db.commit()
+            return job
+
+    async def job_status(self, job_id: str) -> Optional[Dict]:
+        async with self.session_factory() as db:
+            job = await db.scalar(select(BatchJob).where(BatchJob.job_id == job_id))
+        return self.job_dict(job) if job else None
+
+    @staticmethod
+    def job_dict(job: BatchJob) -> Dict:
+        return {
+            "job_id": job.job_id,
+            "source": job.source,
+            "status": job.status,
+            "position": job.position,
+            "faq_answered": job.faq_answered,
+            "llm_answered": job.llm_answered,
+            "escalated": job.escalated,
+            "failed": job.failed
+        }
+
+    async def run(
+        self,
+        lines: AsyncIterable[str],
+        job_id: Optional[str] = None,
+        source: Optional[str] = None,
+        on_chunk: Optional[ChunkCallback] = None,
+        llm_slots: Optional[asyncio.Semaphore] = None
+    ) -> AsyncIterator[Dict]:
+        """Process lines, yielding each chunk's results once committed.
+
+        on_chunk, if given, is awaited with each chunk's results inside its
+        transaction, just before the checkpoint commits; if it raises, the
+        chunk is rolled back. llm_slots, if given, additionally bounds the
+        items answered at once, across every run sharing it. The last item
+        yielded is {"job": ...} with the job's totals.
+        """
+        job = await self._load_job(job_id or str(uuid.uuid4()), source)
+        position = job.position
+        chunk: List[BatchItem] = []
+        line_number = 0
+
+        async for line in lines:
+            line_number += 1
+            if line_number <= job.position or not line.strip():
+                # Committed by an earlier run (or blank); blank lines still count
+                # so positions stay aligned with the input
+                position = max(position, line_number)
+                continue
+            chunk.append(BatchItem.parse(line_number, line))
+            if len(chunk) >= self.chunk_size:
+                for result in await self._process_chunk(job.job_id, chunk, line_number, on_chunk, llm_slots):
+                    yield result
+                position = line_number
+                chunk = []
+
+        if chunk or position < line_number:
+            for result in await self._process_chunk(job.job_id, chunk, line_number, on_chunk, llm_slots):
+                yield result
+
+        async with self.session_factory() as db:
+            await db.execute(
+                update(BatchJob).where(BatchJob.job_id == job.job_id).values(status="completed")
+            )
+            await db.commit()
+        yield {"job": await self.job_status(job.job_id)}
+
+    async def _process_chunk(
+        self,
+        job_id: str,
+        items: List[BatchItem],
+        position: int,
+        on_chunk: Optional[ChunkCallback] = None,
+        llm_slots: Optional[asyncio.Semaphore] = None
+    ) -> List[Dict]:
+        valid = [item for item in items if not item.error]
+
+        async with self.session_factory() as db:
+            # Existing sessions and their user message counts, one query each
+            named = {item.session_id for item in valid if item.session_id}
+            sessions = {}
+            user_counts: Dict[str, int] = {}
+            if named:
+                rows = await db.execute(
+                    select(ChatSession.session_id, ChatSession.is_active, ChatSession.escalated)
+                    .where(ChatSession.session_id.in_(named))
+                )
+                sessions = {row.session_id: row for row in rows}
+                counts = await db.execute(
+                    select(Message.session_id, func.count())
+                    .where(Message.session_id.in_(list(sessions)), Message.role == "user")
+                    .group_by(Message.session_id)
+                )
+                user_counts = dict(counts.all())
+
+        new_sessions = []
+        for item in valid:
+            if item.session_id is None:
+                item.session_id = str(uuid.uuid4())
+            existing = sessions.get(item.session_id)
+            if existing is None:
+                if item.session_id not in new_sessions:
+                    new_sessions.append(item.session_id)
+            elif not existing.is_active:
+                item.error = "Session is closed"
+        valid = [item for item in valid if not item.error]
+
+        # FAQ matching for the whole chunk against one catalog snapshot
+        matches = self.faq_service.find_matching_faqs([item.message for item in valid])
+        # A session's items in input order, so one that escalates stops the rest
+        pending: Dict[str, List[BatchItem]] = {}
+        for item, match in zip(valid, matches):
+            existing = sessions.get(item.session_id)
+            if existing is not None and existing.escalated:
+                item.mark_escalated()
+                continue
+            if match and match.get('confidence', 0) > self.faq_min_confidence:
+                item.response, item.faq_matched, item.confidence = match['answer'], True, match['confidence']
+            else:
+                item.source = "llm"
+            pending.setdefault(item.session_id, []).append(item)
+
+        await self._answer(pending, user_counts, llm_slots)
+
+        async with self.session_factory() as db:
+            now = datetime.now(timezone.utc)
+            if new_sessions:
+                await db.execute(insert(ChatSession).values([
+                    {
+                        "session_id": session_id, "created_at": now, "updated_at": now,
+                        "is_active": True, "escalated": False, "state_version": 0
+                    }
+                    for session_id in new_sessions
+                ]))
+
+            rows = []
+            escalations = {}
+            for index, item in enumerate(valid):
+                if item.source == "escalated":
+                    continue
+                # Offsets keep each user message before its answer, in input order
+                timestamp = now + timedelta(microseconds=2 * index)
+                rows.append({
+                    "session_id": item.session_id, "role": "user", "content": item.message,
+                    "timestamp": timestamp, "faq_matched": False, "confidence_score": None
+                })
+                rows.append({
+                    "session_id": item.session_id, "role": "assistant", "content": item.response,
+                    "timestamp": timestamp + timedelta(microseconds=1),
+                    "faq_matched": item.faq_matched, "confidence_score": item.confidence
+                })
+                if not item.escalation.get('needs_escalation'):
+                    continue
+                if item.session_id not in escalations:
+                    reason = item.escalation.get('reason', 'User request')
+                    # A single message is its own summary; no extra LLM call
+                    escalations[item.session_id] = await self.escalation_service.escalate_session(
+                        db, item.session_id, reason, item.message,
+                        [{"role": "user", "content": item.message}],
+                        message_count=2 * user_counts.get(item.session_id, 1)
+                    )
+                item.ticket = escalations[item.session_id]
+                item.response += ESCALATION_NOTICE + item.ticket['ticket_id']
+                rows[-1]["content"] = item.response
+
+            for item in valid:
+                if item.source == "escalated":
+                    # Escalated earlier in this chunk, or before it
+                    item.ticket = escalations.get(item.session_id) or (
+                        await self.escalation_service.get_escalation_status(db, item.session_id)
+                    )
+
+            if rows:
+                await db.execute(insert(Message).values(rows))
+            if escalations:
+                await db.execute(
+                    update(ChatSession.__table__)
+                    .where(ChatSession.__table__.c.session_id == bindparam("b_session_id"))
+                    .values(
+                        escalated=True,
+                        escalation_reason=bindparam("b_reason"),
+                        state_version=func.coalesce(ChatSession.__table__.c.state_version, 0) + 1
+                    ),
+                    [
+                        {"b_session_id": session_id, "b_reason": ticket['reason']}
+                        for session_id, ticket in escalations.items()
+                    ]
+                )
+            touched = [session_id for session_id in sessions if session_id not in escalations]
+            if touched:
+                await db.execute(
+                    update(ChatSession)
+                    .where(ChatSession.session_id.in_(touched))
+                    .values(updated_at=now)
+                )
+
+            await db.execute(
+                update(BatchJob)
+                .where(BatchJob.job_id == job_id)
+                .values(
+                    position=position,
+                    faq_answered=BatchJob.faq_answered + sum(1 for item in valid if item.source == "faq"),
+                    llm_answered=BatchJob.llm_answered + sum(1 for item in valid if item.source == "llm"),
+                    escalated=BatchJob.escalated + len(escalations),
+                    failed=BatchJob.failed + sum(1 for item in items if item.error)
+                )
+            )
+            results = [item.result() for item in items]
+            if on_chunk is not None:
+                await on_chunk(results)
+            await db.commit()
+
+        if self.session_cache is not None:
+            for session_id in sessions:
+                self.session_cache.invalidate(session_id)
+
+        return results
+
+    async def _answer(
+        self,
+        pending: Dict[str, List[BatchItem]],
+        user_counts: Dict[str, int],
+        llm_slots: Optional[asyncio.Semaphore] = None
+    ):
+        """Answer LLM misses and run escalation checks with a bounded worker pool.
+
+        Each session's items are answered in order by one worker; once one
+        escalates, the session's remaining items get the escalated reply.
+        user_counts ends up counting the user messages that will be stored.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        for items in pending.values():
+            queue.put_nowait(items)
+
+        async def answer(item: BatchItem, attempt_count: int):
+            if item.source == "llm":
+                item.response, item.escalation = await asyncio.gather(
+                    self.llm_service.generate_response(
+                        item.message, [], self.faq_service.build_context(item.message)
+                    ),
+                    self.check_escalation(item.message, False, attempt_count)
+                )
+            else:
+                item.escalation = await self.check_escalation(item.message, True, attempt_count)
+
+        async def worker():
+            while not queue.empty():
+                escalated = False
+                for item in queue.get_nowait():
+                    if escalated:
+                        item.mark_escalated()
+                        continue
+                    attempt_count = user_counts[item.session_id] = user_counts.get(item.session_id, 0) + 1
+                    if llm_slots is None:
+                        await answer(item, attempt_count)
+                    else:
+                        async with llm_slots:
+                            await answer(item, attempt_count)
+                    escalated = bool(item.escalation.get('needs_escalation'))
+
+        await asyncio.gather(*(worker() for _ in range(min(self.workers, len(pending)))))
+
+async def iterate_lines(path: str) -> AsyncIterator[str]:
+    """Lines of a local file, for run()"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            yield line
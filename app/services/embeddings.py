@@ -0,0 +1,53 @@
+import zlib
+from typing import List, Protocol, Sequence
+
+import numpy as np
+
+from app.services.text import normalize_text
+
+class Embedder(Protocol):
+    """Anything that turns texts into an (n, dim) float32 matrix of unit rows"""
+    dim: int
+    name: str
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        ...
+
+class HashedNgramEmbedder:
+    """Offline embedder: hashed character n-grams plus word unigrams.
+
+    Uses crc32 rather than hash() so the vectors are identical in every
+    worker process and can be cached on disk.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_range: tuple = (3, 5)):
+        self.dim = dim
+        self.ngram_range = ngram_range
+        self.name = f"hashed-ngram-{dim}-{ngram_range[0]}-{ngram_range[1]}"
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        low, high = self.ngram_range
+        for word in normalize_text(text).split():
+            features.append("w:" + word)
+            padded = f"<{word}>"
+            for n in range(low, high + 1):
+                for start in range(len(padded) - n + 1):
+                    features.append(padded[start:start + n])
+        return features
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+
+        for row, text in enumerate(texts):
+            for feature in self._features(text):
+                h = zlib.crc32(feature.encode("utf-8"))
+                # Low bit picks the sign so collisions tend to cancel out
+                matrix[row, (h >> 1) % self.dim] += 1.0 if h & 1 else -1.0
+
+        # Sublinear term frequency, then unit-normalize each row
+        np.copysign(np.log1p(np.abs(matrix)), matrix, out=matrix)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix /= norms
+        return matrix
@@ -1,53 +1,182 @@
-from typing import Dict, List
-from datetime import datetime
+from typing import Dict, List, Optional
+from datetime import datetime, timezone
+import uuid
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import EscalationTicket
+
+URGENT_KEYWORDS = ['urgent', 'emergency', 'critical', 'immediately', 'asap']
+
+ESCALATED_MESSAGE = "This conversation has been escalated to human support. A representative will contact you shortly."
+ESCALATION_NOTICE = "\n\nI've escalated your query to our human support team who can better assist you. Your ticket ID is: "
+
+PRIORITY_RANKS = {'high': 3, 'medium': 2, 'normal': 1}
+TICKET_STATUSES = ('pending', 'assigned', 'resolved')
 
 class EscalationService:
-    def __init__(self):
-        self.escalation_queue = []
-    
-    def escalate_session(
+    """Escalation tickets persisted in the escalation_tickets table"""
+
+    @staticmethod
+    def new_ticket_id() -> str:
+        """Random, collision-free ticket ID that still sorts by day"""
+        return f"ESC-{datetime.now(timezone.utc).strftime('%Y%m%d')}-{uuid.uuid4().hex[:12].upper()}"
+
+    @staticmethod
+    def to_dict(ticket: EscalationTicket) -> Dict:
+        return {
+            'ticket_id': ticket.ticket_id,
+            'session_id': ticket.session_id,
+            'reason': ticket.reason,
+            'summary': ticket.summary,
+            'escalated_at': ticket.escalated_at.isoformat(),
+            'status': ticket.status,
+            'priority': ticket.priority,
+            'assigned_to': ticket.assigned_to
+        }
+
+    async def escalate_session(
         self, 
+        db: AsyncSession,
         session_id: str, 
         reason: str, 
         conversation_summary: str,
-        messages: List[Dict]
+        messages: List[Dict],
+        message_count: Optional[int] = None
     ) -> Dict:
-        """Escalate session to human support"""
+        """Escalate session to human support
+
+        The ticket is added to db; the caller commits it together with the
+        session update. messages may be just the recent window;
+        message_count is then the session's total number of messages.
+        """
+        priority = self._calculate_priority(reason, messages, message_count)
         
-        escalation_ticket = {
-            'ticket_id': f"ESC-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}",
-            'session_id': session_id,
-            'reason': reason,
-            'summary': conversation_summary,
-            'escalated_at': datetime.utcnow().isoformat(),
-            'status': 'pending',
-            'priority': self._calculate_priority(reason, messages)
-        }
+        escalation_ticket = EscalationTicket(
+            ticket_id=self.new_ticket_id(),
+            session_id=session_id,
+            reason=reason,
+            summary=conversation_summary,
+            escalated_at=datetime.now(timezone.utc),
+            status='pending',
+            priority=priority,
+            priority_rank=PRIORITY_RANKS[priority]
+        )
         
-        self.escalation_queue.append(escalation_ticket)
+        db.add(escalation_ticket)
         
-        return escalation_ticket
+        return self.to_dict(escalation_ticket)
     
-    def _calculate_priority(self, reason: str, messages: List[Dict]) -> str:
+    def _calculate_priority(
+        self,
+        reason: str,
+        messages: List[Dict],
+        message_count: Optional[int] = None
+    ) -> str:
         """Calculate escalation priority"""
-        urgent_keywords = ['urgent', 'emergency', 'critical', 'immediately', 'asap']
-        
         # Check reason and recent messages for urgency
         text_to_check = reason.lower()
         for msg in messages[-3:]:  # Check last 3 messages
             text_to_check += " " + msg.get('content', '').lower()
         
-        if any(keyword in text_to_check for keyword in urgent_keywords):
+        if any(keyword in text_to_check for keyword in URGENT_KEYWORDS):
             return 'high'
-        elif len(messages) > 8:
+        elif (message_count if message_count is not None else len(messages)) > 8:
             return 'medium'
         else:
             return 'normal'
     
-    def get_escalation_status(self, session_id: str) -> Dict:
+    async def get_escalation_status(self, db: AsyncSession, session_id: str) -> Dict:
         """Get escalation status for a session"""
-        for ticket in self.escalation_queue:
-            if ticket['session_id'] == session_id:
-                return ticket
+        result = await db.execute(
+            select(EscalationTicket)
+            .where(EscalationTicket.session_id == session_id)
+            .order_by(EscalationTicket.id.desc())
+            .limit(1)
+        )
+        ticket = result.scalar_one_or_none()
+        if ticket:
+            return self.to_dict(ticket)
         
         return {'status': 'not_escalated'}
+
+    async def get_ticket(self, db: AsyncSession, ticket_id: str) -> Optional[Dict]:
+        result = await db.execute(
+            select(EscalationTicket).where(EscalationTicket.ticket_id == ticket_id)
+        )
+        ticket = result.scalar_one_or_none()
+        return self.to_dict(ticket) if ticket else None
+
+    async def list_tickets(
+        self,
+        db: AsyncSession,
+        status: Optional[str] = None,
+        priority: Optional[str] = None,
+        after_id: Optional[int] = None,
+        limit: int = 50
+    ) -> Dict:
+        """Page through tickets in creation order (keyset pagination on id)"""
+        query = select(EscalationTicket)
+        if status:
+            query = query.where(EscalationTicket.status == status)
+        if priority:
+            query = query.where(EscalationTicket.priority == priority)
+        if after_id is not None:
+            query = query.where(EscalationTicket.id > after_id)
+
+        result = await db.execute(query.order_by(EscalationTicket.id).limit(limit + 1))
+        tickets = result.scalars().all()
+        page = tickets[:limit]
+
+        return {
+            'tickets': [self.to_dict(ticket) for ticket in page],
+            'next_after_id': page[-1].id if len(tickets) > limit else None
+        }
+
+    async def dequeue(self, db: AsyncSession, agent: str) -> Optional[Dict]:
+        """Assign the highest-priority, oldest pending ticket to agent.
+
+        The claim is a conditional UPDATE, so concurrent agents (and
+        workers) never receive the same ticket.
+        """
+        while True:
+            result = await db.execute(
+                select(EscalationTicket.id)
+                .where(EscalationTicket.status == 'pending')
+                .order_by(EscalationTicket.priority_rank.desc(), EscalationTicket.escalated_at)
+                .limit(1)
+                .with_for_update(skip_locked=True)
+            )
+            ticket_pk = result.scalar_one_or_none()
+            if ticket_pk is None:
+                await db.rollback()
+                return None
+
+            claimed = await db.execute(
+                update(EscalationTicket)
+                .where(EscalationTicket.id == ticket_pk, EscalationTicket.status == 'pending')
+                .values(status='assigned', assigned_to=agent, assigned_at=datetime.now(timezone.utc))
+            )
+            await db.commit()
+            if claimed.rowcount == 1:
+                ticket = await db.get(EscalationTicket, ticket_pk)
+                return self.to_dict(ticket)
+
+    async def update_status(self, db: AsyncSession, ticket_id: str, status: str) -> Optional[Dict]:
+        result = await db.execute(
+            select(EscalationTicket).where(EscalationTicket.ticket_id == ticket_id)
+        )
+        ticket = result.scalar_one_or_none()
+        if ticket is None:
+            return None
+
+        ticket.status = status
+        if status == 'resolved':
+            ticket.resolved_at = datetime.now(timezone.utc)
+        elif status == 'pending':
+            # Back in the queue, for any agent to dequeue
+            ticket.assigned_to = None
+            ticket.assigned_at = None
+        await db.commit()
+        return self.to_dict(ticket)
@@ -0,0 +1,276 @@
+"""Local escalation classifier, so most messages never need the LLM check.
+
+A message is scored by a logistic model: keyword rules (compiled into one
+regex per tier) give a prior, and a linear model over hashed word n-grams,
+trained on stored conversations, adjusts it. Scores outside the uncertain
+band are decided locally; only the ones inside it go to Gemini.
+
+Train a model from the chat history in DATABASE_URL:
+    python -m app.services.escalation_classifier --output data/escalation_model.json
+"""
+import json
+import math
+import os
+import random
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from app.services.escalation import URGENT_KEYWORDS
+from app.services.text import tokenize
+
+# Cues that on their own nearly always mean the customer needs a person
+STRONG_CUES = URGENT_KEYWORDS + [
+    'human', 'real person', 'live agent', 'speak to an agent', 'talk to an agent',
+    'representative', 'manager', 'supervisor', 'fraud', 'hacked', 'stolen',
+    'lawyer', 'legal action', 'sue',
+]
+
+# Cues that make escalation plausible but are common in routine questions
+# ("can I get a refund?"); these land in the uncertain band
+WEAK_CUES = [
+    'agent', 'complaint', 'complain', 'refund', 'charge', 'charged', 'billing',
+    'payment', 'not working', "doesn't work", 'broken', 'error', 'failed',
+    'technical', 'legal', 'unacceptable', 'terrible', 'worst', 'angry',
+    'frustrated', 'cancel my', 'close my account',
+]
+
+RULE_FEATURES = ('bias', 'strong', 'weak')
+
+# Logit contributions before any training: no cue is a confident "no", a
+# weak cue is uncertain and a strong cue a confident "yes"
+DEFAULT_RULE_WEIGHTS = {'bias': -3.0, 'strong': 6.0, 'weak': 2.5}
+
+# An FAQ answered the message; only strong wording still warrants a look
+FAQ_MATCHED_OFFSET = -2.5
+
+def compile_cues(cues: Iterable[str]) -> re.Pattern:
+    """One alternation over all cues, longest first, on word boundaries"""
+    alternatives = sorted({re.escape(cue.lower()) for cue in cues}, key=len, reverse=True)
+    return re.compile(r"\b(?:" + "|".join(alternatives) + r")\b")
+
+def hashed_features(text: str, dims: int) -> List[int]:
+    """Bucket indices of the unigrams and bigrams of text.
+
+    crc32 rather than hash() so a saved model means the same thing in
+    every process.
+    """
+    tokens = tokenize(text)
+    grams = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+    return sorted({zlib.crc32(gram.encode("utf-8")) % dims for gram in grams})
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    e = math.exp(z)
+    return e / (1.0 + e)
+
+@dataclass
+class EscalationDecision:
+    probability: float
+    # None when the score is in the uncertain band and the LLM should decide
+    needs_escalation: Optional[bool]
+    reason: str
+
+class EscalationClassifier:
+    """Keyword rules plus a hashed n-gram logistic model"""
+
+    def __init__(
+        self,
+        rule_weights: Optional[Dict[str, float]] = None,
+        weights: Optional[Dict[int, float]] = None,
+        dims: int = 2 ** 18,
+        low: float = 0.15,
+        high: float = 0.85
+    ):
+        self.rule_weights = dict(DEFAULT_RULE_WEIGHTS, **(rule_weights or {}))
+        self.weights: Dict[int, float] = dict(weights or {})
+        self.dims = dims
+        self.low = low
+        self.high = high
+        self._strong = compile_cues(STRONG_CUES)
+        self._weak = compile_cues(WEAK_CUES)
+
+    @classmethod
+    def from_env(cls) -> "EscalationClassifier":
+        low = float(os.getenv("ESCALATION_UNCERTAIN_LOW", 0.15))
+        high = float(os.getenv("ESCALATION_UNCERTAIN_HIGH", 0.85))
+        path = os.getenv("ESCALATION_MODEL_PATH", "data/escalation_model.json")
+        if os.path.exists(path):
+            try:
+                classifier = cls.load(path, low=low, high=high)
+                print(f"✓ Loaded escalation model from {path} ({len(classifier.weights)} weights)")
+                return classifier
+            except Exception as e:
+                print(f"Error loading escalation model {path}: {str(e)}; using keyword rules only")
+        return cls(low=low, high=high)
+
+    def rule_counts(self, text: str) -> Dict[str, int]:
+        text = text.lower()
+        return {
+            'bias': 1,
+            'strong': len(self._strong.findall(text)),
+            'weak': len(self._weak.findall(text))
+        }
+
+    def features(self, text: str) -> Tuple[Dict[str, float], List[int]]:
+        """Rule features (capped at 2 matches) and hashed n-gram buckets"""
+        counts = self.rule_counts(text)
+        rules = {name: float(min(count, 2)) for name, count in counts.items()}
+        return rules, hashed_features(text, self.dims)
+
+    def logit(self, rules: Dict[str, float], buckets: Sequence[int]) -> float:
+        z = sum(self.rule_weights[name] * value for name, value in rules.items())
+        weights = self.weights
+        for bucket in buckets:
+            z += weights.get(bucket, 0.0)
+        return z
+
+    def probability(self, message: str, faq_matched: bool = False) -> float:
+        rules, buckets = self.features(message)
+        z = self.logit(rules, buckets)
+        if faq_matched:
+            z += FAQ_MATCHED_OFFSET
+        return _sigmoid(z)
+
+    def classify(self, message: str, faq_matched: bool = False) -> EscalationDecision:
+        """Decide locally when confident, otherwise leave it to the LLM"""
+        p = self.probability(message, faq_matched)
+        if p >= self.high:
+            match = self._strong.search(message.lower())
+            cue = f" ('{match.group(0)}')" if match else ""
+            return EscalationDecision(p, True, f"Escalation wording detected{cue}")
+        if p <= self.low:
+            return EscalationDecision(p, False, 'Routine message (local classifier)')
+        return EscalationDecision(p, None, 'Uncertain')
+
+    def train(
+        self,
+        examples: Sequence[Tuple[str, bool]],
+        epochs: int = 8,
+        learning_rate: float = 0.2,
+        l2: float = 1e-4,
+        seed: int = 0
+    ):
+        """Fit the weights with SGD on logistic loss.
+
+        Rule weights start from (and are regularized towards) their defaults,
+        so a small or one-sided history only nudges the keyword prior. Classes
+        are reweighted because escalations are rare.
+        """
+        featurized = [(self.features(text), label) for text, label in examples]
+        positives = sum(1 for _, label in featurized if label)
+        negatives = len(featurized) - positives
+        if not positives or not negatives:
+            raise ValueError("Training needs both escalated and routine messages")
+        class_weight = {True: len(featurized) / (2 * positives), False: len(featurized) / (2 * negatives)}
+
+        rng = random.Random(seed)
+        order = list(range(len(featurized)))
+        for epoch in range(epochs):
+            rng.shuffle(order)
+            rate = learning_rate / (1 + epoch)
+            for i in order:
+                (rules, buckets), label = featurized[i]
+                error = (_sigmoid(self.logit(rules, buckets)) - label) * class_weight[label]
+                step = rate * error
+                for name, value in rules.items():
+                    prior = DEFAULT_RULE_WEIGHTS[name]
+                    w = self.rule_weights[name]
+                    self.rule_weights[name] = w - step * value - rate * l2 * (w - prior)
+                for bucket in buckets:
+                    w = self.weights.get(bucket, 0.0)
+                    self.weights[bucket] = w - step - rate * l2 * w
+
+        self.weights = {bucket: w for bucket, w in self.weights.items() if abs(w) > 1e-4}
+
+    def save(self, path: str):
+        model = {
+            'dims': self.dims,
+            'rule_weights': self.rule_weights,
+            'weights': {str(bucket): round(w, 6) for bucket, w in self.weights.items()}
+        }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(model, f)
+
+    @classmethod
+    def load(cls, path: str, **kwargs) -> "EscalationClassifier":
+        with open(path) as f:
+            model = json.load(f)
+        return cls(
+            rule_weights=model['rule_weights'],
+            weights={int(bucket): w for bucket, w in model['weights'].items()},
+            dims=model['dims'],
+            **kwargs
+        )
+
+async def load_training_examples(db, max_routine: int = 50000) -> List[Tuple[str, bool]]:
+    """Labelled user messages from stored conversations.
+
+    The last user message before each ticket's escalated_at is a positive;
+    user messages of sessions that were never escalated are negatives.
+    Tickets raised by the attempt threshold are skipped since their wording
+    did not cause them.
+    """
+    from sqlalchemy import select
+
+    from app.models import ChatSession, EscalationTicket, Message
+
+    examples = []
+    tickets = await db.execute(
+        select(EscalationTicket.session_id, EscalationTicket.escalated_at)
+        .where(EscalationTicket.reason.notlike('Query attempted%'))
+    )
+    for session_id, escalated_at in tickets.all():
+        trigger = await db.scalar(
+            select(Message.content)
+            .where(
+                Message.session_id == session_id,
+                Message.role == 'user',
+                Message.timestamp <= escalated_at
+            )
+            .order_by(Message.timestamp.desc())
+            .limit(1)
+        )
+        if trigger:
+            examples.append((trigger, True))
+
+    routine = await db.execute(
+        select(Message.content)
+        .join(ChatSession, ChatSession.session_id == Message.session_id)
+        .where(Message.role == 'user', ChatSession.escalated.is_not(True))
+        .order_by(Message.id.desc())
+        .limit(max_routine)
+    )
+    examples.extend((content, False) for content in routine.scalars() if content)
+    return examples
+
+def main():
+    import argparse
+    import asyncio
+
+    parser = argparse.ArgumentParser(description="Train the escalation model from chat history")
+    parser.add_argument("--output", default=os.getenv("ESCALATION_MODEL_PATH", "data/escalation_model.json"))
+    parser.add_argument("--max-routine", type=int, default=50000)
+    parser.add_argument("--epochs", type=int, default=8)
+    args = parser.parse_args()
+
+    from app.database import AsyncSessionLocal
+
+    async def load():
+        async with AsyncSessionLocal() as db:
+            return await load_training_examples(db, args.max_routine)
+
+    examples = asyncio.run(load())
+    positives = sum(1 for _, label in examples if label)
+    print(f"{len(examples)} examples ({positives} escalated)")
+
+    classifier = EscalationClassifier()
+    classifier.train(examples, epochs=args.epochs)
+    classifier.save(args.output)
+    print(f"✓ Saved escalation model to {args.output} ({len(classifier.weights)} weights)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import heapq
+import math
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple
+
+from app.services.text import STOPWORDS, tokenize
+
+class SearchHit(NamedTuple):
+    doc_id: int
+    score: float
+    confidence: int
+    keyword_hit: bool
+
+class FAQIndex:
+    """Inverted index over FAQ questions and keywords with BM25 ranking.
+
+    Built once when the catalog is loaded; a lookup only touches the
+    postings of the query's own terms instead of scanning every FAQ.
+    """
+
+    def __init__(
+        self,
+        faqs: Iterable[Dict] = (),
+        k1: float = 1.2,
+        b: float = 0.75,
+        keyword_boost: float = 2.0,
+        unknown_term_weight: float = 0.5
+    ):
+        self.k1 = k1
+        self.b = b
+        self.keyword_boost = keyword_boost
+        self.unknown_term_weight = unknown_term_weight
+
+        # term -> {doc_id: weighted term frequency}
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._doc_terms: Dict[int, Dict[str, float]] = {}
+        self._keyword_terms: Dict[int, FrozenSet[str]] = {}
+        self._doc_len: Dict[int, float] = {}
+        self._total_len = 0.0
+
+        for doc_id, faq in enumerate(faqs):
+            self.add(doc_id, faq)
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def copy(self) -> "FAQIndex":
+        """Independent copy, for updating without touching an index in use"""
+        clone = FAQIndex(
+            k1=self.k1, b=self.b, keyword_boost=self.keyword_boost,
+            unknown_term_weight=self.unknown_term_weight
+        )
+        clone._postings = {term: dict(postings) for term, postings in self._postings.items()}
+        clone._doc_terms = dict(self._doc_terms)
+        clone._keyword_terms = dict(self._keyword_terms)
+        clone._doc_len = dict(self._doc_len)
+        clone._total_len = self._total_len
+        return clone
+
+    def add(self, doc_id: int, faq: Dict):
+        """Index a single FAQ, replacing any previous entry for doc_id"""
+        if doc_id in self._doc_len:
+            self.remove(doc_id)
+
+        keyword_terms = set()
+        for keyword in faq.get('keywords', []):
+            keyword_terms.update(tokenize(keyword))
+
+        terms = Counter(tokenize(faq.get('question', '')))
+        for term in keyword_terms:
+            terms[term] += self.keyword_boost
+
+        for term, tf in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+        doc_len = float(sum(terms.values()))
+        self._doc_terms[doc_id] = dict(terms)
+        self._keyword_terms[doc_id] = frozenset(keyword_terms)
+        self._doc_len[doc_id] = doc_len
+        self._total_len += doc_len
+
+    def remove(self, doc_id: int):
+        """Drop a FAQ from the index"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+
+        self._keyword_terms.pop(doc_id, None)
+        self._total_len -= self._doc_len.pop(doc_id)
+
+    def idf(self, term: str) -> float:
+        df = len(self._postings.get(term, ()))
+        n = len(self._doc_len)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query: str, limit: int = 5) -> List[SearchHit]:
+        """Rank all candidate FAQs for query in a single pass over postings.
+
+        confidence is the IDF-weighted share of the query's content terms
+        (stopwords excluded unless nothing else is left) that the FAQ
+        covers, scaled to 0-100. Terms no FAQ contains count too, at
+        unknown_term_weight times the highest IDF, so a multi-part question
+        is not a confident match for an FAQ that answers one part, while a
+        stray word does not sink a direct question.
+        """
+        query_terms = set(tokenize(query))
+        if not query_terms or not self._doc_len:
+            return []
+
+        content_terms = {term for term in query_terms if term not in STOPWORDS}
+        coverage_terms = content_terms or query_terms
+        query_weight = sum(
+            self.idf(term) if term in self._postings else self.unknown_term_weight * self.idf(term)
+            for term in coverage_terms
+        )
+
+        avg_len = self._total_len / len(self._doc_len)
+        scores: Dict[int, float] = {}
+        matched_weight: Dict[int, float] = {}
+
+        for term in query_terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = self.idf(term)
+            counts = term in coverage_terms
+
+            for doc_id, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avg_len)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+                if counts:
+                    matched_weight[doc_id] = matched_weight.get(doc_id, 0.0) + idf
+
+        top = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+
+        return [
+            SearchHit(
+                doc_id=doc_id,
+                score=score,
+                confidence=round(100 * matched_weight.get(doc_id, 0.0) / query_weight),
+                keyword_hit=not coverage_terms.isdisjoint(self._keyword_terms[doc_id])
+            )
+            for doc_id, score in top
+        ]
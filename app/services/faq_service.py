@@ -1,39 +1,381 @@
-import json 
-from typing import Optional, Dict
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import traceback
+from typing import Callable, Optional, Dict, List, Tuple
 from pathlib import Path
 
+from app.services.faq_index import FAQIndex, SearchHit
+from app.services.text import estimate_tokens, normalize_text
+
+RETRIEVAL_MODES = ("keyword", "semantic", "hybrid")
+CONTEXT_HEADER = "Available FAQs:\n\n"
+
+def catalog_version(faqs: List[Dict]) -> str:
+    """Fingerprint of the catalog; caches derived from FAQs are keyed on it"""
+    return hashlib.sha256(
+        json.dumps(faqs, sort_keys=True).encode("utf-8")
+    ).hexdigest()[:16]
+
+def faq_key(faq: Dict) -> str:
+    """FAQs are identified by their question for upserts"""
+    return " ".join(faq['question'].lower().split())
+
+def render_snippet(faq: Dict) -> str:
+    return f"Q: {faq['question']}\n   A: {faq['answer']}"
+
+class FAQCatalog:
+    """One version of the FAQs together with everything derived from them.
+
+    A catalog is never modified once built; FAQService swaps in a new one,
+    so a request always sees a consistent index, snippets and FAQ list.
+    """
+
+    def __init__(self, faqs, index, semantic_index, snippets, snippet_tokens):
+        self.faqs = faqs
+        self.index = index
+        self.semantic_index = semantic_index
+        # Rendered once per FAQ so building a prompt is just a join
+        self.snippets = snippets
+        self.snippet_tokens = snippet_tokens
+        self.version = catalog_version(faqs)
+        self.positions = {faq_key(faq): doc_id for doc_id, faq in enumerate(faqs)}
+
+    @classmethod
+    def build(cls, faqs: List[Dict], semantic_factory=None) -> "FAQCatalog":
+        snippets = [render_snippet(faq) for faq in faqs]
+        return cls(
+            faqs,
+            FAQIndex(faqs),
+            semantic_factory(faqs) if semantic_factory else None,
+            snippets,
+            [estimate_tokens(snippet) for snippet in snippets]
+        )
+
+    def upsert(self, faqs: List[Dict]) -> Tuple["FAQCatalog", Dict]:
+        """New catalog with faqs inserted or replaced, re-indexing only those"""
+        merged = list(self.faqs)
+        positions = dict(self.positions)
+        changed = []
+        counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+
+        for faq in faqs:
+            key = faq_key(faq)
+            doc_id = positions.get(key)
+            if doc_id is None:
+                positions[key] = doc_id = len(merged)
+                merged.append(faq)
+                counts['inserted'] += 1
+            elif merged[doc_id] != faq:
+                merged[doc_id] = faq
+                counts['updated'] += 1
+            else:
+                counts['unchanged'] += 1
+                continue
+            if doc_id not in changed:
+                changed.append(doc_id)
+
+        if not changed:
+            return self, counts
+
+        index = self.index.copy()
+        snippets = list(self.snippets)
+        snippet_tokens = list(self.snippet_tokens)
+        for doc_id in changed:
+            index.add(doc_id, merged[doc_id])
+            snippet = render_snippet(merged[doc_id])
+            if doc_id < len(snippets):
+                snippets[doc_id] = snippet
+                snippet_tokens[doc_id] = estimate_tokens(snippet)
+            else:
+                snippets.append(snippet)
+                snippet_tokens.append(estimate_tokens(snippet))
+
+        semantic_index = None
+        if self.semantic_index is not None:
+            semantic_index = self.semantic_index.updated(merged, changed)
+
+        return FAQCatalog(merged, index, semantic_index, snippets, snippet_tokens), counts
+
 class FAQService:
-    def __init__(self):
-        self.faqs = self.load_faqs()
+    """FAQ matching and prompt context over a hot-reloadable catalog.
+
+    The catalog is read from FAQ_PATH. refresh() (run periodically by
+    watch()) rebuilds it in a worker thread when the file's mtime and
+    content hash change, then swaps it in; upsert() applies admin edits
+    incrementally. Requests in flight keep the catalog they started with.
+    """
+
+    def __init__(
+        self,
+        faqs: Optional[List[Dict]] = None,
+        retrieval_mode: Optional[str] = None,
+        embedder=None,
+        path: Optional[str] = None
+    ):
+        self.context_top_k = int(os.getenv("FAQ_CONTEXT_TOP_K", 3))
+        self.context_token_budget = int(os.getenv("FAQ_CONTEXT_TOKEN_BUDGET", 600))
+
+        self.retrieval_mode = (retrieval_mode or os.getenv("FAQ_RETRIEVAL_MODE", "keyword")).lower()
+        if self.retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown FAQ_RETRIEVAL_MODE: {self.retrieval_mode}")
+        self.embedder = embedder
+
+        # Explicit FAQs are not backed by (or watched from) a file
+        self.path = None if faqs is not None else Path(path or os.getenv("FAQ_PATH", "data/faqs.json"))
+        self._file_stamp = None
+        self._file_hash = None
+        self._write_lock = threading.Lock()
+        # Called with the new version after each swap, on the event loop
+        self.listeners: List[Callable[[str], None]] = []
+
+        semantic_factory = self._semantic_factory()
+        self.catalog = FAQCatalog.build(
+            faqs if faqs is not None else self.load_faqs(),
+            semantic_factory
+        )
+
+    # The current catalog's contents, for callers that predate FAQCatalog
+    @property
+    def faqs(self) -> List[Dict]:
+        return self.catalog.faqs
+
+    @property
+    def index(self) -> FAQIndex:
+        return self.catalog.index
+
+    @property
+    def semantic_index(self):
+        return self.catalog.semantic_index
+
+    @property
+    def version(self) -> str:
+        return self.catalog.version
+
+    @property
+    def snippets(self) -> List[str]:
+        return self.catalog.snippets
+
+    @property
+    def snippet_tokens(self) -> List[int]:
+        return self.catalog.snippet_tokens
+
+    def _semantic_factory(self):
+        """Builder of the embedding matrix, or None in keyword mode (or without numpy)"""
+        if self.retrieval_mode == "keyword":
+            return None
+        try:
+            from app.services.semantic_index import SemanticFAQIndex
+        except ImportError:
+            print("numpy is not installed; FAQ retrieval falls back to keyword mode")
+            self.retrieval_mode = "keyword"
+            return None
+
+        def build(faqs):
+            return SemanticFAQIndex(
+                faqs,
+                embedder=self.embedder,
+                cache_dir=os.getenv("FAQ_EMBEDDING_CACHE_DIR", "data/.cache")
+            )
+        return build
+
+    def _read_file(self) -> Tuple[Optional[tuple], Optional[bytes]]:
+        try:
+            stat = self.path.stat()
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            return None, None
+        return (stat.st_mtime_ns, stat.st_size), data
 
     def load_faqs(self)->list:
         """Load FAQS from JSON file"""
-        faq_path = Path("data/faqs/json")
-        if faq_path.exists():
-            with open(faq_path,'r') as f:
-                return json.load(f)
-        return []
+        stamp, data = self._read_file()
+        self._file_stamp = stamp
+        if data is None:
+            print(f"FAQ file {self.path} not found; starting with no FAQs")
+            return []
+        self._file_hash = hashlib.sha256(data).hexdigest()
+        return json.loads(data)
+
+    def reload_if_changed(self) -> bool:
+        """Rebuild the catalog if the FAQ file changed; blocking, so run it off the event loop"""
+        if self.path is None:
+            return False
+        try:
+            stamp = self.path.stat()
+            stamp = (stamp.st_mtime_ns, stamp.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self._file_stamp:
+            return False
+
+        with self._write_lock:
+            stamp, data = self._read_file()
+            if data is None:
+                self._file_stamp = stamp
+                return False
+            # Touched but not edited, or our own upsert
+            digest = hashlib.sha256(data).hexdigest()
+            if digest == self._file_hash:
+                self._file_stamp = stamp
+                return False
+
+            # A half-written file fails to parse; it is retried on the next poll
+            faqs = json.loads(data)
+            catalog = FAQCatalog.build(faqs, self._semantic_factory())
+            self._file_stamp, self._file_hash = stamp, digest
+            self.catalog = catalog
+            return True
+
+    async def refresh(self) -> bool:
+        """Pick up FAQ file changes without blocking requests"""
+        changed = await asyncio.to_thread(self.reload_if_changed)
+        if changed:
+            print(f"✓ Reloaded {len(self.catalog.faqs)} FAQs (version {self.version})")
+            self._notify()
+        return changed
+
+    async def watch(self, interval: float):
+        """Poll the FAQ file every interval seconds"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Error reloading FAQs: {str(e)}")
+                print(traceback.format_exc())
+
+    def _upsert(self, faqs: List[Dict]) -> Dict:
+        with self._write_lock:
+            catalog, counts = self.catalog.upsert(faqs)
+            if catalog is not self.catalog:
+                if self.path is not None:
+                    self._write_file(catalog.faqs)
+                self.catalog = catalog
+            return {**counts, 'total': len(catalog.faqs), 'version': catalog.version}
+
+    def _write_file(self, faqs: List[Dict]):
+        """Persist the catalog so restarts and other workers see the edit"""
+        data = json.dumps(faqs, indent=2, ensure_ascii=False).encode("utf-8")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, self.path)
+        stat = self.path.stat()
+        self._file_stamp = (stat.st_mtime_ns, stat.st_size)
+        self._file_hash = hashlib.sha256(data).hexdigest()
+
+    async def upsert(self, faqs: List[Dict]) -> Dict:
+        """Insert or replace FAQs (matched on question), re-indexing only those"""
+        before = self.version
+        result = await asyncio.to_thread(self._upsert, faqs)
+        if result['version'] != before:
+            self._notify()
+        return result
+
+    def _notify(self):
+        for listener in self.listeners:
+            listener(self.version)
+
+    def _to_match(self, catalog: FAQCatalog, hit: SearchHit) -> Dict:
+        faq = catalog.faqs[hit.doc_id]
+        return {
+            'question': faq['question'],
+            'answer': faq['answer'],
+            'confidence': hit.confidence,
+            'score': hit.score,
+            'matched': True
+        }
 
     def find_matching_faq(self,query:str) -> Optional[Dict]:
-        """Simple Keyword-based FAQ matching"""
-        query_lower = query.lower()
-
-        for faq in self.faqs:
-            # Check if query keywords match FAQ keywords
-            keywords = faq.get('keywords', [])
-            if any(keyword.lower() in query_lower for keyword in keywords):
-                return {
-                    'question': faq['question'],
-                    'answer': faq['answer'],
-                    'confidence': 85,
-                    'matched': True
-                }
-        
-        return None
-    
+        """Match a query against the FAQs using the configured retrieval mode"""
+        return self.find_matching_faqs([query])[0]
+
+    def find_matching_faqs(self, queries: List[str]) -> List[Optional[Dict]]:
+        """find_matching_faq for many queries against one catalog snapshot.
+
+        Repeated queries (after normalization) are matched once, and the
+        semantic fallback embeds all remaining queries in one call.
+        """
+        catalog = self.catalog
+        unique: Dict[str, str] = {}
+        for query in queries:
+            unique.setdefault(normalize_text(query), query)
+
+        matches: Dict[str, Optional[Dict]] = {}
+        remaining = []
+        for key, query in unique.items():
+            matches[key] = None
+            if self.retrieval_mode != "semantic":
+                for hit in catalog.index.search(query, limit=5):
+                    # Only a keyword hit counts as a direct FAQ answer
+                    if hit.keyword_hit:
+                        matches[key] = self._to_match(catalog, hit)
+                        break
+            if matches[key] is None:
+                remaining.append(key)
+
+        if catalog.semantic_index is not None and remaining:
+            hit_lists = catalog.semantic_index.search_many([unique[key] for key in remaining], limit=1)
+            for key, hits in zip(remaining, hit_lists):
+                if hits:
+                    matches[key] = self._to_match(catalog, hits[0])
+
+        return [matches[normalize_text(query)] for query in queries]
+
     def get_faq_context(self) -> str:
         """Get all FAQs as context for LLM"""
-        context = "Available FAQs:\n\n"
-        for idx, faq in enumerate(self.faqs, 1):
-            context += f"{idx}. Q: {faq['question']}\n   A: {faq['answer']}\n\n"
-        return context
\ No newline at end of file
+        return CONTEXT_HEADER + "".join(
+            f"{idx}. {snippet}\n\n" for idx, snippet in enumerate(self.catalog.snippets, 1)
+        )
+
+    def retrieve(self, query: str, k: int, catalog: Optional[FAQCatalog] = None) -> List[int]:
+        """Indices of the k FAQs most relevant to query, best first"""
+        catalog = catalog or self.catalog
+        ranked = [hit.doc_id for hit in catalog.index.search(query, limit=k)]
+
+        if catalog.semantic_index is not None and len(ranked) < k:
+            for hit in catalog.semantic_index.search(query, limit=k):
+                if hit.doc_id not in ranked:
+                    ranked.append(hit.doc_id)
+
+        return ranked[:k]
+
+    def suggest(self, query: str, k: Optional[int] = None) -> List[Dict]:
+        """The top-k FAQs for query, for answering without the LLM"""
+        catalog = self.catalog
+        k = self.context_top_k if k is None else k
+        return [
+            {'question': catalog.faqs[doc_id]['question'], 'answer': catalog.faqs[doc_id]['answer']}
+            for doc_id in self.retrieve(query, k, catalog)
+        ]
+
+    def build_context(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        token_budget: Optional[int] = None
+    ) -> str:
+        """FAQ context for LLM limited to the top-k FAQs relevant to query.
+
+        Snippets are added in relevance order until the token budget is
+        used up. Returns an empty string when nothing relevant is found.
+        """
+        catalog = self.catalog
+        k = self.context_top_k if k is None else k
+        budget = self.context_token_budget if token_budget is None else token_budget
+        budget -= estimate_tokens(CONTEXT_HEADER)
+
+        parts = []
+        for doc_id in self.retrieve(query, k, catalog):
+            cost = catalog.snippet_tokens[doc_id]
+            if cost > budget:
+                continue
+            budget -= cost
+            parts.append(f"{len(parts) + 1}. {catalog.snippets[doc_id]}\n\n")
+
+        if not parts:
+            return ""
+        return CONTEXT_HEADER + "".join(parts)
@@ -1,25 +1,185 @@
-from google import genai
-from google.genai import types
+import asyncio
+import hashlib
+import json
 import os
-from typing import List, Dict
+import random
+import time
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
+from app.services.metrics import LLM_CALL_SECONDS, LLM_COALESCED, record_usage
+from app.services.text import normalize_text
+
+if TYPE_CHECKING:
+    from google.genai import types
+
 load_dotenv()
 
+# HTTP status codes worth retrying: rate limiting and transient server errors
+RETRYABLE_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+
+def generation_config(**options) -> "types.GenerateContentConfig":
+    """GenerateContentConfig, importing google.genai on first use"""
+    from google.genai import types
+
+    return types.GenerateContentConfig(**options)
+
 class LLMService:
-    def __init__(self):
+    def __init__(self, client=None, response_cache=None):
+        # The Gemini client (and the google.genai import, the slowest part
+        # of starting a worker) is created on first use; see connect()
+        self._client = client
+        self.model = "gemini-2.5-flash-lite"
+
+        # Answers are only reused for conversation openers unless configured,
+        # since a reply mid-conversation depends on the history
+        self.response_cache = response_cache
+        self.cache_ignores_history = os.getenv("RESPONSE_CACHE_IGNORE_HISTORY", "false").lower() == "true"
+
+        # Gemini calls go through the SDK's async surface, bounded by a
+        # semaphore and a per-call deadline that also covers retries
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", 32))
+        self.timeout = float(os.getenv("LLM_TIMEOUT_SECONDS", 20))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", 2))
+        self.retry_backoff = float(os.getenv("LLM_RETRY_BACKOFF_SECONDS", 0.5))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        # Concurrent identical calls of these methods share one upstream
+        # request; generate_response keys include the history, so only
+        # conversations in the same state share an answer
+        self.coalesce_methods = {
+            method.strip()
+            for method in os.getenv("LLM_COALESCE_METHODS", "generate_response,detect_escalation_need").split(",")
+            if method.strip()
+        }
+        self._in_flight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def client(self):
+        if self._client is None:
+            self.connect()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    def connect(self):
+        """Create the Gemini client, if not done yet (or given one)"""
+        if self._client is not None:
+            return
+        from google import genai
+        from google.genai import types
+
         #initialize Gemini Client
         api_key = os.getenv("GEMINI_API_KEY")
-        self.client = genai.Client(api_key=api_key)
-        self.model = "gemini-2.5-flash-lite"
+        # GEMINI_BASE_URL points the SDK at another endpoint, e.g. the fake
+        # server in benchmarks/fake_gemini_server.py
+        base_url = os.getenv("GEMINI_BASE_URL")
+        http_options = types.HttpOptions(base_url=base_url) if base_url else None
+        self._client = genai.Client(api_key=api_key, http_options=http_options)
 
-    async def generate_response(
-        self, 
-        query: str, 
+    def _cacheable(self, conversation_history: List[Dict], conversation_summary: Optional[str]) -> bool:
+        return self.response_cache is not None and (
+            (not conversation_history and not conversation_summary) or self.cache_ignores_history
+        )
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, asyncio.TimeoutError):
+            return True
+        from google.genai import errors
+
+        if isinstance(error, errors.APIError):
+            return error.code in RETRYABLE_STATUS_CODES
+        return False
+
+    @staticmethod
+    def _observe(method: str, start: float, outcome: str):
+        LLM_CALL_SECONDS.observe(time.perf_counter() - start, method=method, outcome=outcome)
+
+    @staticmethod
+    def _coalesce_key(method: str, *parts) -> str:
+        return hashlib.sha256(json.dumps([method, *parts]).encode("utf-8")).hexdigest()
+
+    async def _generate(
+        self,
+        contents,
+        config: "types.GenerateContentConfig",
+        method: str = "generate",
+        coalesce_key: Optional[str] = None
+    ):
+        """_call, shared with identical calls already in flight.
+
+        The first caller's request runs as its own task, so a caller going
+        away (e.g. a client disconnect) does not cancel it for the others.
+        """
+        if coalesce_key is None or method not in self.coalesce_methods:
+            return await self._call(contents, config, method)
+
+        task = self._in_flight.get(coalesce_key)
+        if task is not None:
+            LLM_COALESCED.inc(method=method, role="follower")
+        else:
+            LLM_COALESCED.inc(method=method, role="leader")
+            task = asyncio.ensure_future(self._call(contents, config, method))
+            self._in_flight[coalesce_key] = task
+            task.add_done_callback(lambda done: self._call_done(coalesce_key, done))
+        return await asyncio.shield(task)
+
+    def _call_done(self, key: str, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        # Mark the error as retrieved in case every caller had gone away
+        if not task.cancelled():
+            task.exception()
+
+    async def _call(self, contents, config: "types.GenerateContentConfig", method: str = "generate"):
+        """Call Gemini without blocking the event loop.
+
+        Waits for a concurrency slot, enforces LLM_TIMEOUT_SECONDS across all
+        attempts and retries transient failures with full-jitter backoff.
+        Token usage is counted under method.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+
+        for attempt in range(self.max_retries + 1):
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError("LLM call deadline exceeded")
+
+            try:
+                async with asyncio.timeout(remaining):
+                    async with self._semaphore:
+                        response = await self.client.aio.models.generate_content(
+                            model = self.model,
+                            contents = contents,
+                            config = config
+                        )
+                record_usage(method, response)
+                return response
+            except Exception as e:
+                if attempt == self.max_retries or not self._is_retryable(e):
+                    raise
+
+                delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+                if loop.time() + delay >= deadline:
+                    raise
+                await asyncio.sleep(delay)
+
+    def _build_chat_request(
+        self,
+        query: str,
         conversation_history: List[Dict],
-        faq_context: str
-    ) -> str:
-        """Generate response using Gemini with conversation Context"""
+        faq_context: str,
+        conversation_summary: Optional[str] = None
+    ) -> Tuple[List[Dict], "types.GenerateContentConfig"]:
+        """Build Gemini contents and config for a customer support reply"""
+
+        summary_context = ""
+        if conversation_summary:
+            summary_context = f"Summary of the earlier conversation:\n{conversation_summary}"
 
         #System instructions for customer support bot
         system_instruction = f"""You are a helpful customer support assistant. 
@@ -31,6 +191,8 @@ class LLMService:
 
         {faq_context}
 
+        {summary_context}
+
         Guidelines:
         - Keep responses clear and under 3 paragraphs
         - Provide actionable solutions
@@ -46,8 +208,8 @@ class LLMService:
         for msg in conversation_history[-max_history:]:
             role = "model" if msg["role"] == "assistant" else "user"
             contents.append({
-                "role": "user",
-                "parts": [{"text":query}]
+                "role": role,
+                "parts": [{"text": msg["content"]}]
             })
 
         #Add current query 
@@ -56,21 +218,129 @@ class LLMService:
             "parts": [{"text":query}]
         })
 
+        config = generation_config(
+            system_instruction = system_instruction,
+            temperature = 0.7,
+            max_output_tokens = 500
+        )
+        return contents, config
+
+    async def generate_response(
+        self, 
+        query: str, 
+        conversation_history: List[Dict],
+        faq_context: str,
+        conversation_summary: Optional[str] = None
+    ) -> str:
+        """Generate response using Gemini with conversation Context"""
+        start = time.perf_counter()
+        cacheable = self._cacheable(conversation_history, conversation_summary)
+        if cacheable:
+            cached = await self.response_cache.get(query)
+            if cached is not None:
+                self._observe("generate_response", start, "cache_hit")
+                return cached
+
+        contents, config = self._build_chat_request(
+            query, conversation_history, faq_context, conversation_summary
+        )
+
         try:
             #Generate reponse with Gemini
-            response = self.client.models.generate_content(
-                model = self.model,
-                contents = contents,
-                config = types.GenerateContentConfig(
-                    system_instruction = system_instruction,
-                    temperature = 0.7,
-                    max_output_tokens = 500
+            response = await self._generate(
+                contents,
+                config,
+                "generate_response",
+                self._coalesce_key(
+                    "generate_response",
+                    normalize_text(query),
+                    [(msg["role"], normalize_text(msg["content"])) for msg in conversation_history],
+                    faq_context,
+                    conversation_summary
                 )
             )
 
+            if cacheable and response.text:
+                await self.response_cache.set(query, response.text)
+            self._observe("generate_response", start, "ok")
             return response.text
         except Exception as e:
+            self._observe("generate_response", start, "error")
             return f"I apologize, but I'm experiencing technical difficulties. Error: {str(e)}"
+
+    async def stream_response(
+        self,
+        query: str,
+        conversation_history: List[Dict],
+        faq_context: str,
+        conversation_summary: Optional[str] = None
+    ) -> AsyncIterator[str]:
+        """Stream a Gemini response chunk by chunk.
+
+        Transient failures are retried only until the first chunk arrives;
+        LLM_TIMEOUT_SECONDS bounds the whole stream.
+        """
+        start = time.perf_counter()
+        cacheable = self._cacheable(conversation_history, conversation_summary)
+        if cacheable:
+            cached = await self.response_cache.get(query)
+            if cached is not None:
+                self._observe("stream_response", start, "cache_hit")
+                yield cached
+                return
+
+        chunks = []
+        contents, config = self._build_chat_request(
+            query, conversation_history, faq_context, conversation_summary
+        )
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        started = False
+        # Stays 'cancelled' if the consumer stops iterating early
+        outcome = "cancelled"
+        last_chunk = None
+
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    async with self._semaphore:
+                        stream = await asyncio.wait_for(
+                            self.client.aio.models.generate_content_stream(
+                                model = self.model,
+                                contents = contents,
+                                config = config
+                            ),
+                            deadline - loop.time()
+                        )
+                        while True:
+                            try:
+                                chunk = await asyncio.wait_for(
+                                    anext(stream), deadline - loop.time()
+                                )
+                            except StopAsyncIteration:
+                                if cacheable and chunks:
+                                    await self.response_cache.set(query, "".join(chunks))
+                                record_usage("stream_response", last_chunk)
+                                outcome = "ok"
+                                return
+                            last_chunk = chunk
+                            if chunk.text:
+                                started = True
+                                chunks.append(chunk.text)
+                                yield chunk.text
+                except Exception as e:
+                    if started or attempt == self.max_retries or not self._is_retryable(e):
+                        raise
+
+                    delay = random.uniform(0, self.retry_backoff * 2 ** attempt)
+                    if loop.time() + delay >= deadline:
+                        raise
+                    await asyncio.sleep(delay)
+        except Exception as e:
+            outcome = "error"
+            yield f"I apologize, but I'm experiencing technical difficulties. Error: {str(e)}"
+        finally:
+            self._observe("stream_response", start, outcome)
         
     async def summarize_conversation(self, messages: List[Dict]) -> str:
         """Summarize conversation for escalation handoff"""
@@ -79,7 +349,9 @@ class LLMService:
             f"{msg['role']}: {msg['content']}" for msg in messages
         ])
         
-        prompt = f"""Summarize this customer support conversation concisel{conversation_text}
+        prompt = f"""Summarize this customer support conversation concisely:
+        {conversation_text}
+
         Provide a brief summary including:
         1. Main issue/concern
         2. Key points discussed
@@ -87,23 +359,70 @@ class LLMService:
 
         Summary:"""
 
+        start = time.perf_counter()
         try:
-            response = self.client.models.generate_content(
-                model = self.model,
-                contents = prompt,
-                config = types.GenearateContentConfig(
+            response = await self._generate(
+                prompt,
+                generation_config(
                     temperature = 0.6,
-                    max_outuput_tokens=210
-                )
+                    max_output_tokens=210
+                ),
+                "summarize_conversation",
+                self._coalesce_key("summarize_conversation", prompt)
             )
 
+            self._observe("summarize_conversation", start, "ok")
             return response.text
 
         except Exception as e:
+            self._observe("summarize_conversation", start, "error")
             return "Unable to generate summary."
         
-    async def detect_escalation_need(self,query:str, attempt_count: int) -> Dict:
-        """Detect if query needs escalation using Gemini"""
+    async def fold_into_summary(self, previous_summary: Optional[str], messages: List[Dict]) -> Optional[str]:
+        """Fold older conversation turns into the running summary"""
+
+        conversation_text = "\n".join([
+            f"{msg['role']}: {msg['content']}" for msg in messages
+        ])
+
+        prompt = f"""Update the running summary of a customer support conversation.
+
+        Current summary:
+        {previous_summary or "(none yet)"}
+
+        New messages:
+        {conversation_text}
+
+        Write the updated summary in at most 150 words. Keep the customer's
+        issue, details they provided (order numbers, products, dates), what
+        has been tried and anything still unresolved.
+
+        Updated summary:"""
+
+        start = time.perf_counter()
+        try:
+            response = await self._generate(
+                prompt,
+                generation_config(
+                    temperature = 0.3,
+                    max_output_tokens = 300
+                ),
+                "fold_into_summary",
+                self._coalesce_key("fold_into_summary", prompt)
+            )
+
+            self._observe("fold_into_summary", start, "ok")
+            return response.text
+
+        except Exception:
+            self._observe("fold_into_summary", start, "error")
+            return None
+
+    async def detect_escalation_need(self,query:str, attempt_count: int, use_llm: bool = True) -> Dict:
+        """Detect if query needs escalation using Gemini
+
+        With use_llm=False only the attempt threshold is applied.
+        """
         
         escalation_threshold = int(os.getenv("ESCALATION_THRESHOLD", 3))
         
@@ -113,6 +432,9 @@ class LLMService:
                 'needs_escalation': True,
                 'reason': f'Query attempted {attempt_count} times without resolution'
             }
+
+        if not use_llm:
+            return {'needs_escalation': False, 'reason': 'Skipped by local pre-filter'}
         
         # Gemini-based escalation detection
         prompt = f"""Analyze if this customer query requires human escalation:
@@ -129,21 +451,24 @@ class LLMService:
         {{"needs_escalation": true/false, "reason":"brief explaination"}}
         """
 
+        start = time.perf_counter()
         try:
-            reponse = self.client.models.generate_content(
-                model = self.model,
-                contents = prompt,
-                config = types.GenearateContentConfig(
+            reponse = await self._generate(
+                prompt,
+                generation_config(
                     temperature = 0.35,
                     max_output_tokens = 100,
                     response_mime_type="application/json"
-                )
+                ),
+                "detect_escalation_need",
+                self._coalesce_key("detect_escalation_need", normalize_text(query))
             )
 
-            import json
             result = json.loads(reponse.text)
+            self._observe("detect_escalation_need", start, "ok")
             return result
         
         except Exception:
+            self._observe("detect_escalation_need", start, "error")
             return {'needs_escalation':False, 'reason':'Unable to determine'}
         
\ No newline at end of file
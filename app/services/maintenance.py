@@ -0,0 +1,309 @@
+import asyncio
+import gzip
+import json
+import os
+import traceback
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, delete, exists, func, or_, select, text, update
+
+from app.models import ChatSession, EscalationTicket, Message
+from app.services.metrics import HTTP_IN_FLIGHT, Counter
+
+MAINTENANCE_ROWS = Counter(
+    "maintenance_rows_total", "Rows changed by background session maintenance", ["action"]
+)
+
+def archive_record(row) -> Dict:
+    """Same fields as a /chat/export line"""
+    return {
+        "id": row.id,
+        "session_id": row.session_id,
+        "role": row.role,
+        "content": row.content,
+        "timestamp": row.timestamp.isoformat() if row.timestamp else None,
+        "faq_matched": row.faq_matched,
+        "confidence_score": row.confidence_score
+    }
+
+class SessionMaintenance:
+    """Background session lifecycle: idle expiry, archiving and compaction.
+
+    Each pass
+    1. closes active sessions idle for idle_timeout,
+    2. moves the messages of sessions closed for archive_after to gzipped
+       NDJSON files in archive_dir and deletes them from the hot table,
+    3. returns freed SQLite pages with incremental_vacuum.
+
+    All writes happen in transactions of at most batch_size rows with a
+    pause in between, and the batch shrinks while requests are in flight,
+    so maintenance never holds the write lock for long at peak traffic.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        session_cache=None,
+        interval: float = 300,
+        idle_timeout: float = 1800,
+        archive_after: Optional[float] = 30 * 86400,
+        archive_dir: str = "data/archive",
+        batch_size: int = 500,
+        pause: float = 0.05,
+        busy_requests: int = 8,
+        vacuum_pages: int = 1000
+    ):
+        self.session_factory = session_factory
+        self.session_cache = session_cache
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.archive_after = archive_after
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self.pause = pause
+        self.busy_requests = busy_requests
+        self.vacuum_pages = vacuum_pages
+        # A claimed archive batch not finished after this long (worker
+        # crashed mid-way) is picked up again
+        self.claim_timeout = 600
+        self.last_run: Optional[Dict] = None
+
+    @classmethod
+    def from_env(cls, session_factory, session_cache=None) -> "SessionMaintenance":
+        archive_days = float(os.getenv("SESSION_ARCHIVE_AFTER_DAYS", 30))
+        return cls(
+            session_factory,
+            session_cache,
+            interval=float(os.getenv("MAINTENANCE_INTERVAL_SECONDS", 300)),
+            idle_timeout=float(os.getenv("SESSION_IDLE_TIMEOUT_SECONDS", 1800)),
+            archive_after=archive_days * 86400 if archive_days > 0 else None,
+            archive_dir=os.getenv("ARCHIVE_DIR", "data/archive"),
+            batch_size=int(os.getenv("MAINTENANCE_BATCH_SIZE", 500)),
+            pause=int(os.getenv("MAINTENANCE_PAUSE_MS", 50)) / 1000,
+            busy_requests=int(os.getenv("MAINTENANCE_BUSY_REQUESTS", 8)),
+            vacuum_pages=int(os.getenv("MAINTENANCE_VACUUM_PAGES", 1000))
+        )
+
+    def _batch(self) -> int:
+        """batch_size, or a tenth of it while the server is busy"""
+        if HTTP_IN_FLIGHT.values.get((), 0) >= self.busy_requests:
+            return max(self.batch_size // 10, 1)
+        return self.batch_size
+
+    async def _throttle(self):
+        busy = HTTP_IN_FLIGHT.values.get((), 0) >= self.busy_requests
+        await asyncio.sleep(self.pause * (10 if busy else 1))
+
+    async def run(self):
+        """Run a pass every interval seconds until cancelled"""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Error in session maintenance: {str(e)}")
+                print(traceback.format_exc())
+
+    async def run_once(self) -> Dict:
+        stats = {
+            'expired': await self.expire_idle(),
+            'archived_sessions': 0,
+            'archived_messages': 0,
+            'vacuumed_pages': 0
+        }
+        if self.archive_after is not None:
+            sessions, messages = await self.archive()
+            stats['archived_sessions'], stats['archived_messages'] = sessions, messages
+            if messages:
+                stats['vacuumed_pages'] = await self.compact()
+        if any(stats.values()):
+            print(f"✓ Session maintenance: {stats}")
+        self.last_run = {**stats, 'finished_at': datetime.now(timezone.utc).isoformat()}
+        return stats
+
+    async def expire_idle(self) -> int:
+        """Close active sessions without activity for idle_timeout.
+
+        A message newer than the cutoff also counts as activity, which
+        covers rows whose updated_at predates it being maintained.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.idle_timeout)
+        recent_message = exists().where(
+            Message.session_id == ChatSession.session_id,
+            Message.timestamp >= cutoff
+        )
+        expired = 0
+        while True:
+            batch = self._batch()
+            async with self.session_factory() as db:
+                ids = (await db.execute(
+                    select(ChatSession.id)
+                    .where(
+                        ChatSession.is_active.is_(True),
+                        ChatSession.updated_at < cutoff,
+                        ~recent_message
+                    )
+                    .limit(batch)
+                )).scalars().all()
+                if not ids:
+                    return expired
+
+                # Re-checked in the UPDATE so a session that became active
+                # since the SELECT is left alone
+                result = await db.execute(
+                    update(ChatSession)
+                    .where(
+                        ChatSession.id.in_(ids),
+                        ChatSession.is_active.is_(True),
+                        ChatSession.updated_at < cutoff
+                    )
+                    .values(
+                        is_active=False,
+                        state_version=func.coalesce(ChatSession.state_version, 0) + 1
+                    )
+                    .returning(ChatSession.session_id)
+                )
+                closed = result.scalars().all()
+                await db.commit()
+
+            if self.session_cache is not None:
+                for session_id in closed:
+                    self.session_cache.invalidate(session_id)
+            expired += len(closed)
+            MAINTENANCE_ROWS.inc(len(closed), action="expired")
+            if len(ids) < batch:
+                return expired
+            await self._throttle()
+
+    def _archivable(self, cutoff: datetime, claim_cutoff: datetime):
+        open_ticket = exists().where(
+            EscalationTicket.session_id == ChatSession.session_id,
+            EscalationTicket.status != 'resolved'
+        )
+        has_messages = exists().where(Message.session_id == ChatSession.session_id)
+        return and_(
+            ChatSession.is_active.is_(False),
+            ChatSession.updated_at < cutoff,
+            or_(ChatSession.archived_at.is_(None), ChatSession.archived_at < claim_cutoff),
+            ~open_ticket,
+            has_messages
+        )
+
+    async def archive(self):
+        """Move transcripts of long-closed sessions to archive files.
+
+        Sessions are claimed by setting archived_at, so concurrent workers
+        never archive the same session. A batch's file is written and
+        synced before any of its messages are deleted; if the process dies
+        in between, the claim times out and the rest is archived again.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.archive_after)
+        archived_sessions = archived_messages = 0
+
+        while True:
+            claim_cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.claim_timeout)
+            async with self.session_factory() as db:
+                # Sessions are small next to their messages; claim a few per batch
+                candidates = (await db.execute(
+                    select(ChatSession.id)
+                    .where(self._archivable(cutoff, claim_cutoff))
+                    .limit(max(self._batch() // 20, 1))
+                )).scalars().all()
+                if not candidates:
+                    return archived_sessions, archived_messages
+
+                result = await db.execute(
+                    update(ChatSession)
+                    .where(
+                        ChatSession.id.in_(candidates),
+                        or_(ChatSession.archived_at.is_(None), ChatSession.archived_at < claim_cutoff)
+                    )
+                    # Not activity: keep updated_at so a stale claim still matches
+                    .values(archived_at=datetime.now(timezone.utc), updated_at=ChatSession.updated_at)
+                    .returning(ChatSession.session_id)
+                )
+                claimed = result.scalars().all()
+                await db.commit()
+
+            if claimed:
+                archived_messages += await self._archive_sessions(claimed)
+                archived_sessions += len(claimed)
+                MAINTENANCE_ROWS.inc(len(claimed), action="archived_sessions")
+            await self._throttle()
+
+    async def _archive_sessions(self, session_ids: List[str]) -> int:
+        os.makedirs(self.archive_dir, exist_ok=True)
+        name = f"messages-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}.ndjson.gz"
+        path = os.path.join(self.archive_dir, name)
+        tmp_path = path + ".tmp"
+
+        ids: List[int] = []
+        async with self.session_factory() as db:
+            result = await db.stream(
+                select(Message.__table__)
+                .where(Message.session_id.in_(session_ids))
+                .order_by(Message.id)
+                .execution_options(yield_per=self.batch_size)
+            )
+            archive = await asyncio.to_thread(gzip.open, tmp_path, "wt", encoding="utf-8")
+            try:
+                async for rows in result.partitions():
+                    ids.extend(row.id for row in rows)
+                    lines = "".join(json.dumps(archive_record(row)) + "\n" for row in rows)
+                    await asyncio.to_thread(archive.write, lines)
+            finally:
+                await asyncio.to_thread(archive.close)
+
+        def publish():
+            with open(tmp_path, "rb") as f:
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        await asyncio.to_thread(publish)
+
+        # Delete in short transactions so writers are never blocked for long
+        position = 0
+        while position < len(ids):
+            chunk = ids[position:position + self._batch()]
+            position += len(chunk)
+            async with self.session_factory() as db:
+                await db.execute(delete(Message).where(Message.id.in_(chunk)))
+                await db.commit()
+            MAINTENANCE_ROWS.inc(len(chunk), action="archived_messages")
+            await self._throttle()
+
+        print(f"✓ Archived {len(ids)} messages of {len(session_ids)} sessions to {path}")
+        return len(ids)
+
+    async def compact(self) -> int:
+        """Give pages freed by archiving back to the filesystem.
+
+        SQLite only, and only databases created with auto_vacuum=INCREMENTAL
+        (see app.database); freeing vacuum_pages at a time keeps each
+        lock short. Postgres reclaims dead rows with autovacuum.
+        """
+        async with self.session_factory() as db:
+            engine = db.bind
+        if engine.dialect.name != "sqlite":
+            return 0
+
+        freed = 0
+        async with engine.connect() as conn:
+            if (await conn.exec_driver_sql("PRAGMA auto_vacuum")).scalar() != 2:
+                return 0
+            driver_connection = (await conn.get_raw_connection()).driver_connection
+            while True:
+                free_pages = (await conn.exec_driver_sql("PRAGMA freelist_count")).scalar()
+                await conn.commit()
+                if not free_pages:
+                    break
+                step = min(free_pages, self.vacuum_pages)
+                # The sqlite3 module steps a pragma statement only once (one
+                # page); executescript runs it to completion
+                await driver_connection.executescript(f"PRAGMA incremental_vacuum({step});")
+                freed += step
+                MAINTENANCE_ROWS.inc(step, action="vacuumed_pages")
+                await self._throttle()
+            await conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+        return freed
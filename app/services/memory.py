@@ -0,0 +1,111 @@
+import asyncio
+import os
+import traceback
+from typing import Dict, List, Set
+
+from sqlalchemy import func, select, update
+
+from app.models import ChatSession, Message
+from app.services.text import estimate_tokens
+
+class ConversationMemory:
+    """Rolling per-session summary that keeps prompt size flat.
+
+    Once the messages after a session's summary point exceed a token
+    threshold, a background task folds all but the most recent ones into
+    ChatSession.summary. Prompts are then summary + recent window.
+    """
+
+    def __init__(self, llm_service, session_factory, session_cache=None):
+        self.llm_service = llm_service
+        self.session_factory = session_factory
+        self.session_cache = session_cache
+        self.token_threshold = int(os.getenv("SUMMARY_TOKEN_THRESHOLD", 1500))
+        self.keep_recent = int(os.getenv("SUMMARY_KEEP_RECENT_MESSAGES", 6))
+
+        self._folding: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def needs_fold(self, messages: List[Dict], window_full: bool) -> bool:
+        """True when unsummarized history is over budget or past the window"""
+        if len(messages) <= self.keep_recent:
+            return False
+        tokens = sum(estimate_tokens(msg["content"]) for msg in messages)
+        return window_full or tokens > self.token_threshold
+
+    def is_folding(self, session_id: str) -> bool:
+        return session_id in self._folding
+
+    def schedule_fold(self, session_id: str):
+        """Fold older turns into the summary in the background, once per session"""
+        if session_id in self._folding:
+            return
+
+        self._folding.add(session_id)
+        task = asyncio.create_task(self._fold(session_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _fold(self, session_id: str):
+        try:
+            # Read what to fold, then let go of the connection: no
+            # transaction is held open while the LLM call runs
+            async with self.session_factory() as db:
+                result = await db.execute(
+                    select(ChatSession.summary, ChatSession.summary_message_id)
+                    .where(ChatSession.session_id == session_id)
+                )
+                row = result.one_or_none()
+                if row is None:
+                    return
+                summary, summary_message_id = row
+
+                query = select(Message.id, Message.role, Message.content).where(
+                    Message.session_id == session_id
+                )
+                if summary_message_id is not None:
+                    query = query.where(Message.id > summary_message_id)
+                result = await db.execute(query.order_by(Message.timestamp, Message.id))
+                pending = result.all()
+
+            older = pending[:-self.keep_recent]
+            if not older:
+                return
+
+            new_summary = await self.llm_service.fold_into_summary(
+                summary,
+                [{"role": msg.role, "content": msg.content} for msg in older]
+            )
+            if not new_summary:
+                return
+
+            async with self.session_factory() as db:
+                # Only advance from the summary point this fold started at
+                await db.execute(
+                    update(ChatSession)
+                    .where(ChatSession.session_id == session_id)
+                    .where(
+                        ChatSession.summary_message_id.is_(None)
+                        if summary_message_id is None
+                        else ChatSession.summary_message_id == summary_message_id
+                    )
+                    .values(
+                        summary=new_summary,
+                        summary_message_id=older[-1].id,
+                        state_version=func.coalesce(ChatSession.state_version, 0) + 1
+                    )
+                )
+                await db.commit()
+
+            if self.session_cache is not None:
+                self.session_cache.invalidate(session_id)
+        except Exception as e:
+            print(f"Error folding conversation summary for {session_id}: {str(e)}")
+            print(traceback.format_exc())
+        finally:
+            self._folding.discard(session_id)
+
+    async def drain(self):
+        """Wait for in-flight folds, e.g. on shutdown"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
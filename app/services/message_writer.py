@@ -0,0 +1,174 @@
+import asyncio
+import os
+import traceback
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from app.models import Message
+
+def _naive_utc(value: datetime) -> datetime:
+    # SQLite hands timestamps back without tzinfo
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+class MessageWriter:
+    """Write-behind persistence for chat messages.
+
+    add() queues a Message and returns immediately; a background task
+    inserts queued rows in one multi-row INSERT per batch, flushing when
+    batch_size rows are waiting or flush_interval seconds after the first.
+    Until a row is committed it stays in a per-session overlay so reads
+    can merge it with what the database returns (see unflushed()).
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        enabled: bool = False,
+        batch_size: int = 100,
+        flush_interval: float = 0.05
+    ):
+        self.session_factory = session_factory
+        self.enabled = enabled
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.flushed_rows = 0
+        self.flushed_batches = 0
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending: Dict[str, List[Message]] = {}
+
+    @classmethod
+    def from_env(cls, session_factory) -> "MessageWriter":
+        return cls(
+            session_factory,
+            enabled=os.getenv("MESSAGE_WRITE_BEHIND", "false").lower() == "true",
+            batch_size=int(os.getenv("MESSAGE_BATCH_SIZE", 100)),
+            flush_interval=float(os.getenv("MESSAGE_FLUSH_INTERVAL_MS", 50)) / 1000
+        )
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._run())
+
+    def add(self, **values) -> Message:
+        """Queue a message row; it is committed by the next batch"""
+        self.start()
+        values.setdefault("timestamp", datetime.now(timezone.utc))
+        values.setdefault("faq_matched", False)
+        values.setdefault("confidence_score", None)
+        message = Message(**values)
+
+        self._pending.setdefault(message.session_id, []).append(message)
+        self._queue.put_nowait(message)
+        return message
+
+    def snapshot(self, session_id: str) -> List[Message]:
+        """Queued messages of a session; take this *before* querying the database"""
+        return list(self._pending.get(session_id, ()))
+
+    @staticmethod
+    def unflushed(snapshot: List[Message], latest_flushed: Optional[datetime]) -> List[Message]:
+        """Messages from snapshot that a later query did not already return.
+
+        A session's rows are committed in order, so anything at or before
+        the newest timestamp the query saw is already in its result.
+        """
+        if latest_flushed is None:
+            return snapshot
+        latest = _naive_utc(latest_flushed)
+        return [message for message in snapshot if _naive_utc(message.timestamp) > latest]
+
+    async def _run(self):
+        batch: List[Message] = []
+        closing = False
+        failures = 0
+        loop = asyncio.get_running_loop()
+
+        while not (closing and not batch):
+            if not batch and not closing:
+                message = await self._queue.get()
+                if message is None:
+                    closing = True
+                else:
+                    batch.append(message)
+
+            deadline = loop.time() + self.flush_interval
+            while not closing and len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    message = await asyncio.wait_for(self._queue.get(), timeout)
+                except TimeoutError:
+                    break
+                if message is None:
+                    closing = True
+                else:
+                    batch.append(message)
+
+            if not batch:
+                continue
+            try:
+                await self._write(batch)
+                batch = []
+                failures = 0
+            except Exception as e:
+                # Keep the batch and retry; the rows stay visible via the overlay
+                failures += 1
+                print(f"Error writing {len(batch)} queued messages: {str(e)}")
+                print(traceback.format_exc())
+                if closing and failures >= 3:
+                    print(f"Dropping {len(batch)} queued messages on shutdown")
+                    return
+                await asyncio.sleep(max(self.flush_interval, 0.5))
+
+    async def _write(self, batch: List[Message]):
+        rows = [
+            {
+                "session_id": message.session_id,
+                "role": message.role,
+                "content": message.content,
+                "timestamp": message.timestamp,
+                "faq_matched": message.faq_matched,
+                "confidence_score": message.confidence_score,
+            }
+            for message in batch
+        ]
+        async with self.session_factory() as db:
+            await db.execute(insert(Message).values(rows))
+            await db.commit()
+
+        self.flushed_rows += len(rows)
+        self.flushed_batches += 1
+
+        written = {id(message) for message in batch}
+        for session_id in {message.session_id for message in batch}:
+            remaining = [m for m in self._pending.get(session_id, ()) if id(m) not in written]
+            if remaining:
+                self._pending[session_id] = remaining
+            else:
+                self._pending.pop(session_id, None)
+
+    async def close(self):
+        """Flush everything still queued, e.g. on shutdown"""
+        if self._task is None:
+            return
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'queued': self._queue.qsize() if self._queue else 0,
+            'unflushed_sessions': len(self._pending),
+            'flushed_rows': self.flushed_rows,
+            'flushed_batches': self.flushed_batches
+        }
@@ -0,0 +1,264 @@
+import os
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; spans an FAQ lookup (sub-ms) up to a slow LLM call with retries
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+SERVER_TIMING_HEADER = os.getenv("SERVER_TIMING_HEADER", "false").lower() == "true"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _label_text(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Registry:
+    """Metrics rendered together in the Prometheus text exposition format"""
+
+    def __init__(self):
+        self.metrics: List["Metric"] = []
+
+    def register(self, metric: "Metric"):
+        self.metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+REGISTRY = Registry()
+
+class Metric:
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.values.items():
+            yield f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}"
+
+class Gauge(Metric):
+    """Gauge set directly, or read at scrape time from function.
+
+    function returns a number, or a dict of label-value tuples to numbers.
+    """
+    type = "gauge"
+
+    def __init__(self, *args, function: Optional[Callable] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values: Dict[Tuple[str, ...], float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[str]:
+        values = self.values
+        if self.function is not None:
+            try:
+                result = self.function()
+            except Exception:
+                return
+            if result is None:
+                return
+            values = result if isinstance(result, dict) else {(): result}
+        for key, value in values.items():
+            yield f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}"
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts (last is +Inf), sum, count]
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def time(self, **labels) -> "_HistogramTimer":
+        return _HistogramTimer(self, labels)
+
+    def samples(self) -> Iterable[str]:
+        for key, (counts, total, count) in self.series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_number(bound)}"'
+                yield f"{self.name}_bucket{_label_text(self.labelnames, key, le)} {cumulative}"
+            labels = _label_text(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_number(total)}"
+            yield f"{self.name}_count{labels} {count}"
+
+class _HistogramTimer:
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+# Application metrics
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"]
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being handled")
+CHAT_STAGE_SECONDS = Histogram(
+    "chat_stage_duration_seconds", "Duration of each /chat pipeline stage", ["stage"]
+)
+LLM_CALL_SECONDS = Histogram(
+    "llm_call_duration_seconds", "LLMService call latency, including retries", ["method", "outcome"]
+)
+LLM_COALESCED = Counter(
+    "llm_coalesced_calls_total",
+    "Coalescable LLM calls that made the upstream request (leader) or shared one (follower)",
+    ["method", "role"]
+)
+
+def _coalesce_ratio() -> Dict[Tuple[str, ...], float]:
+    methods = {key[0] for key in LLM_COALESCED.values}
+    ratios = {}
+    for method in methods:
+        leaders = LLM_COALESCED.get(method=method, role="leader")
+        followers = LLM_COALESCED.get(method=method, role="follower")
+        ratios[(method,)] = followers / (leaders + followers) if leaders + followers else 0.0
+    return ratios
+
+LLM_COALESCE_RATIO = Gauge(
+    "llm_coalesce_ratio", "Share of coalescable LLM calls served by another call's request",
+    ["method"], function=_coalesce_ratio
+)
+LLM_TOKENS = Counter(
+    "llm_tokens_total", "Gemini tokens reported by usage metadata", ["method", "direction"]
+)
+ESCALATION_DECISIONS = Counter(
+    "escalation_decisions_total", "Escalation checks by deciding component", ["source", "result"]
+)
+ADMISSION_DECISIONS = Counter(
+    "admission_decisions_total",
+    "LLM work admitted straight away, after queueing, or served FAQ-only instead",
+    ["result"]
+)
+FAQ_LOOKUPS = Counter("faq_lookups_total", "FAQ matches attempted for chat messages", ["result"])
+
+def _faq_hit_ratio() -> float:
+    hits, misses = FAQ_LOOKUPS.get(result="hit"), FAQ_LOOKUPS.get(result="miss")
+    return hits / (hits + misses) if hits + misses else 0.0
+
+FAQ_HIT_RATIO = Gauge(
+    "faq_hit_ratio", "Share of chat messages answered from the FAQ", function=_faq_hit_ratio
+)
+
+def record_usage(method: str, response) -> None:
+    """Count prompt/output tokens of a Gemini response, if it reports usage"""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    if usage.prompt_token_count:
+        LLM_TOKENS.inc(usage.prompt_token_count, method=method, direction="in")
+    if usage.candidates_token_count:
+        LLM_TOKENS.inc(usage.candidates_token_count, method=method, direction="out")
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency and in-flight requests.
+
+    With SERVER_TIMING_HEADER=true, responses of requests that attached a
+    StageTimer as scope["stage_timer"] carry a Server-Timing header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                timer = scope.get("stage_timer")
+                if SERVER_TIMING_HEADER and timer is not None:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", timer.server_timing().encode("latin-1"))
+                    ]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status
+            )
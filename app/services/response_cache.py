@@ -0,0 +1,346 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Iterator, Optional, Set
+
+from app.services.text import STOPWORDS, normalize_text, tokenize
+
+@dataclass
+class CacheEntry:
+    key: str
+    response: str
+    version: str
+    created_at: float
+
+    @property
+    def size(self) -> int:
+        return len(self.key.encode("utf-8")) + len(self.response.encode("utf-8"))
+
+class MemoryCacheBackend:
+    """Entries in an OrderedDict kept in least-recently-used order"""
+
+    # Cheap enough to call on the event loop
+    blocking = False
+
+    def __init__(self):
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self.total_bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def keys(self) -> Iterator[str]:
+        return iter(list(self._entries))
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, entry: CacheEntry):
+        self.delete(entry.key)
+        self._entries[entry.key] = entry
+        self.total_bytes += entry.size
+
+    def delete(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def oldest_key(self) -> Optional[str]:
+        return next(iter(self._entries), None)
+
+    def retain_version(self, version: str):
+        for key in [key for key, entry in self._entries.items() if entry.version != version]:
+            self.delete(key)
+
+class SQLiteCacheBackend:
+    """Entries in a local SQLite file so the cache survives restarts.
+
+    Calls do disk I/O, so ResponseCache runs them off the event loop.
+    Hits record their access time in memory; it is written in one batch
+    with the next write.
+    """
+
+    blocking = True
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        # key -> last access time not yet written
+        self._touched: Dict[str, float] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                version TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_response_cache_last_access ON response_cache (last_access)"
+        )
+        self._count_entries()
+
+    def _count_entries(self):
+        self.count, self.total_bytes = self._conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM response_cache"
+        ).fetchone()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def keys(self) -> Iterator[str]:
+        return iter([row[0] for row in self._conn.execute("SELECT key FROM response_cache")])
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, version, created_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._touched[key] = time.time()
+        return CacheEntry(key=key, response=row[0], version=row[1], created_at=row[2])
+
+    def _flush_touched(self):
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE response_cache SET last_access = ? WHERE key = ?",
+                [(accessed, key) for key, accessed in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def put(self, entry: CacheEntry):
+        with self._lock:
+            self._flush_touched()
+            self._delete(entry.key)
+            self._conn.execute(
+                "INSERT INTO response_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (entry.key, entry.response, entry.version, entry.created_at, time.time(), entry.size)
+            )
+            self.count += 1
+            self.total_bytes += entry.size
+
+    def _delete(self, key: str):
+        row = self._conn.execute(
+            "SELECT size FROM response_cache WHERE key = ?", (key,)
+        ).fetchone()
+        if row is not None:
+            self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+            self._touched.pop(key, None)
+            self.count -= 1
+            self.total_bytes -= row[0]
+
+    def delete(self, key: str):
+        with self._lock:
+            self._delete(key)
+
+    def oldest_key(self) -> Optional[str]:
+        with self._lock:
+            self._flush_touched()
+            row = self._conn.execute(
+                "SELECT key FROM response_cache ORDER BY last_access LIMIT 1"
+            ).fetchone()
+        return row[0] if row else None
+
+    def retain_version(self, version: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM response_cache WHERE version != ?", (version,))
+            self._touched.clear()
+            self._count_entries()
+
+class ResponseCache:
+    """Cache of LLM answers keyed on normalized query text.
+
+    Entries expire after ttl seconds and the least recently used ones are
+    evicted once max_bytes is exceeded. Every entry is tagged with the FAQ
+    catalog version; set_version drops entries from other versions. With
+    similarity > 0 a miss falls back to the cached query with the highest
+    token Jaccard similarity at or above that threshold.
+    """
+
+    def __init__(
+        self,
+        backend=None,
+        ttl: float = 3600,
+        max_bytes: int = 8 * 1024 * 1024,
+        similarity: float = 0.0,
+        version: str = ""
+    ):
+        self.backend = backend or MemoryCacheBackend()
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.similarity = similarity
+        self.version = version
+
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Near-duplicate lookup: content token -> cache keys
+        self._token_index: Dict[str, Set[str]] = {}
+        self._key_tokens: Dict[str, FrozenSet[str]] = {}
+
+        # Blocking backends run on one worker thread, which also keeps
+        # their updates of the token index in order
+        self._executor = (
+            ThreadPoolExecutor(max_workers=1, thread_name_prefix="response-cache")
+            if self.backend.blocking else None
+        )
+
+        self._retain(version)
+
+    @classmethod
+    def from_env(cls, version: str = "") -> Optional["ResponseCache"]:
+        """Build the cache configured by RESPONSE_CACHE_* variables, or None"""
+        if os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() != "true":
+            return None
+
+        backend = None
+        if os.getenv("RESPONSE_CACHE_BACKEND", "memory") == "sqlite":
+            backend = SQLiteCacheBackend(os.getenv("RESPONSE_CACHE_PATH", "./response_cache.db"))
+
+        return cls(
+            backend=backend,
+            ttl=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", 3600)),
+            max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 8 * 1024 * 1024)),
+            similarity=float(os.getenv("RESPONSE_CACHE_SIMILARITY", 0)),
+            version=version
+        )
+
+    @staticmethod
+    def _content_tokens(key: str) -> FrozenSet[str]:
+        return frozenset(token for token in tokenize(key) if token not in STOPWORDS)
+
+    def _rebuild_token_index(self):
+        self._token_index.clear()
+        self._key_tokens.clear()
+        if self.similarity > 0:
+            for key in self.backend.keys():
+                self._index_key(key)
+
+    def _index_key(self, key: str):
+        tokens = self._content_tokens(key)
+        self._key_tokens[key] = tokens
+        for token in tokens:
+            self._token_index.setdefault(token, set()).add(key)
+
+    def _unindex_key(self, key: str):
+        for token in self._key_tokens.pop(key, ()):
+            keys = self._token_index.get(token)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._token_index[token]
+
+    def _delete(self, key: str):
+        self.backend.delete(key)
+        self._unindex_key(key)
+
+    def _nearest_key(self, key: str) -> Optional[str]:
+        tokens = self._content_tokens(key)
+        candidates = set()
+        for token in tokens:
+            candidates |= self._token_index.get(token, set())
+
+        best_key, best_score = None, self.similarity
+        for candidate in candidates:
+            other = self._key_tokens[candidate]
+            score = len(tokens & other) / len(tokens | other)
+            if score >= best_score:
+                best_key, best_score = candidate, score
+        return best_key
+
+    def _lookup(self, key: str) -> Optional[CacheEntry]:
+        entry = self.backend.get(key)
+        if entry is not None and time.time() - entry.created_at > self.ttl:
+            self._delete(key)
+            return None
+        return entry
+
+    async def _run(self, function, *args):
+        if self._executor is None:
+            return function(*args)
+        return await asyncio.get_running_loop().run_in_executor(self._executor, function, *args)
+
+    async def get(self, query: str) -> Optional[str]:
+        return await self._run(self._get, normalize_text(query))
+
+    def _get(self, key: str) -> Optional[str]:
+        entry = self._lookup(key)
+        if entry is not None:
+            self.hits += 1
+            return entry.response
+
+        if self.similarity > 0:
+            nearest = self._nearest_key(key)
+            entry = self._lookup(nearest) if nearest else None
+            if entry is not None:
+                self.near_hits += 1
+                return entry.response
+
+        self.misses += 1
+        return None
+
+    async def set(self, query: str, response: str):
+        key = normalize_text(query)
+        if key:
+            await self._run(self._set, key, response)
+
+    def _set(self, key: str, response: str):
+        entry = CacheEntry(key=key, response=response, version=self.version, created_at=time.time())
+        if entry.size > self.max_bytes:
+            return
+
+        self._delete(key)
+        self.backend.put(entry)
+        if self.similarity > 0:
+            self._index_key(key)
+
+        while self.backend.total_bytes > self.max_bytes:
+            oldest = self.backend.oldest_key()
+            if oldest is None:
+                break
+            self._delete(oldest)
+            self.evictions += 1
+
+    def set_version(self, version: str):
+        """Invalidate entries created for a different FAQ catalog"""
+        if version == self.version:
+            return
+        self.version = version
+        if self._executor is None:
+            self._retain(version)
+        else:
+            # Ordered before any lookup or write submitted after it
+            self._executor.submit(self._retain, version)
+
+    def _retain(self, version: str):
+        self.backend.retain_version(version)
+        self._rebuild_token_index()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            'hits': self.hits,
+            'near_hits': self.near_hits,
+            'misses': self.misses,
+            'hit_ratio': round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'entries': len(self.backend),
+            'bytes': self.backend.total_bytes,
+            'max_bytes': self.max_bytes,
+            'version': self.version
+        }
@@ -0,0 +1,158 @@
+import hashlib
+import math
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.embeddings import Embedder, HashedNgramEmbedder
+from app.services.faq_index import SearchHit
+
+CALIBRATION_SAMPLE = 256
+
+def faq_document(faq: Dict, include_question: bool = True) -> str:
+    """Text that represents an FAQ in embedding space"""
+    parts = [faq.get('question', '')] if include_question else []
+    parts.append(faq.get('answer', ''))
+    parts.extend(faq.get('keywords', []))
+    return " ".join(parts)
+
+class SemanticFAQIndex:
+    """Dense retrieval over a precomputed FAQ embedding matrix.
+
+    All FAQ vectors live in one contiguous float32 matrix. When a cache
+    directory is given the matrix is written there once and memory-mapped
+    read-only, so every worker process shares the same pages.
+    """
+
+    def __init__(
+        self,
+        faqs: Sequence[Dict],
+        embedder: Optional[Embedder] = None,
+        cache_dir: Optional[str] = None
+    ):
+        self.embedder = embedder or HashedNgramEmbedder()
+        documents = [faq_document(faq) for faq in faqs]
+
+        if cache_dir and documents:
+            self.matrix = self._load_or_build(documents, Path(cache_dir))
+        else:
+            self.matrix = self._build(documents)
+
+        self._center, self._scale = self._calibrate(faqs)
+
+    def __len__(self) -> int:
+        return self.matrix.shape[0]
+
+    def updated(self, faqs: Sequence[Dict], changed: Iterable[int]) -> "SemanticFAQIndex":
+        """New index for faqs that re-embeds only the changed rows.
+
+        faqs may be longer than this index (appended FAQs must be listed
+        in changed). The result lives in memory rather than the cache.
+        """
+        changed = sorted(set(changed))
+        clone = object.__new__(SemanticFAQIndex)
+        clone.embedder = self.embedder
+
+        matrix = np.zeros((len(faqs), self.embedder.dim), dtype=np.float32)
+        kept = min(len(self), len(faqs))
+        matrix[:kept] = self.matrix[:kept]
+        if changed:
+            matrix[changed] = self.embedder.embed([faq_document(faqs[doc_id]) for doc_id in changed])
+        clone.matrix = matrix
+
+        clone._center, clone._scale = clone._calibrate(faqs)
+        return clone
+
+    def _build(self, documents: List[str]) -> np.ndarray:
+        if not documents:
+            return np.zeros((0, self.embedder.dim), dtype=np.float32)
+        return np.ascontiguousarray(self.embedder.embed(documents), dtype=np.float32)
+
+    def _load_or_build(self, documents: List[str], cache_dir: Path) -> np.ndarray:
+        digest = hashlib.sha256(self.embedder.name.encode("utf-8"))
+        for document in documents:
+            digest.update(b"\0" + document.encode("utf-8"))
+        path = cache_dir / f"faq_embeddings-{digest.hexdigest()[:16]}.npy"
+
+        if not path.exists():
+            cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, "wb") as f:
+                np.save(f, self._build(documents))
+            os.replace(tmp_path, path)
+
+        return np.load(path, mmap_mode="r")
+
+    def _calibrate(self, faqs: Sequence[Dict]) -> tuple:
+        """Fit a logistic mapping from match evidence to confidence.
+
+        Evidence is the top similarity plus its margin over the runner-up.
+        Each sampled FAQ question is scored against its own answer and
+        keywords (a paraphrase-like positive) and, with its own row
+        removed, against the best remaining FAQ (a near-miss negative);
+        the midpoint between the two means maps to 50%.
+        """
+        sample = list(faqs[:CALIBRATION_SAMPLE])
+        if len(sample) < 3:
+            return 0.35, 0.05
+
+        questions = self.embedder.embed([faq.get('question', '') for faq in sample])
+        bodies = self.embedder.embed([faq_document(faq, include_question=False) for faq in sample])
+
+        own = np.einsum("ij,ij->i", questions, bodies)
+        others = questions @ np.asarray(self.matrix[:len(sample)]).T
+        np.fill_diagonal(others, -1.0)
+        ranked = -np.sort(-others, axis=1)
+
+        positives = own + (own - ranked[:, 0])
+        negatives = ranked[:, 0] + (ranked[:, 0] - ranked[:, 1])
+
+        pos_mean = float(positives.mean())
+        neg_mean = float(negatives.mean())
+        center = (pos_mean + neg_mean) / 2
+        scale = max((pos_mean - neg_mean) / 4, 0.02)
+        return center, scale
+
+    def confidence(self, similarity: float, margin: float) -> int:
+        evidence = similarity + margin
+        return round(100 / (1 + math.exp(-(evidence - self._center) / self._scale)))
+
+    def search(self, query: str, limit: int = 5) -> List[SearchHit]:
+        """Score every FAQ with one matrix-vector product and keep the top k"""
+        if self.matrix.shape[0] == 0 or not query.strip():
+            return []
+
+        query_vector = self.embedder.embed([query])[0]
+        return self._top_hits(self.matrix @ query_vector, limit)
+
+    def search_many(self, queries: Sequence[str], limit: int = 5) -> List[List[SearchHit]]:
+        """search() for many queries with one embedding call and one matrix product"""
+        if self.matrix.shape[0] == 0 or not queries:
+            return [[] for _ in queries]
+
+        similarities = self.embedder.embed(list(queries)) @ self.matrix.T
+        return [
+            self._top_hits(row, limit) if query.strip() else []
+            for query, row in zip(queries, similarities)
+        ]
+
+    def _top_hits(self, similarities: np.ndarray, limit: int) -> List[SearchHit]:
+        n = similarities.shape[0]
+        # Keep one extra candidate so the last hit also has a runner-up
+        k = min(limit + 1, n)
+        top = np.argpartition(-similarities, k - 1)[:k]
+        top = top[np.argsort(-similarities[top])]
+        scores = [float(similarities[doc_id]) for doc_id in top]
+        scores.append(scores[-1])
+
+        return [
+            SearchHit(
+                doc_id=int(doc_id),
+                score=scores[rank],
+                confidence=self.confidence(scores[rank], scores[rank] - scores[rank + 1]),
+                keyword_hit=False
+            )
+            for rank, doc_id in enumerate(top[:limit])
+        ]
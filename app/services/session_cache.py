@@ -0,0 +1,163 @@
+import os
+import time
+from datetime import datetime, timezone
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+from typing import Dict, List, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import ChatSession, Message
+from app.services.message_writer import MessageWriter, _naive_utc
+
+@dataclass
+class SessionState:
+    """The parts of a ChatSession row the request path needs"""
+    session_id: str
+    created_at: object
+    is_active: bool
+    escalated: bool
+    summary: Optional[str]
+    summary_message_id: Optional[int]
+    version: int
+    updated_at: object = None
+    # None until counted; kept current by write-through afterwards
+    message_count: Optional[int] = None
+    cached_at: float = field(default_factory=time.monotonic)
+
+    def idle_seconds(self) -> float:
+        """Seconds since updated_at was last written"""
+        if self.updated_at is None:
+            return float("inf")
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return (now - _naive_utc(self.updated_at)).total_seconds()
+
+    @classmethod
+    def from_row(cls, session: ChatSession) -> "SessionState":
+        return cls(
+            session_id=session.session_id,
+            created_at=session.created_at,
+            is_active=bool(session.is_active),
+            escalated=bool(session.escalated),
+            summary=session.summary,
+            summary_message_id=session.summary_message_id,
+            version=session.state_version or 0,
+            updated_at=session.updated_at
+        )
+
+class SessionStateCache:
+    """LRU + TTL cache of session state, so a chat turn skips the session lookup.
+
+    Writes in this worker update entries in place. Writes from other workers
+    bump ChatSession.state_version; once an entry is older than ttl seconds
+    it is revalidated with a version-only query and reloaded if it changed.
+    """
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 5.0, enabled: bool = True):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.enabled = enabled
+        self._entries: "OrderedDict[str, SessionState]" = OrderedDict()
+
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @classmethod
+    def from_env(cls) -> "SessionStateCache":
+        return cls(
+            max_entries=int(os.getenv("SESSION_CACHE_MAX_ENTRIES", 10000)),
+            ttl=float(os.getenv("SESSION_CACHE_TTL_SECONDS", 5)),
+            enabled=os.getenv("SESSION_CACHE_ENABLED", "true").lower() == "true"
+        )
+
+    def put(self, state: SessionState):
+        if not self.enabled:
+            return
+        state.cached_at = time.monotonic()
+        self._entries[state.session_id] = state
+        self._entries.move_to_end(state.session_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def update(self, session_id: str, **changes):
+        """Write-through for changes this worker just committed"""
+        state = self._entries.get(session_id)
+        if state is not None:
+            self._entries[session_id] = replace(state, **changes)
+
+    def invalidate(self, session_id: str):
+        if self._entries.pop(session_id, None) is not None:
+            self.invalidations += 1
+
+    async def get(self, db: AsyncSession, session_id: str) -> Optional[SessionState]:
+        """Cached state of a session, loading it on a miss; None if unknown"""
+        state = self._entries.get(session_id)
+        if state is not None:
+            if time.monotonic() - state.cached_at <= self.ttl:
+                self._entries.move_to_end(session_id)
+                self.hits += 1
+                return state
+
+            result = await db.execute(
+                select(ChatSession.state_version).where(ChatSession.session_id == session_id)
+            )
+            version = result.scalar_one_or_none()
+            if (version or 0) == state.version:
+                self.revalidations += 1
+                # Other workers may have added messages; recount lazily
+                state.message_count = None
+                self.put(state)
+                return state
+            self.invalidate(session_id)
+
+        self.misses += 1
+        result = await db.execute(
+            select(ChatSession).where(ChatSession.session_id == session_id)
+        )
+        session = result.scalar_one_or_none()
+        if session is None:
+            return None
+
+        state = SessionState.from_row(session)
+        self.put(state)
+        return state
+
+    async def message_count(
+        self,
+        db: AsyncSession,
+        state: SessionState,
+        queued: List[Message] = ()
+    ) -> int:
+        """Message count from an aggregate over the session_id index, then cached.
+
+        queued is a MessageWriter snapshot taken before this call; chat turns
+        keep the count current afterwards through update().
+        """
+        if state.message_count is None:
+            result = await db.execute(
+                select(func.count(), func.max(Message.timestamp))
+                .where(Message.session_id == state.session_id)
+            )
+            count, latest = result.one()
+            state.message_count = count + len(MessageWriter.unflushed(list(queued), latest))
+        return state.message_count
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.revalidations + self.misses
+        return {
+            'enabled': self.enabled,
+            'hits': self.hits,
+            'revalidations': self.revalidations,
+            'misses': self.misses,
+            'hit_ratio': round((self.hits + self.revalidations) / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl
+        }
@@ -0,0 +1,48 @@
+import re
+from typing import List
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Function words that carry no intent on their own (stored stemmed)
+STOPWORDS = frozenset({
+    "a", "an", "the", "i", "me", "my", "you", "your", "we", "our", "it", "is",
+    "are", "am", "be", "do", "doe", "did", "can", "could", "would", "will",
+    "to", "of", "in", "on", "for", "with", "and", "or", "what", "when",
+    "where", "how", "why", "which", "who", "thi", "that", "there", "please",
+    # Request filler: "can I get", "I want", "I need help with"
+    "get", "want", "need", "help", "have", "ha", "just", "some", "any", "about",
+    "tell", "know", "like", "if",
+})
+
+_VOWELS = frozenset("aeiou")
+
+def _undouble(stem: str) -> str:
+    # "shipp" (shipping, shipped) -> "ship"; keep "bill", "pass", "buzz"
+    if len(stem) > 2 and stem[-1] == stem[-2] and stem[-1] not in _VOWELS and stem[-1] not in "lsz":
+        return stem[:-1]
+    return stem
+
+def normalize_text(text: str) -> str:
+    """Lowercase text and collapse punctuation/whitespace to single spaces"""
+    return " ".join(_TOKEN_RE.findall(text.lower()))
+
+def stem(token: str) -> str:
+    """Very light suffix stripping so 'orders'/'ordered' match 'order'
+    and 'shipping'/'internationally' match 'ship'/'international'"""
+    if len(token) > 5 and token.endswith("ing"):
+        return _undouble(token[:-3])
+    if len(token) > 4 and token.endswith("ed"):
+        return _undouble(token[:-2])
+    if len(token) > 6 and token.endswith("ly"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Split text into normalized, stemmed tokens"""
+    return [stem(token) for token in _TOKEN_RE.findall(text.lower())]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token for English text)"""
+    return len(text) // 4 + 1
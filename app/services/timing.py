@@ -0,0 +1,45 @@
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Dict, TypeVar
+
+T = TypeVar("T")
+
+class StageTimer:
+    """Collects wall-clock durations (ms) of named pipeline stages.
+
+    Stages may overlap, e.g. when run concurrently with asyncio.gather.
+    With a histogram (labelled by stage), every stage is also observed there.
+    """
+
+    def __init__(self, histogram=None):
+        self._started = time.perf_counter()
+        self.timings: Dict[str, float] = {}
+        self.histogram = histogram
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = round(elapsed * 1000, 2)
+            if self.histogram is not None:
+                self.histogram.observe(elapsed, stage=name)
+
+    def mark(self, name: str):
+        """Record the time elapsed since the timer started, e.g. first token"""
+        self.timings[name] = round((time.perf_counter() - self._started) * 1000, 2)
+
+    async def run(self, name: str, awaitable: Awaitable[T]) -> T:
+        with self.stage(name):
+            return await awaitable
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. 'load_history;dur=1.2, total;dur=40.1'"""
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
+
+    def as_dict(self) -> Dict[str, float]:
+        timings = dict(self.timings)
+        timings["total"] = round((time.perf_counter() - self._started) * 1000, 2)
+        return timings
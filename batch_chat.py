@@ -0,0 +1,103 @@
+"""Answer a backlog of customer messages offline.
+
+Input is NDJSON, one {"session_id", "message", "ref"} object per line
+(session_id and ref are optional). Results are appended to the output
+file as NDJSON. Progress is checkpointed in the database after every
+chunk, so re-running the same command resumes where it stopped; each
+chunk's results are synced to the output before its checkpoint commits,
+and results past the checkpoint are trimmed on resume.
+
+    python batch_chat.py backlog.ndjson --output results.ndjson --workers 32
+"""
+from dotenv import load_dotenv
+
+load_dotenv()
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+def default_job_id(path: str) -> str:
+    """Same input file, same job: re-running resumes it"""
+    return "batch-" + hashlib.sha1(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+
+def trim_output(path: str, position: int) -> int:
+    """Drop results after input line `position`, e.g. written by a run that
+    crashed before its checkpoint committed. Returns the bytes dropped."""
+    if not os.path.exists(path):
+        return 0
+    keep = 0
+    with open(path, "rb") as f:
+        for raw in f:
+            try:
+                complete = raw.endswith(b"\n") and json.loads(raw)["line"] <= position
+            except (ValueError, KeyError, TypeError):
+                complete = False
+            if not complete:
+                break
+            keep += len(raw)
+        size = f.seek(0, os.SEEK_END)
+    if keep < size:
+        os.truncate(path, keep)
+    return size - keep
+
+async def run(args):
+    from app.database import init_db
+    from app.routes import chat
+    from app.services.batch_chat import iterate_lines
+
+    await init_db()
+    processor = chat.batch_processor
+    if args.workers:
+        processor.workers = args.workers
+    if args.chunk_size:
+        processor.chunk_size = args.chunk_size
+
+    job_id = args.job_id or default_job_id(args.input)
+    output = args.output or os.path.splitext(args.input)[0] + ".results.ndjson"
+    print(f"Job {job_id}: {args.input} -> {output} "
+          f"({processor.workers} workers, chunks of {processor.chunk_size})")
+
+    previous = await processor.job_status(job_id)
+    dropped = trim_output(output, previous["position"] if previous else 0)
+    if dropped:
+        print(f"  dropped {dropped} bytes of uncommitted results from {output}")
+
+    processed = 0
+    start = time.perf_counter()
+    with open(output, "a", encoding="utf-8") as out:
+        async def write_chunk(results):
+            # On disk before the checkpoint commits, so a crash never loses them
+            out.write("".join(json.dumps(result) + "\n" for result in results))
+            out.flush()
+            os.fsync(out.fileno())
+
+        lines = iterate_lines(args.input)
+        async for result in processor.run(lines, job_id, os.path.abspath(args.input), on_chunk=write_chunk):
+            if "job" in result:
+                job = result["job"]
+                continue
+            processed += 1
+            if processed % processor.chunk_size == 0:
+                elapsed = time.perf_counter() - start
+                print(f"  {processed} messages, {processed / elapsed:.1f} msg/s")
+
+    elapsed = time.perf_counter() - start
+    rate = processed / elapsed if elapsed else 0.0
+    print(f"✓ {processed} messages in {elapsed:.1f} s ({rate:.1f} msg/s)")
+    print(f"  job totals: {job}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Answer an NDJSON backlog of customer messages")
+    parser.add_argument("input", help="NDJSON file of {session_id, message, ref} lines")
+    parser.add_argument("--output", help="results file (default: <input>.results.ndjson)")
+    parser.add_argument("--job-id", help="checkpoint name (default: derived from the input path)")
+    parser.add_argument("--workers", type=int, help="concurrent LLM calls (BATCH_WORKERS)")
+    parser.add_argument("--chunk-size", type=int, help="lines per transaction (BATCH_CHUNK_SIZE)")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Benchmark: batch processing vs. one POST /chat per message.
+
+Both paths run in-process on a temporary SQLite database with the fake
+Gemini client (benchmarks/fake_gemini.py), so only the app's own
+overhead and the simulated LLM latency are measured. The per-message
+path creates a session and posts one message per backlog line with
+--concurrency virtual clients; the batch path runs BatchChatProcessor
+with the same number of workers.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_chat --messages 2000 --concurrency 32 --llm-latency 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+
+def backlog(count: int, queries_path: str):
+    with open(queries_path) as f:
+        queries = [line.strip() for line in f if line.strip()]
+    # A reference number keeps every message unique (no cache or coalescing)
+    return [
+        {"message": f"{queries[i % len(queries)]} (order #{100000 + i})", "ref": i}
+        for i in range(count)
+    ]
+
+async def per_message(app, items, concurrency: int) -> float:
+    import httpx
+
+    pending = list(reversed(items))
+
+    async def client_loop(client):
+        while pending:
+            item = pending.pop()
+            response = await client.post("/session/new")
+            session_id = response.json()["session_id"]
+            response = await client.post("/chat/", json={"session_id": session_id, "message": item["message"]})
+            assert response.status_code == 200, response.text
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+        return time.perf_counter() - start
+
+async def batched(processor, items) -> float:
+    async def lines():
+        for item in items:
+            yield json.dumps(item)
+
+    start = time.perf_counter()
+    async for result in processor.run(lines()):
+        assert "error" not in result, result
+    return time.perf_counter() - start
+
+async def run(args):
+    from main import app
+    from app.routes import chat
+    from benchmarks.fake_gemini import FakeGeminiClient
+
+    # main loads .env with override=True; make sure we still use the temp database
+    if os.environ.get("DATABASE_URL") != args.database_url:
+        raise SystemExit("DATABASE_URL was overridden (by .env?)")
+
+    client = FakeGeminiClient(latency=args.llm_latency, jitter=args.llm_latency / 5)
+    chat.llm_service.client = client
+    items = backlog(args.messages, args.queries)
+
+    print(f"{args.messages} messages, fake LLM {args.llm_latency * 1e3:.0f} ms/call, "
+          f"concurrency {args.concurrency}\n")
+    print(f"{'path':<14} {'wall s':>8} {'msg/s':>9} {'llm calls':>10}")
+    async with app.router.lifespan_context(app):
+        for name in ("per-message", "batch"):
+            calls = client.calls
+            if name == "per-message":
+                wall = await per_message(app, items, args.concurrency)
+            else:
+                chat.batch_processor.workers = args.concurrency
+                chat.batch_processor.chunk_size = args.chunk_size
+                wall = await batched(chat.batch_processor, items)
+            print(f"{name:<14} {wall:>8.2f} {args.messages / wall:>9.1f} {client.calls - calls:>10}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32, help="HTTP clients / batch workers")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--queries", default="data/sample_queries.txt")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    args.database_url = f"sqlite+aiosqlite:///{os.path.join(tmp.name, 'batch.db')}"
+    os.environ.update({
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "fake-key"),
+        "DATABASE_URL": args.database_url,
+        "DB_ECHO": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "LLM_MAX_CONCURRENCY": str(max(args.concurrency, 32)),
+        "MAINTENANCE_INTERVAL_SECONDS": "0",
+    })
+    try:
+        asyncio.run(run(args))
+    finally:
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Micro-benchmark: FAQ lookup latency, inverted index vs. the old linear scan.
+
+Run from the repository root:
+    python -m benchmarks.bench_faq_lookup
+"""
+import random
+import time
+from typing import Dict, List, Optional
+
+from app.services.faq_service import FAQService
+
+SIZES = [10, 1_000, 100_000]
+QUERIES_PER_SIZE = 200
+
+def make_vocabulary(size: int, rng: random.Random) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(4, 9))) for _ in range(size)]
+
+def make_faqs(count: int, vocab: List[str], rng: random.Random) -> List[Dict]:
+    return [
+        {
+            "question": " ".join(rng.sample(vocab, 6)) + "?",
+            "answer": " ".join(rng.sample(vocab, 25)) + ".",
+            "keywords": rng.sample(vocab, 5),
+        }
+        for _ in range(count)
+    ]
+
+def linear_scan(faqs: List[Dict], query: str) -> Optional[Dict]:
+    """The previous FAQService.find_matching_faq implementation"""
+    query_lower = query.lower()
+    for faq in faqs:
+        if any(keyword.lower() in query_lower for keyword in faq.get("keywords", [])):
+            return faq
+    return None
+
+def time_per_query(fn, queries: List[str]) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        fn(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+def main():
+    rng = random.Random(42)
+    vocab = make_vocabulary(20_000, rng)
+
+    print(f"{'faqs':>8} {'build ms':>10} {'index us/q':>12} {'scan us/q':>12}")
+    for size in SIZES:
+        faqs = make_faqs(size, vocab, rng)
+        queries = [
+            " ".join(rng.sample(vocab, 3) + [rng.choice(faqs)["keywords"][0]])
+            for _ in range(QUERIES_PER_SIZE)
+        ]
+
+        start = time.perf_counter()
+        service = FAQService(faqs=faqs)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        index_us = time_per_query(service.find_matching_faq, queries)
+        scan_us = time_per_query(lambda q: linear_scan(faqs, q), queries)
+
+        print(f"{size:>8} {build_ms:>10.1f} {index_us:>12.1f} {scan_us:>12.1f}")
+
+if __name__ == "__main__":
+    main()
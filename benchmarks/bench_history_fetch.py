@@ -0,0 +1,91 @@
+"""Benchmark: per-message history loading for long sessions.
+
+Compares the old full-transcript fetch with the bounded window plus
+aggregate count now used by /chat, on a SQLite database holding sessions
+of 10k messages.
+
+Run from the repository root:
+    python -m benchmarks.bench_history_fetch
+"""
+import asyncio
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.models import Base, Message
+
+SESSIONS = 5
+MESSAGES_PER_SESSION = 10_000
+WINDOW = 14
+RUNS = 50
+
+async def seed(conn):
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    for session in range(SESSIONS):
+        rows = [
+            {
+                "session_id": f"session-{session}",
+                "role": "user" if i % 2 == 0 else "assistant",
+                "content": f"message {i} " + "lorem ipsum " * 20,
+                "timestamp": start + timedelta(seconds=i),
+                "faq_matched": False,
+            }
+            for i in range(MESSAGES_PER_SESSION)
+        ]
+        await conn.execute(insert(Message), rows)
+
+async def full_fetch(conn, session_id):
+    result = await conn.execute(
+        select(Message.__table__)
+        .where(Message.session_id == session_id)
+        .order_by(Message.timestamp)
+    )
+    rows = result.all()
+    return rows[-WINDOW:], sum(1 for row in rows if row.role == "user")
+
+async def bounded_fetch(conn, session_id):
+    result = await conn.execute(
+        select(Message.__table__)
+        .where(Message.session_id == session_id)
+        .order_by(Message.timestamp.desc(), Message.id.desc())
+        .limit(WINDOW)
+    )
+    recent = list(reversed(result.all()))
+    count = await conn.execute(
+        select(Message.role, func.count())
+        .where(Message.session_id == session_id)
+        .group_by(Message.role)
+    )
+    return recent, dict(count.all()).get("user", 0)
+
+async def time_query(conn, fn) -> float:
+    start = time.perf_counter()
+    for run in range(RUNS):
+        await fn(conn, f"session-{run % SESSIONS}")
+    return (time.perf_counter() - start) / RUNS * 1e3
+
+async def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await seed(conn)
+
+        async with engine.connect() as conn:
+            plan = await conn.execute(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM messages WHERE session_id = 'session-0' "
+                "ORDER BY timestamp DESC, id DESC LIMIT 14"
+            ))
+            print("plan:", "; ".join(row[-1] for row in plan))
+            print(f"{SESSIONS} sessions x {MESSAGES_PER_SESSION} messages, window={WINDOW}")
+            print(f"full fetch:    {await time_query(conn, full_fetch):8.2f} ms/turn")
+            print(f"bounded fetch: {await time_query(conn, bounded_fetch):8.2f} ms/turn")
+
+        await engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,146 @@
+"""Benchmark: /chat under overload, with and without admission control.
+
+Messages arrive at a fixed --rate (open loop, like real users who do not
+wait for each other) while the fake Gemini client answers in
+--llm-latency seconds, more than LLM_MAX_CONCURRENCY slots can keep up
+with. One noisy client sends --noisy-share of the traffic; the rest is
+spread over --clients other clients.
+
+"unbounded" disables admission control, so every turn waits for an LLM
+slot; "admission" uses the ADMISSION_* settings from the environment.
+Reported per path: latency percentiles of quiet and noisy clients, and
+how many turns were answered by the LLM, from the FAQs, or FAQ-only.
+
+Run from the repository root:
+    python -m benchmarks.bench_overload --rate 80 --duration 10 --llm-latency 2
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from typing import Dict, List
+
+from benchmarks.load_llm_service import percentile
+
+def load_queries(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+async def one_turn(client, message: str, samples: List, outcomes: Counter):
+    start = time.perf_counter()
+    response = await client.post("/session/new")
+    session_id = response.json()["session_id"]
+    response = await client.post("/chat/", json={"session_id": session_id, "message": message})
+    samples.append(time.perf_counter() - start)
+    if response.status_code != 200:
+        outcomes["error"] += 1
+        return
+    body = response.json()
+    # FAQ hits under overload are flagged degraded too (local escalation check)
+    outcomes["faq" if body["faq_matched"] else "faq-only" if body["degraded"] else "llm"] += 1
+
+async def drive(app, args, queries: List[str]) -> Dict:
+    import httpx
+
+    def connect(host: str):
+        transport = httpx.ASGITransport(app=app, client=(host, 50000))
+        return httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120)
+
+    noisy = connect("10.0.0.1")
+    quiet = [connect(f"10.0.1.{i}") for i in range(args.clients)]
+    samples = {"quiet": [], "noisy": []}
+    outcomes = Counter()
+    rng = random.Random(0)
+
+    tasks = []
+    start = time.perf_counter()
+    for i in range(int(args.rate * args.duration)):
+        # Unique messages: no response cache hits or coalescing
+        message = f"{queries[i % len(queries)]} (order #{100000 + i})"
+        if rng.random() < args.noisy_share:
+            tasks.append(asyncio.create_task(one_turn(noisy, message, samples["noisy"], outcomes)))
+        else:
+            client = quiet[i % len(quiet)]
+            tasks.append(asyncio.create_task(one_turn(client, message, samples["quiet"], outcomes)))
+        await asyncio.sleep(max(0.0, start + (i + 1) / args.rate - time.perf_counter()))
+    await asyncio.gather(*tasks)
+    wall = time.perf_counter() - start
+
+    for client in [noisy, *quiet]:
+        await client.aclose()
+    return {"samples": samples, "outcomes": outcomes, "wall": wall}
+
+def print_row(name: str, result: Dict):
+    cells = []
+    for group in ("quiet", "noisy"):
+        samples = result["samples"][group]
+        cells += [percentile(samples, 50) * 1e3, percentile(samples, 99) * 1e3] if samples else [0.0, 0.0]
+    outcomes = result["outcomes"]
+    print(f"{name:<10} {cells[0]:>9.0f} {cells[1]:>9.0f} {cells[2]:>9.0f} {cells[3]:>9.0f} "
+          f"{outcomes['llm']:>6} {outcomes['faq']:>6} {outcomes['faq-only']:>9} {outcomes['error']:>6}")
+
+async def run(args):
+    from main import app
+    from app.routes import chat
+    from app.services.admission import AdmissionController
+    from benchmarks.fake_gemini import FakeGeminiClient
+
+    # main loads .env with override=True; make sure we still use the temp database
+    if os.environ.get("DATABASE_URL") != args.database_url:
+        raise SystemExit("DATABASE_URL was overridden (by .env?)")
+
+    chat.llm_service.client = FakeGeminiClient(latency=args.llm_latency, jitter=args.llm_latency / 10)
+    queries = load_queries(args.queries)
+    configured = chat.admission
+
+    print(f"{args.rate:.0f} msg/s for {args.duration:.0f} s, fake LLM {args.llm_latency * 1e3:.0f} ms/call, "
+          f"{chat.llm_service.max_concurrency} LLM slots, noisy client {args.noisy_share:.0%} of traffic\n")
+    print(f"{'path':<10} {'quiet p50':>9} {'quiet p99':>9} {'noisy p50':>9} {'noisy p99':>9} "
+          f"{'llm':>6} {'faq':>6} {'faq-only':>9} {'errors':>6}")
+    async with app.router.lifespan_context(app):
+        for name in ("unbounded", "admission"):
+            if name == "unbounded":
+                chat.admission = AdmissionController(
+                    capacity=10**9, max_queue=10**9, max_queue_per_client=10**9,
+                    degrade_queue_depth=10**9, degrade_delay=float("inf")
+                )
+            else:
+                chat.admission = configured
+            result = await drive(app, args, queries)
+            print_row(name, result)
+            # Let the LLM slots drain before the next path
+            while chat.llm_service._semaphore._value < chat.llm_service.max_concurrency:
+                await asyncio.sleep(0.1)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rate", type=float, default=80, help="messages per second")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of traffic")
+    parser.add_argument("--llm-latency", type=float, default=2.0)
+    parser.add_argument("--clients", type=int, default=20, help="quiet clients")
+    parser.add_argument("--noisy-share", type=float, default=0.5)
+    parser.add_argument("--queries", default="data/sample_queries.txt")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    args.database_url = f"sqlite+aiosqlite:///{os.path.join(tmp.name, 'overload.db')}"
+    os.environ.update({
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "fake-key"),
+        "DATABASE_URL": args.database_url,
+        "DB_ECHO": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "MAINTENANCE_INTERVAL_SECONDS": "0",
+        "FAQ_RELOAD_INTERVAL_SECONDS": "0",
+        # The LLM deadline would otherwise cap the unbounded path's latency
+        "LLM_TIMEOUT_SECONDS": os.getenv("LLM_TIMEOUT_SECONDS", "120"),
+    })
+    try:
+        asyncio.run(run(args))
+    finally:
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
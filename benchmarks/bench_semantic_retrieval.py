@@ -0,0 +1,90 @@
+"""Benchmark: semantic (embedding matrix) vs. keyword FAQ retrieval.
+
+Reports hit rate on paraphrased queries against data/faqs.json and lookup
+latency on synthetic catalogs. Requires numpy.
+
+Run from the repository root:
+    python -m benchmarks.bench_semantic_retrieval
+"""
+import json
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from app.services.faq_service import FAQService
+from benchmarks.bench_faq_lookup import make_faqs, make_vocabulary, time_per_query
+
+SIZES = [10, 1_000, 10_000]
+QUERIES_PER_SIZE = 200
+CONFIDENCE_THRESHOLD = 70
+
+# (query, expected FAQ question) pairs; most avoid the literal keywords
+PARAPHRASES = [
+    ("When are you open?", "What are your business hours?"),
+    ("what time do you open on monday", "What are your business hours?"),
+    ("are you working on saturday", "What are your business hours?"),
+    ("I forgot my password", "How do I reset my password?"),
+    ("cannot log into my account", "How do I reset my password?"),
+    ("my login link expired", "How do I reset my password?"),
+    ("Can I get a refund?", "What is your refund policy?"),
+    ("I want my money returned", "What is your refund policy?"),
+    ("how long do refunds take to process", "What is your refund policy?"),
+    ("Where is my order?", "How can I track my order?"),
+    ("where are my orders", "How can I track my order?"),
+    ("has my package shipped yet", "How can I track my order?"),
+    ("Do you ship to Canada?", "Do you offer international shipping?"),
+    ("do you deliver to other countries", "Do you offer international shipping?"),
+    ("how long does delivery abroad take", "Do you offer international shipping?"),
+]
+
+def evaluate_accuracy(service: FAQService) -> tuple:
+    top1 = answered = correct = 0
+    for query, expected in PARAPHRASES:
+        match = service.find_matching_faq(query)
+        if not match:
+            continue
+        top1 += match['question'] == expected
+        if match['confidence'] > CONFIDENCE_THRESHOLD:
+            answered += 1
+            correct += match['question'] == expected
+    return top1, answered, correct
+
+def main():
+    # Keep benchmark embedding matrices out of the real cache directory
+    cache_dir = tempfile.mkdtemp(prefix="faq-embeddings-")
+    os.environ["FAQ_EMBEDDING_CACHE_DIR"] = cache_dir
+
+    with open("data/faqs.json") as f:
+        faqs = json.load(f)
+
+    print(f"Paraphrase set: {len(PARAPHRASES)} queries, threshold > {CONFIDENCE_THRESHOLD}")
+    print(f"{'mode':>10} {'top-1':>8} {'answered':>10} {'correct':>10}")
+    for mode in ("keyword", "semantic", "hybrid"):
+        top1, answered, correct = evaluate_accuracy(FAQService(faqs=faqs, retrieval_mode=mode))
+        print(f"{mode:>10} {top1:>8} {answered:>10} {correct:>10}")
+
+    rng = random.Random(7)
+    vocab = make_vocabulary(20_000, rng)
+
+    print()
+    print(f"{'faqs':>8} {'build ms':>10} {'keyword us/q':>14} {'semantic us/q':>15}")
+    for size in SIZES:
+        catalog = make_faqs(size, vocab, rng)
+        queries = [" ".join(rng.sample(vocab, 4)) for _ in range(QUERIES_PER_SIZE)]
+
+        keyword = FAQService(faqs=catalog, retrieval_mode="keyword")
+
+        start = time.perf_counter()
+        semantic = FAQService(faqs=catalog, retrieval_mode="semantic")
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        keyword_us = time_per_query(keyword.find_matching_faq, queries)
+        semantic_us = time_per_query(semantic.find_matching_faq, queries)
+        print(f"{size:>8} {build_ms:>10.1f} {keyword_us:>14.1f} {semantic_us:>15.1f}")
+
+    shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Benchmark: worker startup time under different startup configurations.
+
+For each configuration a fresh `uvicorn main:app` process is started
+--runs times against the same migrated SQLite database, with Gemini
+served by benchmarks/fake_gemini_server.py. Reported (medians):
+
+    ready     spawn until GET /health first answers
+    imports   time to import main, from the worker's own report
+    server    worker's startup phases (/health startup_ms)
+    first llm latency of the first chat turn that needs the LLM
+
+followed by an import profile of main: the packages that take longest
+to import, cumulative.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+from typing import Dict, List
+
+from benchmarks.load_chat import free_port, start_fake_gemini
+
+CONFIGURATIONS = {
+    "eager": {"STARTUP_MODE": "eager", "DB_AUTO_MIGRATE": "true"},
+    "lazy": {"STARTUP_MODE": "lazy", "DB_AUTO_MIGRATE": "true"},
+    # Schema migrated once ahead of the workers (python main.py migrate)
+    "lazy+premigrated": {"STARTUP_MODE": "lazy", "DB_AUTO_MIGRATE": "false"},
+}
+# No FAQ matches this, so it is answered by the LLM
+LLM_MESSAGE = "Could you write me a short poem about the sea?"
+
+def start_worker(env: Dict[str, str], port: int) -> Dict:
+    import httpx
+
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+        stdout=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as client:
+            deadline = time.monotonic() + 60
+            while True:
+                try:
+                    health = client.get("/health")
+                    break
+                except httpx.TransportError:
+                    if time.monotonic() > deadline or process.poll() is not None:
+                        raise SystemExit("worker did not start")
+                    time.sleep(0.005)
+            ready = time.perf_counter() - started
+
+            session_id = client.post("/session/new").json()["session_id"]
+            start = time.perf_counter()
+            response = client.post("/chat/", json={"session_id": session_id, "message": LLM_MESSAGE})
+            assert response.status_code == 200 and not response.json()["faq_matched"], response.text
+            first_llm = time.perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+    return {"ready": ready, "first_llm": first_llm, "startup_ms": health.json()["startup_ms"]}
+
+def import_profile(env: Dict[str, str], top: int) -> List[tuple]:
+    """Top-level packages by cumulative import time (us) when importing main"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        env=env, capture_output=True, text=True, check=True
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|(\s*)(\S+)", line)
+        if not match:
+            continue
+        cumulative, indent, module = int(match.group(1)), len(match.group(2)), match.group(3)
+        # Packages where they are first imported, and main itself
+        if "." not in module or indent <= 1:
+            packages[module] = max(packages.get(module, 0), cumulative)
+    return sorted(packages.items(), key=lambda item: -item[1])[:top]
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="worker starts per configuration")
+    parser.add_argument("--llm-latency", type=float, default=0.05)
+    parser.add_argument("--top", type=int, default=10, help="packages in the import profile")
+    args = parser.parse_args()
+
+    gemini_port = free_port()
+    fake = start_fake_gemini(SimpleNamespace(
+        llm_latency=args.llm_latency, llm_jitter=0.0, tokens_per_second=1000.0,
+        error_rate=0.0, error_status=503
+    ), gemini_port)
+    tmp = tempfile.TemporaryDirectory()
+    base_env = dict(
+        os.environ,
+        GEMINI_API_KEY=os.getenv("GEMINI_API_KEY", "fake-key"),
+        GEMINI_BASE_URL=f"http://127.0.0.1:{gemini_port}",
+        DATABASE_URL=f"sqlite+aiosqlite:///{os.path.join(tmp.name, 'startup.db')}",
+        DB_ECHO="false",
+        RESPONSE_CACHE_ENABLED="false",
+        MAINTENANCE_INTERVAL_SECONDS="0",
+        ASSETS_DIR=os.path.join(tmp.name, "dist"),
+    )
+    try:
+        # Migrate and build assets up front, as a deploy step would
+        subprocess.run([sys.executable, "main.py", "migrate"], env=base_env, check=True, stdout=subprocess.DEVNULL)
+        subprocess.run([sys.executable, "main.py", "prebuild"], env=base_env, check=True, stdout=subprocess.DEVNULL)
+
+        print(f"{args.runs} worker starts per configuration, fake LLM {args.llm_latency * 1e3:.0f} ms/call\n")
+        print(f"{'configuration':<18} {'ready ms':>9} {'imports':>8} {'migrate':>8} {'llm':>6} {'first llm ms':>13}")
+        for name, overrides in CONFIGURATIONS.items():
+            env = dict(base_env, **overrides)
+            runs = [start_worker(env, free_port()) for _ in range(args.runs)]
+
+            def median_ms(key):
+                return statistics.median(run["startup_ms"].get(key, 0.0) for run in runs)
+
+            print(f"{name:<18} {statistics.median(run['ready'] for run in runs) * 1e3:>9.0f} "
+                  f"{median_ms('imports'):>8.0f} {median_ms('migrate'):>8.0f} {median_ms('llm_client'):>6.0f} "
+                  f"{statistics.median(run['first_llm'] for run in runs) * 1e3:>13.0f}")
+
+        print("\nimport profile of main (cumulative ms):")
+        for module, micros in import_profile(base_env, args.top):
+            print(f"  {module:<28} {micros / 1e3:>8.1f}")
+    finally:
+        fake.terminate()
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Benchmark: bytes and requests per chat UI page load, before and after
+the asset build.
+
+"before" serves frontend/ as the app used to: StaticFiles under /static
+and FileResponse for /chat-ui, unminified and uncompressed. "after"
+serves a build() through StaticAssets. A simulated browser loads
+/chat-ui and the /static files it references (CDN assets are not
+counted), first with an empty cache and then --reloads more times with
+the cache from the first load: entries that are still fresh under their
+Cache-Control are not requested, the others are revalidated with
+If-None-Match / If-Modified-Since.
+
+Run from the repository root:
+    python -m benchmarks.bench_static_assets --reloads 10
+"""
+import argparse
+import asyncio
+import re
+import tempfile
+import time
+from typing import Dict, Tuple
+
+BROWSER_ACCEPT_ENCODING = "gzip, deflate, br, zstd"
+ASSET_REF = re.compile(r'(?:href|src)="(/static/[^"]+)"')
+
+def wire_bytes(response) -> int:
+    """Status line, headers and body as sent (body still encoded)"""
+    headers = sum(len(name) + len(value) + 4 for name, value in response.headers.raw)
+    return len(f"HTTP/1.1 {response.status_code} {response.reason_phrase}\r\n") + headers + 2 + response.num_bytes_downloaded
+
+def fresh(headers: Dict[str, str]) -> bool:
+    cache_control = headers.get("cache-control", "")
+    return "max-age=" in cache_control and "no-cache" not in cache_control
+
+class Browser:
+    """Just enough of a browser cache to count what goes over the wire"""
+
+    def __init__(self, client):
+        self.client = client
+        # url -> response headers and decoded body
+        self.cache: Dict[str, Tuple[Dict[str, str], bytes]] = {}
+        self.requests = 0
+        self.bytes = 0
+
+    async def get(self, url: str) -> bytes:
+        cached = self.cache.get(url)
+        if cached is not None and fresh(cached[0]):
+            return cached[1]
+
+        headers = {"accept-encoding": BROWSER_ACCEPT_ENCODING}
+        if cached is not None:
+            if "etag" in cached[0]:
+                headers["if-none-match"] = cached[0]["etag"]
+            if "last-modified" in cached[0]:
+                headers["if-modified-since"] = cached[0]["last-modified"]
+        response = await self.client.get(url, headers=headers)
+        self.requests += 1
+        self.bytes += wire_bytes(response)
+        if response.status_code == 304:
+            return cached[1]
+        assert response.status_code == 200, (url, response.status_code)
+        self.cache[url] = (dict(response.headers), response.content)
+        return response.content
+
+    async def load_page(self):
+        page = (await self.get("/chat-ui")).decode("utf-8")
+        for url in ASSET_REF.findall(page):
+            await self.get(url)
+
+def before_app():
+    from fastapi import FastAPI
+    from fastapi.responses import FileResponse
+    from fastapi.staticfiles import StaticFiles
+
+    app = FastAPI()
+    app.mount("/static", StaticFiles(directory="frontend"), name="static")
+
+    @app.get("/chat-ui")
+    async def serve_chat_ui():
+        return FileResponse("frontend/index.html")
+    return app
+
+def after_app(output_dir: str):
+    from fastapi import FastAPI, Request
+    from app.services.assets import StaticAssets
+
+    static_assets = StaticAssets("frontend", output_dir)
+    started = time.perf_counter()
+    static_assets.prepare()
+    print(f"build: {(time.perf_counter() - started) * 1e3:.0f} ms\n")
+
+    app = FastAPI()
+    app.mount("/static", static_assets, name="static")
+
+    @app.get("/chat-ui")
+    async def serve_chat_ui(request: Request):
+        return static_assets.response(request, "index.html")
+    return app
+
+async def measure(app, reloads: int):
+    import httpx
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        browser = Browser(client)
+        await browser.load_page()
+        cold = (browser.requests, browser.bytes)
+        browser.requests = browser.bytes = 0
+        for _ in range(reloads):
+            await browser.load_page()
+        return cold, (browser.requests / reloads, browser.bytes / reloads)
+
+async def run(args):
+    with tempfile.TemporaryDirectory() as output_dir:
+        apps = (("before", before_app()), ("after", after_app(output_dir)))
+        print(f"{'path':<8} {'cold reqs':>9} {'cold bytes':>11} {'warm reqs':>9} {'warm bytes':>11}")
+        for name, app in apps:
+            (cold_requests, cold_bytes), (warm_requests, warm_bytes) = await measure(app, args.reloads)
+            print(f"{name:<8} {cold_requests:>9} {cold_bytes:>11} {warm_requests:>9.1f} {warm_bytes:>11.0f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reloads", type=int, default=10, help="warm page loads after the first")
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+if __name__ == "__main__":
+    main()
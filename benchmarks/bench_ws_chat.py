@@ -0,0 +1,138 @@
+"""Benchmark: chat turns over POST /chat vs. one WebSocket per session.
+
+Starts the app with uvicorn on a local port (temporary SQLite database,
+in-process fake Gemini client) and drives --sessions conversations of
+--turns messages each, --concurrency at a time, first over HTTP (one
+keep-alive client per conversation, as a browser would) and then over
+/ws/chat/{session_id}. Reports per-turn latency and turns per second.
+
+Run from the repository root:
+    python -m benchmarks.bench_ws_chat --sessions 100 --turns 10 --concurrency 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import tempfile
+import time
+from typing import List
+
+from benchmarks.load_llm_service import percentile
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def load_queries(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+async def http_conversation(base_url: str, messages: List[str], samples: List[float]):
+    import httpx
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        session_id = (await client.post("/session/new")).json()["session_id"]
+        for message in messages:
+            start = time.perf_counter()
+            response = await client.post("/chat/", json={"session_id": session_id, "message": message})
+            assert response.status_code == 200, response.text
+            samples.append(time.perf_counter() - start)
+
+async def ws_conversation(base_url: str, messages: List[str], samples: List[float]):
+    import httpx
+    import websockets
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        session_id = (await client.post("/session/new")).json()["session_id"]
+    async with websockets.connect(f"{base_url.replace('http', 'ws', 1)}/ws/chat/{session_id}") as ws:
+        assert json.loads(await ws.recv())["type"] == "ready"
+        for message in messages:
+            start = time.perf_counter()
+            await ws.send(json.dumps({"type": "message", "message": message}))
+            while True:
+                frame = json.loads(await ws.recv())
+                if frame["type"] == "ping":
+                    await ws.send(json.dumps({"type": "pong"}))
+                elif frame["type"] == "error":
+                    raise RuntimeError(frame["detail"])
+                elif frame["type"] == "done":
+                    break
+            samples.append(time.perf_counter() - start)
+
+async def drive(conversation, base_url: str, args, queries: List[str]):
+    samples: List[float] = []
+    pending = list(range(args.sessions))
+
+    async def worker():
+        while pending:
+            index = pending.pop()
+            messages = [
+                f"{queries[(index + turn) % len(queries)]} (ref {index}-{turn})"
+                for turn in range(args.turns)
+            ]
+            await conversation(base_url, messages, samples)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+    return samples, time.perf_counter() - start
+
+async def run(args):
+    import uvicorn
+    from main import app
+    from app.routes import chat
+    from benchmarks.fake_gemini import FakeGeminiClient
+
+    # main loads .env with override=True; make sure we still use the temp database
+    if os.environ.get("DATABASE_URL") != args.database_url:
+        raise SystemExit("DATABASE_URL was overridden (by .env?)")
+    chat.llm_service.client = FakeGeminiClient(latency=args.llm_latency, jitter=args.llm_latency / 5)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.05)
+
+    queries = load_queries(args.queries)
+    base_url = f"http://127.0.0.1:{port}"
+    print(f"{args.sessions} sessions x {args.turns} turns, concurrency {args.concurrency}, "
+          f"fake LLM {args.llm_latency * 1e3:.0f} ms/call\n")
+    print(f"{'transport':<10} {'turns/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    try:
+        for name, conversation in (("http", http_conversation), ("websocket", ws_conversation)):
+            samples, wall = await drive(conversation, base_url, args, queries)
+            print(f"{name:<10} {len(samples) / wall:>9.1f} {percentile(samples, 50) * 1e3:>8.1f} "
+                  f"{percentile(samples, 95) * 1e3:>8.1f} {percentile(samples, 99) * 1e3:>8.1f}")
+    finally:
+        server.should_exit = True
+        await serving
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=10, help="messages per session")
+    parser.add_argument("--concurrency", type=int, default=20, help="conversations at a time")
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    parser.add_argument("--queries", default="data/sample_queries.txt")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    args.database_url = f"sqlite+aiosqlite:///{os.path.join(tmp.name, 'ws.db')}"
+    os.environ.update({
+        "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "fake-key"),
+        "DATABASE_URL": args.database_url,
+        "DB_ECHO": "false",
+        "RESPONSE_CACHE_ENABLED": "false",
+        "MAINTENANCE_INTERVAL_SECONDS": "0",
+        # Long conversations would otherwise hit the attempt threshold
+        "ESCALATION_THRESHOLD": str(args.turns + 1),
+    })
+    try:
+        asyncio.run(run(args))
+    finally:
+        tmp.cleanup()
+
+if __name__ == "__main__":
+    main()
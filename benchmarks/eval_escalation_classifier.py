@@ -0,0 +1,195 @@
+"""Evaluation: accuracy vs. latency of the escalation check strategies.
+
+Compares always asking the LLM, the old keyword pre-filter, the keyword
+rules alone and rules plus the trained n-gram model at several uncertain
+bands. The LLM is simulated as an oracle that is right --llm-accuracy of
+the time and takes --llm-latency seconds, so no network access is needed.
+
+Messages are generated from templates (train/test split), or with
+--from-db taken from the chat history in DATABASE_URL.
+
+Run from the repository root:
+    python -m benchmarks.eval_escalation_classifier
+    python -m benchmarks.eval_escalation_classifier --from-db --llm-latency 0.6
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import Callable, List, Optional, Tuple
+
+from app.services.escalation import URGENT_KEYWORDS
+from app.services.escalation_classifier import EscalationClassifier
+
+BANDS = [(0.05, 0.95), (0.15, 0.85), (0.3, 0.7), (0.5, 0.5)]
+
+# The pre-filter this classifier replaced: any cue sent the message to the LLM
+OLD_PREFILTER_CUES = URGENT_KEYWORDS + [
+    'human', 'agent', 'representative', 'real person', 'manager', 'supervisor',
+    'complaint', 'complain', 'refund', 'charge', 'billing', 'payment', 'fraud',
+    'hacked', 'stolen', 'not working', "doesn't work", 'broken', 'error',
+    'failed', 'technical', 'lawyer', 'legal', 'unacceptable', 'terrible',
+    'worst', 'angry', 'frustrated', 'cancel my', 'close my account',
+]
+
+ROUTINE_TEMPLATES = [
+    "what are your {thing} hours",
+    "how do I reset my {account}",
+    "can I get a refund for {item}",
+    "what is your refund policy for {item}",
+    "where is my order {order}",
+    "do you ship {item} to {country}",
+    "what payment methods do you accept",
+    "how do I update my billing address",
+    "how long does shipping to {country} take",
+    "can I change the color of my {item}",
+    "is the {item} back in stock",
+    "how do I contact an agent about {item} sizes",
+    "does the {item} come with a warranty",
+    "my payment went through, when will the {item} ship",
+    "thanks, that fixed the {account} problem",
+]
+
+ESCALATION_TEMPLATES = [
+    "I want to speak to a human about order {order}",
+    "let me talk to a real person, this is ridiculous",
+    "I was charged twice for {item} and nobody is answering",
+    "this is urgent, my {account} was hacked",
+    "someone used my card, this is fraud",
+    "the {item} arrived broken and I am furious, I want my money back now",
+    "I have asked three times about order {order}, get me a manager",
+    "your service is terrible, I am filing a complaint",
+    "the app keeps failing with an error when I pay and I lost money",
+    "my {account} is locked and support ignored me for a week",
+    "I will contact my lawyer if the {item} refund is not processed",
+    "cancel my account immediately",
+    "payment failed but the money left my bank, fix this asap",
+    "I never received order {order} and I am very frustrated",
+    "close my account and delete my data",
+]
+
+SLOTS = {
+    "thing": ["business", "weekend", "holiday", "support"],
+    "account": ["password", "account", "login", "profile"],
+    "item": ["jacket", "laptop", "headphones", "shoes", "subscription", "phone case"],
+    "order": ["#1042", "#88713", "12345", "from last week"],
+    "country": ["Canada", "Germany", "Japan", "Brazil"],
+}
+
+def render(template: str, rng: random.Random) -> str:
+    text = template
+    for slot, values in SLOTS.items():
+        text = text.replace("{" + slot + "}", rng.choice(values), 1)
+    if rng.random() < 0.3:
+        text = text.capitalize() + rng.choice(["?", ".", "!", ""])
+    return text
+
+def synthetic_examples(
+    count: int,
+    routine: List[str],
+    escalation: List[str],
+    rng: random.Random
+) -> List[Tuple[str, bool]]:
+    examples = []
+    for _ in range(count):
+        # Escalations are the minority, as in real traffic
+        if rng.random() < 0.2:
+            examples.append((render(rng.choice(escalation), rng), True))
+        else:
+            examples.append((render(rng.choice(routine), rng), False))
+    return examples
+
+def synthetic_split(count: int, rng: random.Random):
+    """Train and test sets drawn from disjoint templates, so the model has to generalize"""
+    routine, escalation = ROUTINE_TEMPLATES[:], ESCALATION_TEMPLATES[:]
+    rng.shuffle(routine)
+    rng.shuffle(escalation)
+    r, e = len(routine) * 2 // 3, len(escalation) * 2 // 3
+    train = synthetic_examples(count * 7 // 10, routine[:r], escalation[:e], rng)
+    test = synthetic_examples(count * 3 // 10, routine[r:], escalation[e:], rng)
+    return train, test
+
+async def history_examples() -> List[Tuple[str, bool]]:
+    from app.database import AsyncSessionLocal
+    from app.services.escalation_classifier import load_training_examples
+
+    async with AsyncSessionLocal() as db:
+        return await load_training_examples(db)
+
+def evaluate(
+    name: str,
+    decide: Callable[[str], Optional[bool]],
+    examples: List[Tuple[str, bool]],
+    args,
+    rng: random.Random
+):
+    """decide returns the local verdict, or None to ask the simulated LLM"""
+    start = time.perf_counter()
+    verdicts = [decide(text) for text, _ in examples]
+    local_us = (time.perf_counter() - start) / len(examples) * 1e6
+
+    tp = fp = fn = correct = llm_calls = 0
+    for verdict, (_, label) in zip(verdicts, examples):
+        if verdict is None:
+            llm_calls += 1
+            verdict = label if rng.random() < args.llm_accuracy else not label
+        correct += verdict == label
+        tp += verdict and label
+        fp += verdict and not label
+        fn += (not verdict) and label
+
+    llm_share = llm_calls / len(examples)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    mean_ms = local_us / 1e3 + llm_share * args.llm_latency * 1e3
+    print(f"{name:<28} {correct / len(examples):>6.3f} {precision:>6.3f} {recall:>6.3f} "
+          f"{llm_share:>7.1%} {local_us:>9.1f} {mean_ms:>9.1f}")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--examples", type=int, default=5000, help="synthetic messages")
+    parser.add_argument("--from-db", action="store_true", help="use stored chat history instead")
+    parser.add_argument("--llm-accuracy", type=float, default=0.95)
+    parser.add_argument("--llm-latency", type=float, default=0.4, help="seconds per LLM check")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    if args.from_db:
+        examples = asyncio.run(history_examples())
+        rng.shuffle(examples)
+        split = int(len(examples) * 0.7)
+        train, test = examples[:split], examples[split:]
+    else:
+        train, test = synthetic_split(args.examples, rng)
+    positives = sum(1 for _, label in test if label)
+    print(f"{len(train)} training / {len(test)} test messages ({positives} escalations in test)")
+    print(f"simulated LLM: {args.llm_accuracy:.0%} accurate, {args.llm_latency * 1e3:.0f} ms per call\n")
+
+    rules = EscalationClassifier()
+    trained = EscalationClassifier()
+    start = time.perf_counter()
+    trained.train(train)
+    print(f"trained in {time.perf_counter() - start:.2f} s, {len(trained.weights)} non-zero weights\n")
+
+    print(f"{'strategy':<28} {'acc':>6} {'prec':>6} {'recall':>6} {'llm':>7} {'local us':>9} {'mean ms':>9}")
+    evaluate("always LLM", lambda text: None, test, args, random.Random(args.seed))
+
+    def old_prefilter(text: str) -> Optional[bool]:
+        lowered = text.lower()
+        return None if any(cue in lowered for cue in OLD_PREFILTER_CUES) else False
+    evaluate("old keyword pre-filter", old_prefilter, test, args, random.Random(args.seed))
+
+    for name, classifier in (("rules", rules), ("rules+model", trained)):
+        for low, high in BANDS:
+            classifier.low, classifier.high = low, high
+            evaluate(
+                f"{name} [{low:.2f}, {high:.2f}]",
+                lambda text, c=classifier: c.classify(text).needs_escalation,
+                test,
+                args,
+                random.Random(args.seed)
+            )
+
+if __name__ == "__main__":
+    main()
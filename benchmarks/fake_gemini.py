@@ -0,0 +1,64 @@
+"""In-process stand-in for the google-genai client used by LLMService.
+
+Only the surface the app touches is implemented: client.aio.models
+.generate_content / generate_content_stream (async) and
+client.models.generate_content (blocking).
+"""
+import asyncio
+import json
+import random
+import time
+from types import SimpleNamespace
+
+ESCALATION_JSON = json.dumps({"needs_escalation": False, "reason": "Routine question"})
+ANSWER_TEXT = "Thanks for reaching out! Here is how you can resolve that."
+
+def _reply_for(config) -> SimpleNamespace:
+    wants_json = getattr(config, "response_mime_type", None) == "application/json"
+    return SimpleNamespace(text=ESCALATION_JSON if wants_json else ANSWER_TEXT)
+
+class FakeGeminiClient:
+    """Fake client whose calls take latency seconds (+/- jitter)"""
+
+    def __init__(
+        self,
+        latency: float = 0.25,
+        jitter: float = 0.05,
+        tokens_per_second: float = 200.0,
+        seed: int = 0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.tokens_per_second = tokens_per_second
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self.aio = SimpleNamespace(models=SimpleNamespace(
+            generate_content=self._generate_async,
+            generate_content_stream=self._generate_stream_async
+        ))
+        self.models = SimpleNamespace(generate_content=self._generate_blocking)
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+    async def _generate_async(self, *, model, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        return _reply_for(config)
+
+    async def _generate_stream_async(self, *, model, contents, config=None):
+        self.calls += 1
+        await asyncio.sleep(self._delay())
+        words = _reply_for(config).text.split(" ")
+
+        async def chunks():
+            for index, word in enumerate(words):
+                await asyncio.sleep(1 / self.tokens_per_second)
+                yield SimpleNamespace(text=word if index == 0 else " " + word)
+
+        return chunks()
+
+    def _generate_blocking(self, *, model, contents, config=None):
+        self.calls += 1
+        time.sleep(self._delay())
+        return _reply_for(config)
@@ -0,0 +1,137 @@
+"""Local HTTP stand-in for the Gemini generateContent REST API.
+
+Serves the two endpoints the google-genai SDK calls for this app, so the
+real client (and its retries/streaming) can run without network access:
+
+    POST /{version}/models/{model}:generateContent
+    POST /{version}/models/{model}:streamGenerateContent?alt=sse
+
+Point the app at it with GEMINI_BASE_URL=http://127.0.0.1:8765.
+
+Run from the repository root:
+    python -m benchmarks.fake_gemini_server --latency 0.3 --tokens-per-second 80 --error-rate 0.02
+"""
+import argparse
+import asyncio
+import json
+import random
+from dataclasses import dataclass, field
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from benchmarks.fake_gemini import ANSWER_TEXT, ESCALATION_JSON
+
+@dataclass
+class FakeGeminiConfig:
+    latency: float = 0.25
+    jitter: float = 0.05
+    tokens_per_second: float = 200.0
+    # Fraction of calls answered with error_status instead of content
+    error_rate: float = 0.0
+    error_status: int = 503
+    seed: int = 0
+    calls: int = 0
+    errors: int = 0
+    rng: random.Random = field(default=None, repr=False)
+
+    def __post_init__(self):
+        self.rng = random.Random(self.seed)
+
+    def delay(self) -> float:
+        return max(0.0, self.latency + self.rng.uniform(-self.jitter, self.jitter))
+
+def _reply_text(body: dict) -> str:
+    config = body.get("generationConfig") or {}
+    if config.get("responseMimeType") == "application/json":
+        return ESCALATION_JSON
+    return ANSWER_TEXT
+
+def _candidate(text: str, finished: bool = True) -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return {"candidates": [candidate]}
+
+def _usage(body: dict, text: str) -> dict:
+    prompt_chars = len(json.dumps(body.get("contents", [])))
+    prompt_tokens, output_tokens = prompt_chars // 4 + 1, len(text) // 4 + 1
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": output_tokens,
+        "totalTokenCount": prompt_tokens + output_tokens,
+    }
+
+def create_app(config: FakeGeminiConfig) -> FastAPI:
+    app = FastAPI(title="Fake Gemini")
+    app.state.config = config
+
+    def injected_error():
+        config.calls += 1
+        if config.error_rate and config.rng.random() < config.error_rate:
+            config.errors += 1
+            return JSONResponse(
+                status_code=config.error_status,
+                content={"error": {
+                    "code": config.error_status,
+                    "message": "Injected error",
+                    "status": "UNAVAILABLE" if config.error_status >= 500 else "RESOURCE_EXHAUSTED",
+                }},
+            )
+        return None
+
+    @app.post("/{version}/models/{model_action}")
+    async def generate(version: str, model_action: str, request: Request):
+        body = await request.json()
+        error = injected_error()
+        await asyncio.sleep(config.delay())
+        if error is not None:
+            return error
+
+        text = _reply_text(body)
+        if not model_action.endswith(":streamGenerateContent"):
+            return {**_candidate(text), "usageMetadata": _usage(body, text)}
+
+        words = text.split(" ")
+
+        async def events():
+            for index, word in enumerate(words):
+                await asyncio.sleep(1 / config.tokens_per_second)
+                last = index == len(words) - 1
+                chunk = _candidate(word if index == 0 else " " + word, finished=last)
+                if last:
+                    chunk["usageMetadata"] = _usage(body, text)
+                yield f"data: {json.dumps(chunk)}\r\n\r\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.get("/stats")
+    async def stats():
+        return {"calls": config.calls, "errors": config.errors}
+
+    return app
+
+def main():
+    import uvicorn
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.25, help="seconds before the first token")
+    parser.add_argument("--jitter", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    config = FakeGeminiConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        tokens_per_second=args.tokens_per_second,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+    )
+    uvicorn.run(create_app(config), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
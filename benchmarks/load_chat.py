@@ -0,0 +1,243 @@
+"""Load test: replay sample queries through /session/new and /chat.
+
+By default the app runs in-process on a temporary SQLite database and
+talks to benchmarks/fake_gemini_server.py (started as a subprocess)
+through the real google-genai client, so no network access is needed.
+With --target the same traffic is sent to an already running server.
+
+Reports throughput, latency percentiles and the DB vs LLM split taken
+from each response's stage timings, and writes everything as JSON so
+runs can be compared over time.
+
+Run from the repository root:
+    python -m benchmarks.load_chat --sessions 200 --concurrency 32 --turns 3
+    python -m benchmarks.load_chat --llm-latency 0.5 --error-rate 0.05 --output run.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from benchmarks.load_llm_service import percentile
+
+DB_STAGES = ("session_lookup", "save_user_message", "load_history", "save_response")
+LLM_STAGES = ("generate_response", "escalation_check", "summarize")
+
+def load_queries(path: str) -> List[str]:
+    with open(path) as f:
+        return [line.strip() for line in f if line.strip()]
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def start_fake_gemini(args, port: int) -> subprocess.Popen:
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_gemini_server",
+        "--port", str(port),
+        "--latency", str(args.llm_latency),
+        "--jitter", str(args.llm_jitter),
+        "--tokens-per-second", str(args.tokens_per_second),
+        "--error-rate", str(args.error_rate),
+        "--error-status", str(args.error_status),
+    ])
+    deadline = time.monotonic() + 15
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise SystemExit("fake Gemini server did not start")
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {"session": [], "chat": []}
+        self.statuses: Counter = Counter()
+        self.stages: Dict[str, List[float]] = {}
+        self.db_ms: List[float] = []
+        self.llm_ms: List[float] = []
+        self.escalated = 0
+
+    def chat(self, latency: float, status: int, body: Dict):
+        self.latencies["chat"].append(latency)
+        self.statuses[status] += 1
+        if status != 200:
+            return
+        timings = body.get("timings") or {}
+        for stage, ms in timings.items():
+            self.stages.setdefault(stage, []).append(ms)
+        self.db_ms.append(sum(timings.get(stage, 0.0) for stage in DB_STAGES))
+        # The answer and the escalation check overlap; count the longer one
+        self.llm_ms.append(
+            max(timings.get("generate_response", 0.0), timings.get("escalation_check", 0.0))
+            + timings.get("summarize", 0.0)
+        )
+        self.escalated += bool(body.get("escalated"))
+
+def latency_summary(samples: List[float]) -> Dict:
+    if not samples:
+        return {}
+    return {
+        "count": len(samples),
+        "mean_ms": round(statistics.mean(samples) * 1e3, 2),
+        "p50_ms": round(percentile(samples, 50) * 1e3, 2),
+        "p95_ms": round(percentile(samples, 95) * 1e3, 2),
+        "p99_ms": round(percentile(samples, 99) * 1e3, 2),
+        "max_ms": round(max(samples) * 1e3, 2),
+    }
+
+async def replay_session(client, queries: List[str], offset: int, turns: int, recorder: Recorder):
+    start = time.perf_counter()
+    response = await client.post("/session/new")
+    recorder.latencies["session"].append(time.perf_counter() - start)
+    recorder.statuses[response.status_code] += 1
+    if response.status_code != 200:
+        return
+    session_id = response.json()["session_id"]
+
+    for turn in range(turns):
+        message = queries[(offset + turn) % len(queries)]
+        start = time.perf_counter()
+        response = await client.post("/chat/", json={"session_id": session_id, "message": message})
+        body = response.json() if response.headers.get("content-type", "").startswith("application/json") else {}
+        recorder.chat(time.perf_counter() - start, response.status_code, body)
+
+async def drive(client, args, queries: List[str], recorder: Recorder) -> float:
+    pending = asyncio.Queue()
+    for session in range(args.sessions):
+        pending.put_nowait(session)
+
+    async def user():
+        while not pending.empty():
+            session = pending.get_nowait()
+            await replay_session(client, queries, session, args.turns, recorder)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(user() for _ in range(args.concurrency)))
+    return time.perf_counter() - start
+
+async def run_in_process(args, queries: List[str], recorder: Recorder, gemini_url: str) -> float:
+    import httpx
+
+    from main import app
+
+    # main loads .env with override=True; make sure we still hit the fakes
+    if os.environ.get("GEMINI_BASE_URL") != gemini_url:
+        raise SystemExit("GEMINI_BASE_URL was overridden (by .env?)")
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            return await drive(client, args, queries, recorder)
+
+async def run_against(args, queries: List[str], recorder: Recorder) -> float:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.target, timeout=120, limits=limits) as client:
+        return await drive(client, args, queries, recorder)
+
+def report(args, recorder: Recorder, wall: float) -> Dict:
+    requests = len(recorder.latencies["session"]) + len(recorder.latencies["chat"])
+    chats = len(recorder.latencies["chat"])
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "wall_s": round(wall, 3),
+        "requests": requests,
+        "rps": round(requests / wall, 2) if wall else 0.0,
+        "chat_rps": round(chats / wall, 2) if wall else 0.0,
+        "statuses": {str(status): count for status, count in sorted(recorder.statuses.items())},
+        "escalated_chats": recorder.escalated,
+        "latency": {
+            "session_new": latency_summary(recorder.latencies["session"]),
+            "chat": latency_summary(recorder.latencies["chat"]),
+        },
+        "server_time_ms": {
+            "db_mean": round(statistics.mean(recorder.db_ms), 2) if recorder.db_ms else None,
+            "llm_mean": round(statistics.mean(recorder.llm_ms), 2) if recorder.llm_ms else None,
+            "stages_mean": {
+                stage: round(statistics.mean(values), 2)
+                for stage, values in sorted(recorder.stages.items())
+            },
+        },
+    }
+
+def print_report(result: Dict):
+    chat = result["latency"]["chat"]
+    server = result["server_time_ms"]
+    print(f"{result['requests']} requests in {result['wall_s']} s: "
+          f"{result['rps']} req/s ({result['chat_rps']} chats/s), statuses {result['statuses']}")
+    if chat:
+        print(f"chat latency  p50 {chat['p50_ms']} ms  p95 {chat['p95_ms']} ms  "
+              f"p99 {chat['p99_ms']} ms  max {chat['max_ms']} ms")
+    print(f"server time   db {server['db_mean']} ms  llm {server['llm_mean']} ms (mean per chat)")
+    for stage, ms in server["stages_mean"].items():
+        print(f"  {stage:<18} {ms:>9.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--turns", type=int, default=3, help="chat messages per session")
+    parser.add_argument("--concurrency", type=int, default=16, help="simultaneous virtual users")
+    parser.add_argument("--queries", default="data/sample_queries.txt")
+    parser.add_argument("--target", help="URL of a running server instead of the in-process app")
+    parser.add_argument("--llm-latency", type=float, default=0.25)
+    parser.add_argument("--llm-jitter", type=float, default=0.05)
+    parser.add_argument("--tokens-per-second", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--no-response-cache", action="store_true")
+    parser.add_argument("--output", help="results file (default: benchmarks/results/load_chat-<time>.json)")
+    args = parser.parse_args()
+
+    queries = load_queries(args.queries)
+    recorder = Recorder()
+
+    if args.target:
+        wall = asyncio.run(run_against(args, queries, recorder))
+    else:
+        port = free_port()
+        gemini_url = f"http://127.0.0.1:{port}"
+        fake_gemini = start_fake_gemini(args, port)
+        tmp = tempfile.TemporaryDirectory()
+        os.environ.update({
+            "GEMINI_API_KEY": os.getenv("GEMINI_API_KEY", "fake-key"),
+            "GEMINI_BASE_URL": gemini_url,
+            "DATABASE_URL": f"sqlite+aiosqlite:///{os.path.join(tmp.name, 'load.db')}",
+            "DB_ECHO": "false",
+        })
+        if args.no_response_cache:
+            os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+        try:
+            wall = asyncio.run(run_in_process(args, queries, recorder, gemini_url))
+        finally:
+            fake_gemini.terminate()
+            fake_gemini.wait()
+            tmp.cleanup()
+
+    result = report(args, recorder, wall)
+    print_report(result)
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"load_chat-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"results written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Load test: concurrent chats through LLMService against a fake Gemini client.
+
+Each simulated chat makes the two LLM calls of a /chat turn
+(generate_response + detect_escalation_need). The "blocking" scenario
+replays the previous behaviour, where the synchronous SDK call ran on the
+event loop.
+
+Run from the repository root:
+    python -m benchmarks.load_llm_service --chats 200 --latency 0.05
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import List
+
+from app.services.llm_service import LLMService
+from benchmarks.fake_gemini import FakeGeminiClient
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def async_chat(service: LLMService, message: str, arrived: float) -> float:
+    await service.generate_response(message, [], "")
+    await service.detect_escalation_need(message, 0)
+    return time.perf_counter() - arrived
+
+async def blocking_chat(client: FakeGeminiClient, message: str, arrived: float) -> float:
+    client.models.generate_content(model="fake", contents=message)
+    client.models.generate_content(model="fake", contents=message)
+    return time.perf_counter() - arrived
+
+async def run(label: str, make_chat, chats: int):
+    # All chats arrive together; latency is measured from arrival to reply
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*(make_chat(f"question {i}", start) for i in range(chats)))
+    wall = time.perf_counter() - start
+
+    print(
+        f"{label:>10} chats={chats} wall={wall:.2f}s "
+        f"p50={statistics.median(latencies) * 1e3:.0f}ms "
+        f"p95={percentile(latencies, 95) * 1e3:.0f}ms "
+        f"p99={percentile(latencies, 99) * 1e3:.0f}ms"
+    )
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="fake Gemini latency in seconds")
+    parser.add_argument("--max-concurrency", type=int, default=64, help="LLM_MAX_CONCURRENCY")
+    parser.add_argument("--skip-blocking", action="store_true", help="skip the slow legacy scenario")
+    args = parser.parse_args()
+
+    os.environ["LLM_MAX_CONCURRENCY"] = str(args.max_concurrency)
+    client = FakeGeminiClient(latency=args.latency, jitter=args.latency / 5)
+    service = LLMService(client=client)
+
+    await run("async", lambda message, arrived: async_chat(service, message, arrived), args.chats)
+    if not args.skip_blocking:
+        await run("blocking", lambda message, arrived: blocking_chat(client, message, arrived), args.chats)
+
+if __name__ == "__main__":
+    asyncio.run(main())
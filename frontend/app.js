@@ -1,9 +1,14 @@
 // ===== CONFIGURATION =====
 const API_BASE_URL = 'http://localhost:8000';
+const WS_BASE_URL = API_BASE_URL.replace(/^http/, 'ws');
+const SOCKET_CONNECT_TIMEOUT_MS = 3000;
+const SOCKET_RETRY_MS = 30000;
 
 // ===== STATE MANAGEMENT =====
 let currentSessionId = null;
 let isWaitingForResponse = false;
+let chatSocket = null;       // open ChatSocket for currentSessionId, if any
+let socketRetryAt = 0;       // after a failed connect, HTTP is used until then
 
 // ===== DOM ELEMENTS =====
 const chatMessages = document.getElementById('chatMessages');
@@ -129,46 +134,277 @@ async function createSession() {
     }
 }
 
-async function sendMessage(message) {
-    if (!currentSessionId) {
-        await createSession();
-        if (!currentSessionId) return;
+// Parse Server-Sent Events from a streaming fetch() response
+async function* readServerEvents(response) {
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            
+            let event = 'message';
+            let data = '';
+            frame.split('\n').forEach(line => {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            });
+            yield { event, data: data ? JSON.parse(data) : null };
+        }
+    }
+}
+
+function finishBotMessage(botMessage, data) {
+    // Add FAQ badge if matched
+    if (data.faq_matched && data.confidence) {
+        addFAQBadge(botMessage, data.confidence);
     }
     
+    // Handle escalation
+    if (data.escalated && data.escalation_info) {
+        showEscalationModal(data.escalation_info);
+    }
+}
+
+// Raised before anything is rendered, so the caller can retry over plain HTTP
+class StreamUnavailableError extends Error {}
+
+// Render the answer token by token from /chat/stream
+async function streamMessage(message) {
+    let response;
     try {
-        disableInput();
-        showTypingIndicator();
-        
-        const response = await fetch(`${API_BASE_URL}/chat`, {
+        response = await fetch(`${API_BASE_URL}/chat/stream`, {
             method: 'POST',
             headers: {
-                'Content-Type': 'application/json'
+                'Content-Type': 'application/json',
+                'Accept': 'text/event-stream'
             },
             body: JSON.stringify({
                 session_id: currentSessionId,
                 message: message
             })
         });
-        
-        hideTypingIndicator();
-        
-        if (!response.ok) {
-            throw new Error(`API Error: ${response.status}`);
+    } catch (error) {
+        throw new StreamUnavailableError(error.message);
+    }
+    
+    if (!response.ok || !response.body) {
+        throw new StreamUnavailableError(`Stream Error: ${response.status}`);
+    }
+    
+    let botMessage = null;
+    let text = null;
+    
+    const showText = (content) => {
+        if (!botMessage) {
+            hideTypingIndicator();
+            botMessage = addMessage('', false);
+            text = botMessage.querySelector('.message-bubble p');
         }
-        
-        const data = await response.json();
-        
-        // Add bot response
-        const botMessage = addMessage(data.response, false);
-        
-        // Add FAQ badge if matched
-        if (data.faq_matched && data.confidence) {
-            addFAQBadge(botMessage, data.confidence);
+        text.textContent = content;
+        scrollToBottom();
+    };
+    
+    for await (const { event, data } of readServerEvents(response)) {
+        if (event === 'token') {
+            showText((text ? text.textContent : '') + data.text);
+        } else if (event === 'faq') {
+            showText(data.response);
+        } else if (event === 'done') {
+            showText(data.response);
+            finishBotMessage(botMessage, data);
+        } else if (event === 'error') {
+            throw new Error(data.detail);
         }
+    }
+}
+
+// ===== WEBSOCKET CHANNEL =====
+// One socket per session: the server validates the session once and keeps
+// the history window, then streams tokens and escalation events per message
+class ChatSocket {
+    constructor(sessionId) {
+        this.sessionId = sessionId;
+        this.socket = null;
+        this.turn = null;  // handlers of the message being answered
+    }
+    
+    connect() {
+        return new Promise((resolve, reject) => {
+            const socket = new WebSocket(`${WS_BASE_URL}/ws/chat/${this.sessionId}`);
+            const timeout = setTimeout(() => {
+                socket.close();
+                reject(new StreamUnavailableError('WebSocket connect timeout'));
+            }, SOCKET_CONNECT_TIMEOUT_MS);
+            
+            socket.onmessage = (event) => {
+                const frame = JSON.parse(event.data);
+                if (frame.type === 'ready') {
+                    clearTimeout(timeout);
+                    this.socket = socket;
+                    resolve(this);
+                } else if (frame.type === 'ping') {
+                    socket.send(JSON.stringify({ type: 'pong' }));
+                } else if (this.turn) {
+                    this.turn.onFrame(frame);
+                }
+            };
+            socket.onclose = (event) => {
+                clearTimeout(timeout);
+                const wasOpen = this.socket !== null;
+                this.socket = null;
+                if (chatSocket === this) chatSocket = null;
+                if (!wasOpen) {
+                    reject(new StreamUnavailableError(`WebSocket closed (${event.code})`));
+                } else if (this.turn) {
+                    this.turn.onClose(event);
+                }
+            };
+        });
+    }
+    
+    get isOpen() {
+        return this.socket !== null && this.socket.readyState === WebSocket.OPEN;
+    }
+    
+    // Resolves once the answer is complete; frames are passed to onFrame
+    send(message, onFrame) {
+        return new Promise((resolve, reject) => {
+            this.turn = {
+                onFrame: (frame) => {
+                    if (frame.type === 'done') {
+                        this.turn = null;
+                        onFrame(frame);
+                        resolve(frame);
+                    } else if (frame.type === 'error' && frame.code === 'busy') {
+                        this.turn = null;
+                        reject(new StreamUnavailableError(frame.detail));
+                    } else if (frame.type === 'error') {
+                        this.turn = null;
+                        reject(new Error(frame.detail));
+                    } else {
+                        onFrame(frame);
+                    }
+                },
+                onClose: (event) => {
+                    this.turn = null;
+                    reject(new Error(`WebSocket closed (${event.code})`));
+                }
+            };
+            this.socket.send(JSON.stringify({ type: 'message', message: message }));
+        });
+    }
+    
+    close() {
+        if (this.socket) this.socket.close();
+        this.socket = null;
+    }
+}
+
+async function getSocket() {
+    if (Date.now() < socketRetryAt || !('WebSocket' in window)) {
+        throw new StreamUnavailableError('WebSocket unavailable');
+    }
+    if (chatSocket && chatSocket.sessionId === currentSessionId && chatSocket.isOpen) {
+        return chatSocket;
+    }
+    if (chatSocket) chatSocket.close();
+    
+    try {
+        chatSocket = await new ChatSocket(currentSessionId).connect();
+        return chatSocket;
+    } catch (error) {
+        chatSocket = null;
+        socketRetryAt = Date.now() + SOCKET_RETRY_MS;
+        throw error;
+    }
+}
+
+// Render the answer frame by frame over the session's WebSocket
+async function socketMessage(message) {
+    const socket = await getSocket();
+    
+    let botMessage = null;
+    let text = null;
+    
+    const showText = (content) => {
+        if (!botMessage) {
+            hideTypingIndicator();
+            botMessage = addMessage('', false);
+            text = botMessage.querySelector('.message-bubble p');
+        }
+        text.textContent = content;
+        scrollToBottom();
+    };
+    
+    await socket.send(message, (frame) => {
+        if (frame.type === 'token') {
+            showText((text ? text.textContent : '') + frame.text);
+        } else if (frame.type === 'faq') {
+            showText(frame.response);
+        } else if (frame.type === 'done') {
+            // Also shows the escalation modal, so the 'escalation' frame is not handled
+            showText(frame.response);
+            finishBotMessage(botMessage, frame);
+        }
+    });
+}
+
+async function postMessage(message) {
+    const response = await fetch(`${API_BASE_URL}/chat`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+            session_id: currentSessionId,
+            message: message
+        })
+    });
+    
+    hideTypingIndicator();
+    
+    if (!response.ok) {
+        throw new Error(`API Error: ${response.status}`);
+    }
+    
+    const data = await response.json();
+    
+    // Add bot response
+    const botMessage = addMessage(data.response, false);
+    finishBotMessage(botMessage, data);
+}
+
+async function sendMessage(message) {
+    if (!currentSessionId) {
+        await createSession();
+        if (!currentSessionId) return;
+    }
+    
+    try {
+        disableInput();
+        showTypingIndicator();
         
-        // Handle escalation
-        if (data.escalated && data.escalation_info) {
-            showEscalationModal(data.escalation_info);
+        // WebSocket first, then Server-Sent Events, then a plain POST
+        try {
+            await socketMessage(message);
+        } catch (socketError) {
+            if (!(socketError instanceof StreamUnavailableError)) throw socketError;
+            console.warn('WebSocket unavailable, falling back to HTTP:', socketError);
+            try {
+                await streamMessage(message);
+            } catch (streamError) {
+                if (!(streamError instanceof StreamUnavailableError)) throw streamError;
+                console.warn('Streaming unavailable, falling back to /chat:', streamError);
+                await postMessage(message);
+            }
         }
         
         enableInput();
@@ -185,13 +421,21 @@ async function loadChatHistory() {
     if (!currentSessionId) return;
     
     try {
-        const response = await fetch(`${API_BASE_URL}/chat/history/${currentSessionId}`);
-        
-        if (!response.ok) {
-            throw new Error('Failed to load history');
-        }
-        
-        const data = await response.json();
+        // History is paginated; follow next_after_id until the last page
+        const messages = [];
+        let afterId = null;
+        do {
+            const query = afterId === null ? '' : `?after_id=${afterId}`;
+            const response = await fetch(`${API_BASE_URL}/chat/history/${currentSessionId}${query}`);
+            
+            if (!response.ok) {
+                throw new Error('Failed to load history');
+            }
+            
+            const data = await response.json();
+            messages.push(...data.messages);
+            afterId = data.next_after_id;
+        } while (afterId !== null);
         
         // Clear existing messages except welcome
         const welcomeMsg = chatMessages.querySelector('.welcome-message');
@@ -201,7 +445,7 @@ async function loadChatHistory() {
         }
         
         // Add history messages
-        data.messages.forEach(msg => {
+        messages.forEach(msg => {
             addMessage(msg.content, msg.role === 'user');
         });
         
@@ -269,6 +513,7 @@ chatMessages.addEventListener('click', async (e) => {
 newSessionBtn.addEventListener('click', async () => {
     if (confirm('Start a new session? Current conversation will be saved.')) {
         currentSessionId = null;
+        if (chatSocket) chatSocket.close();
         const welcomeMsg = chatMessages.querySelector('.welcome-message');
         chatMessages.innerHTML = '';
         if (welcomeMsg) {
@@ -3,15 +3,46 @@ from dotenv import load_dotenv
 # Load environment variables FIRST before any other imports
 load_dotenv(override=True)
 
-from fastapi import FastAPI
+from app.services.timing import StageTimer
+
+# Startup phases (ms since this module started importing), reported once
+# the worker is ready and at GET /health
+startup_timer = StageTimer()
+
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 from contextlib import asynccontextmanager
+import argparse
+import asyncio
 import os
 
 from app.database import init_db
-from app.routes import chat, session
+from app.routes import admin, chat, escalation, session, ws
+from app.services.assets import StaticAssets
+from app.services.metrics import REGISTRY, MetricsMiddleware
+
+# Minified, fingerprinted and precompressed frontend (plain files until built)
+static_assets = StaticAssets.from_env(
+    fallback=StaticFiles(directory="frontend") if os.path.exists("frontend") else None
+)
+
+# eager: create the Gemini client before reporting ready; lazy: report
+# ready first and create it in the background (or on the first LLM call)
+STARTUP_MODE = os.getenv("STARTUP_MODE", "eager").lower()
+# Off when the schema is migrated once per deploy (python main.py migrate)
+# instead of by every worker
+DB_AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "true").lower() == "true"
+
+startup_timer.mark("imports")
+
+async def connect_llm():
+    try:
+        await asyncio.to_thread(chat.llm_service.connect)
+    except Exception as e:
+        # The first LLM call tries again and reports the error
+        print(f"Error creating the Gemini client: {str(e)}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -19,11 +50,50 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting AI Customer Support Bot...")
     print(f"✓ Environment loaded from .env")
     print(f"✓ API Key present: {bool(os.getenv('GEMINI_API_KEY'))}")
+    if not os.getenv("ADMIN_TOKEN"):
+        print("⚠️ ADMIN_TOKEN is not set; admin endpoints are disabled")
     
-    await init_db()
+    if DB_AUTO_MIGRATE:
+        with startup_timer.stage("migrate"):
+            await init_db()
+    chat.message_writer.start()
+    if os.path.exists(static_assets.source_dir):
+        with startup_timer.stage("static_assets"):
+            static_assets.prepare()
+
+    connecting = None
+    if STARTUP_MODE == "lazy":
+        connecting = asyncio.create_task(connect_llm())
+    else:
+        with startup_timer.stage("llm_client"):
+            chat.llm_service.connect()
+
+    # Pick up edits to the FAQ file without a restart
+    faq_reload_interval = float(os.getenv("FAQ_RELOAD_INTERVAL_SECONDS", 5))
+    faq_watcher = None
+    if faq_reload_interval > 0:
+        faq_watcher = asyncio.create_task(chat.faq_service.watch(faq_reload_interval))
+
+    # Idle expiry, archiving and compaction of old sessions
+    maintenance = None
+    if chat.session_maintenance.interval > 0:
+        maintenance = asyncio.create_task(chat.session_maintenance.run())
+
+    startup_timer.mark("ready")
+    phases = ", ".join(f"{name} {ms:.0f} ms" for name, ms in startup_timer.timings.items() if name != "ready")
+    print(f"✓ Ready in {startup_timer.timings['ready']:.0f} ms ({STARTUP_MODE} startup: {phases})")
     yield
     # Shutdown
     print("👋 Shutting down...")
+    if faq_watcher is not None:
+        faq_watcher.cancel()
+    if maintenance is not None:
+        maintenance.cancel()
+    if connecting is not None:
+        await connecting
+    # Commit queued chat messages before the process exits
+    await chat.message_writer.close()
+    await chat.conversation_memory.drain()
 
 app = FastAPI(
     title="AI Customer Support Bot",
@@ -41,13 +111,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(chat.router)
 app.include_router(session.router)
+app.include_router(escalation.router)
+app.include_router(admin.router)
+app.include_router(ws.router)
 
 # Serve frontend static files
 if os.path.exists("frontend"):
-    app.mount("/static", StaticFiles(directory="frontend"), name="static")
+    app.mount("/static", static_assets, name="static")
 
 @app.get("/")
 async def root():
@@ -59,32 +134,102 @@ async def root():
             "chat_ui": "/chat-ui",
             "create_session": "POST /session/new",
             "chat": "POST /chat",
-            "get_history": "GET /chat/history/{session_id}",
+            "chat_stream": "POST /chat/stream",
+            "chat_socket": "WS /ws/chat/{session_id}",
+            "chat_batch": "POST /chat/batch?job_id=",
+            "batch_status": "GET /chat/batch/{job_id}",
+            "metrics": "GET /metrics",
+            "get_history": "GET /chat/history/{session_id}?after_id=&limit=",
+            "export_messages": "GET /chat/export",
             "get_session": "GET /session/{session_id}",
-            "close_session": "DELETE /session/{session_id}"
+            "close_session": "DELETE /session/{session_id}",
+            "list_escalations": "GET /escalations",
+            "next_escalation": "POST /escalations/next",
+            "update_escalation": "PATCH /escalations/{ticket_id}",
+            "upsert_faqs": "POST /admin/faqs",
+            "run_maintenance": "POST /admin/maintenance/run"
         }
     }
 
 @app.get("/chat-ui")
-async def serve_chat_ui():
+async def serve_chat_ui(request: Request):
     """Serve the chat interface"""
-    return FileResponse("frontend/index.html")
+    if not static_assets.loaded:
+        return FileResponse("frontend/index.html")
+    return static_assets.response(request, "index.html")
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/health")
 async def health_check():
+    admission = chat.admission.stats()
     return {
-        "status": "healthy",
-        "gemini_api_configured": bool(os.getenv("GEMINI_API_KEY"))
+        # Still serving under overload, from the FAQs only
+        "status": "healthy" if admission["mode"] == "normal" else "degraded",
+        "gemini_api_configured": bool(os.getenv("GEMINI_API_KEY")),
+        "mode": admission["mode"],
+        "queue_depth": admission["queue_depth"],
+        "admission": admission,
+        "startup_ms": startup_timer.timings
     }
 
-if __name__ == "__main__":
+def prebuild():
+    """Build the state workers only read: FAQ embeddings and static assets.
+
+    Both are cached on disk (the FAQ matrix is memory-mapped), so workers
+    started afterwards load them instead of each building its own.
+    """
+    # Importing app.routes.chat already loaded the FAQs (and, in semantic
+    # mode, wrote the embedding cache)
+    print(f"✓ FAQ catalog ready: {len(chat.faq_service.faqs)} FAQs ({chat.faq_service.retrieval_mode})")
+    if os.path.exists(static_assets.source_dir):
+        static_assets.prepare()
+
+def main():
+    parser = argparse.ArgumentParser(description="AI Customer Support Bot")
+    commands = parser.add_subparsers(dest="command")
+    serve = commands.add_parser("serve", help="run the API server (default)")
+    serve.add_argument("--host", default=os.getenv("HOST", "127.0.0.1"))
+    serve.add_argument("--port", type=int, default=int(os.getenv("PORT", 8000)))
+    serve.add_argument("--workers", type=int, default=int(os.getenv("WEB_CONCURRENCY", 1)))
+    serve.add_argument("--reload", action="store_true", help="restart on code changes (single worker)")
+    commands.add_parser("migrate", help="create or update the database schema, then exit")
+    commands.add_parser("prebuild", help="build FAQ embeddings and static assets, then exit")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        asyncio.run(init_db())
+        print("✓ Database schema up to date")
+        return
+    if args.command == "prebuild":
+        prebuild()
+        return
+
     import uvicorn
-    
+
+    if args.command is None:
+        # uv run main.py: the development server
+        uvicorn.run("main:app", host="127.0.0.1", port=8000, reload=True, log_level="info", access_log=True)
+        return
+
+    if args.workers > 1:
+        # Migrate and build once here, not in every worker
+        asyncio.run(init_db())
+        prebuild()
+        os.environ["DB_AUTO_MIGRATE"] = "false"
+        os.environ["ASSETS_AUTO_BUILD"] = "false"
     uvicorn.run(
         "main:app",
-        host="127.0.0.1",
-        port=8000,
-        reload=True,
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else args.workers,
+        reload=args.reload,
         log_level="info",
         access_log=True
     )
+
+if __name__ == "__main__":
+    main()
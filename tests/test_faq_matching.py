@@ -0,0 +1,48 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from app.services.faq_service import FAQService
+from app.services.text import stem
+
+FAQS_PATH = Path(__file__).resolve().parent.parent / "data" / "faqs.json"
+# Same bar as /chat and the batch processor for answering from an FAQ
+FAQ_MIN_CONFIDENCE = 70
+
+@pytest.fixture(scope="module")
+def faq_service():
+    with open(FAQS_PATH, encoding="utf-8") as f:
+        return FAQService(faqs=json.load(f), retrieval_mode="keyword")
+
+@pytest.mark.parametrize("query, question", [
+    ("Can I get a refund?", "What is your refund policy?"),
+    ("I want a refund", "What is your refund policy?"),
+    ("Do you ship internationally?", "Do you offer international shipping?"),
+    ("What are your business hours?", "What are your business hours?"),
+])
+def test_direct_questions_are_answered_from_faqs(faq_service, query, question):
+    match = faq_service.find_matching_faq(query)
+    assert match is not None
+    assert match['question'] == question
+    assert match['confidence'] > FAQ_MIN_CONFIDENCE
+
+@pytest.mark.parametrize("query", [
+    "what are your hours and do you ship to canada",
+    "What is your refund policy and how do I reset my password?",
+])
+def test_multi_part_questions_are_not_confident(faq_service, query):
+    match = faq_service.find_matching_faq(query)
+    assert match is None or match['confidence'] <= FAQ_MIN_CONFIDENCE
+
+@pytest.mark.parametrize("token, expected", [
+    ("shipping", "ship"),
+    ("shipped", "ship"),
+    ("ship", "ship"),
+    ("ordered", "order"),
+    ("billing", "bill"),
+    ("processing", "process"),
+    ("internationally", "international"),
+])
+def test_stem(token, expected):
+    assert stem(token) == expected